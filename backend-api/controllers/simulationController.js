@@ -2,60 +2,84 @@
 // Lida com requisições HTTP (req, res), interage com a camada de serviço
 // e gerencia a comunicação com os clientes (SSE).
 const simulationService = require("../services/simulationService");
+const sseHub = require("../services/sseHub");
+const metricsRegistry = require("../services/metricsRegistry");
+const resultsService = require("../services/resultsService");
 
-let clients = []; // Array de clientes SSE conectados
-
-// Função para transmitir dados para todos os clientes conectados
-function broadcast(data) {
-  clients.forEach((client) =>
-    client.res.write(`data: ${JSON.stringify(data)}\n\n`),
+// Transmite um evento de uma sessão aos clientes interessados (ver sseHub).
+// Nas sessões instrumentadas, mede também o tempo de publicação
+function broadcast(sessionId, data) {
+  if (!metricsRegistry.isTracked(sessionId)) {
+    sseHub.publish(sessionId, data);
+    return;
+  }
+  const started = process.hrtime.bigint();
+  sseHub.publish(sessionId, data);
+  metricsRegistry.recordBroadcast(
+    sessionId,
+    Number(process.hrtime.bigint() - started) / 1e6,
   );
 }
 
-// Listener para os eventos emitidos pelo serviço de simulação
-simulationService.on("data", (dataBuffer) => {
-  const lines = dataBuffer
-    .toString()
-    .split("\n")
-    .filter((line) => line.trim() !== "");
-  lines.forEach((line) => {
-    try {
-      const jsonData = JSON.parse(line);
-      broadcast(jsonData);
-    } catch (e) {
-      console.warn("Saída não-JSON do Python (stdout):", line);
-      broadcast({ type: "log_python", channel: "stdout", message: line });
-    }
-  });
+// Listener para os eventos emitidos pelo serviço de simulação (já decodificados)
+simulationService.on("event", (sessionId, event) => {
+  if (event.type === "metrics") metricsRegistry.recordEngine(sessionId, event);
+  if (event.type === "status" && event.run) {
+    // Execução gravada da sessão ('recording' ou 'cached'), consultada por /api/history?session=
+    sseHub.annotate(sessionId, { bearing: event.bearing, run: event.run });
+  }
+  broadcast(sessionId, event);
 });
 
-simulationService.on("error", (errorData) => {
+simulationService.on("error", (sessionId, errorData) => {
   const message = errorData.toString();
   console.error(`Erro do Python (stderr): ${message}`);
-  broadcast({ type: "error_python", channel: "stderr", message });
+  broadcast(sessionId, { type: "error_python", channel: "stderr", message });
 });
 
-simulationService.on("end", (endMessage) => {
-  broadcast(endMessage);
+simulationService.on("end", (sessionId, endMessage) => {
+  broadcast(sessionId, endMessage);
+  sseHub.release(sessionId);
+  metricsRegistry.untrack(sessionId);
 });
 
 // Funções do Controller
 exports.handleSse = (req, res) => {
+  // Sem ?session=, o cliente recebe os eventos de todas as sessões. Uma sessão precisa existir
+  // (ou ter terminado há pouco, com o buffer retido): IDs desconhecidos não criam fluxos
+  const sessionId = req.query.session;
+  if (
+    sessionId &&
+    !simulationService.has(sessionId) &&
+    !sseHub.has(sessionId)
+  ) {
+    return res
+      .status(404)
+      .json({ error: `Sessão não encontrada: ${sessionId}` });
+  }
+
   res.setHeader("Content-Type", "text/event-stream");
   res.setHeader("Cache-Control", "no-cache");
   res.setHeader("Connection", "keep-alive");
   res.flushHeaders();
 
-  const clientId = Date.now();
-  clients.push({ id: clientId, res });
-  console.log(`Cliente ${clientId} conectado.`);
+  const client = sseHub.subscribe(sessionId, req, res);
+  console.log(
+    `Cliente ${client.id} conectado${sessionId ? ` (sessão ${sessionId})` : ""}.`,
+  );
 
   req.on("close", () => {
-    clients = clients.filter((c) => c.id !== clientId);
-    console.log(`Cliente ${clientId} desconectado.`);
+    console.log(`Cliente ${client.id} desconectado.`);
   });
 };
 
+// Campos numéricos opcionais do corpo (undefined quando ausentes, NaN quando não numéricos)
+function parseOptionalNumber(value) {
+  if (value === undefined || value === null || value === "") return undefined;
+  if (typeof value !== "number" && typeof value !== "string") return NaN;
+  return Number(value);
+}
+
 exports.startSimulation = (req, res) => {
   try {
     const { bearingName } = req.body;
@@ -65,7 +89,55 @@ exports.startSimulation = (req, res) => {
     if (!bearingName) {
       return res.status(400).json({ error: "bearingName é obrigatório." });
     }
-    const result = simulationService.start(bearingName, basePath);
+    // Ritmo, janela de minutos, retomada do checkpoint e instrumentação opcionais
+    // (ver python-engine/pacing.py, checkpoint.py e profiling.py)
+    const { pacing, resume, profile } = req.body;
+    if (pacing && !["batch", "realtime", "rate"].includes(pacing)) {
+      return res
+        .status(400)
+        .json({ error: "pacing deve ser 'batch', 'realtime' ou 'rate'." });
+    }
+    const speed = parseOptionalNumber(req.body.speed);
+    const rate = parseOptionalNumber(req.body.rate);
+    const startMinute = parseOptionalNumber(req.body.startMinute);
+    const endMinute = parseOptionalNumber(req.body.endMinute);
+    if (
+      [speed, rate].some(
+        (v) => v !== undefined && !(Number.isFinite(v) && v > 0),
+      )
+    ) {
+      return res
+        .status(400)
+        .json({ error: "speed e rate devem ser números positivos." });
+    }
+    if (
+      [startMinute, endMinute].some(
+        (v) => v !== undefined && !(Number.isInteger(v) && v >= 0),
+      )
+    ) {
+      return res.status(400).json({
+        error: "startMinute e endMinute devem ser inteiros não negativos.",
+      });
+    }
+    if (
+      startMinute !== undefined &&
+      endMinute !== undefined &&
+      endMinute < startMinute
+    ) {
+      return res
+        .status(400)
+        .json({ error: "endMinute deve ser maior ou igual a startMinute." });
+    }
+    const options = {
+      pacing,
+      speed,
+      rate,
+      startMinute,
+      endMinute,
+      resume,
+      profile,
+    };
+    const result = simulationService.start(bearingName, basePath, options);
     res.json(result);
   } catch (error) {
     res.status(error.statusCode || 500).json({ error: error.message });
@@ -73,8 +145,79 @@ exports.startSimulation = (req, res) => {
 };
 
 exports.stopSimulation = (req, res) => {
-  const result = simulationService.stop();
-  res.json(result);
+  try {
+    const result = simulationService.stop(req.query.session);
+    res.json(result);
+  } catch (error) {
+    res.status(error.statusCode || 500).json({ error: error.message });
+  }
+};
+
+exports.listSessions = (req, res) => {
+  res.json(simulationService.list());
+};
+
+exports.getMetrics = (req, res) => {
+  res.json(metricsRegistry.snapshot());
+};
+
+// Parâmetros inteiros opcionais da query string (undefined quando ausentes)
+function parseOptionalInt(value) {
+  if (value === undefined || value === "") return undefined;
+  const parsed = parseInt(value, 10);
+  return Number.isNaN(parsed) || parsed < 1 ? null : parsed;
+}
+
+// Séries de ESI/RUL gravadas de uma execução (ver python-engine/results_store.py). A execução
+// é escolhida por ?run=, pela sessão (?session=, a execução que ela grava ou gravou, enquanto o
+// buffer SSE dela for retido) ou pelo rolamento (?bearing=, a execução mais recente)
+exports.getHistory = async (req, res) => {
+  try {
+    const { session } = req.query;
+    let { run, bearing } = req.query;
+    if (session) {
+      if (!simulationService.has(session) && !sseHub.has(session)) {
+        return res
+          .status(404)
+          .json({ error: `Sessão não encontrada: ${session}` });
+      }
+      const info = sseHub.info(session);
+      if (!info || !info.run) {
+        return res.status(404).json({
+          error: `Nenhuma execução gravada para a sessão ${session}.`,
+        });
+      }
+      ({ bearing, run } = info);
+    }
+    if (!bearing && !run) {
+      return res.status(400).json({ error: "Informe bearing, session ou run." });
+    }
+    const from = parseOptionalInt(req.query.from);
+    const to = parseOptionalInt(req.query.to);
+    const points = parseOptionalInt(req.query.points);
+    if (from === null || to === null || points === null) {
+      return res
+        .status(400)
+        .json({ error: "from, to e points devem ser inteiros positivos." });
+    }
+    const result = await resultsService.history(bearing, {
+      run,
+      from,
+      to,
+      points,
+    });
+    res.json(result);
+  } catch (error) {
+    res.status(error.statusCode || 500).json({ error: error.message });
+  }
+};
+
+exports.listRuns = async (req, res) => {
+  try {
+    res.json(await resultsService.runs(req.query.bearing));
+  } catch (error) {
+    res.status(error.statusCode || 500).json({ error: error.message });
+  }
 };
 
 exports.getAvailableBearings = (req, res) => {
@@ -7,6 +7,10 @@ const controller = require("../controllers/simulationController");
 router.get("/events", controller.handleSse);
 router.post("/start-simulation", controller.startSimulation);
 router.get("/stop-simulation", controller.stopSimulation);
+router.get("/sessions", controller.listSessions);
+router.get("/metrics", controller.getMetrics);
+router.get("/history", controller.getHistory);
+router.get("/runs", controller.listRuns);
 router.get("/bearings", controller.getAvailableBearings);
 
 module.exports = router;
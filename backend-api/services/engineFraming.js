@@ -0,0 +1,114 @@
+// Enquadramento das Saídas do Motor Python
+// Reconstrói mensagens completas a partir dos pedaços (chunks) lidos dos pipes do processo
+// filho, que podem cortar uma linha ou um quadro binário em qualquer ponto.
+const { StringDecoder } = require("string_decoder");
+
+const LOG_PREFIX = "[log] "; // Prefixo dos prints de diagnóstico no stderr (ver protocol.py)
+
+// Entrega cada linha completa de um fluxo de texto, mesmo quando ela chega em vários chunks
+class LineFramer {
+  constructor(onLine) {
+    this.onLine = onLine;
+    this.decoder = new StringDecoder("utf8"); // Não corta caracteres multibyte entre chunks
+    this.buffer = "";
+  }
+
+  push(chunk) {
+    this.buffer += this.decoder.write(chunk);
+    let start = 0;
+    let newline;
+    while ((newline = this.buffer.indexOf("\n", start)) !== -1) {
+      const line = this.buffer.slice(start, newline);
+      start = newline + 1;
+      if (line.trim() !== "") this.onLine(line);
+    }
+    this.buffer = this.buffer.slice(start);
+  }
+
+  // Entrega o resto sem quebra de linha final (fim do processo)
+  end() {
+    const rest = this.buffer + this.decoder.end();
+    this.buffer = "";
+    if (rest.trim() !== "") this.onLine(rest);
+  }
+}
+
+const KIND_JSON = 0;
+const KIND_ESI = 1;
+const KIND_RUL = 2;
+
+// Decodifica o protocolo binário do main.py (--protocol binary), entregando objetos de evento
+// idênticos aos do modo JSON. 'bearing' é o rolamento da sessão, omitido nos registros fixos.
+class BinaryFrameDecoder {
+  constructor(bearing, onEvent) {
+    this.bearing = bearing;
+    this.onEvent = onEvent;
+    this.gravAccel = null; // Recebida no quadro inicial {"type": "protocol"}
+    this.chunks = [];
+    this.buffered = 0;
+  }
+
+  push(chunk) {
+    this.chunks.push(chunk);
+    this.buffered += chunk.length;
+    if (this.buffered < 5) return;
+
+    let buffer =
+      this.chunks.length === 1 ? this.chunks[0] : Buffer.concat(this.chunks);
+    let offset = 0;
+    while (buffer.length - offset >= 5) {
+      const length = buffer.readUInt32LE(offset);
+      if (buffer.length - offset - 4 < length) break;
+      const kind = buffer.readUInt8(offset + 4);
+      this.decode(kind, buffer, offset + 5, offset + 4 + length);
+      offset += 4 + length;
+    }
+    buffer = buffer.subarray(offset);
+    this.chunks = buffer.length > 0 ? [buffer] : [];
+    this.buffered = buffer.length;
+  }
+
+  decode(kind, buffer, start, end) {
+    if (kind === KIND_ESI) {
+      const minute = buffer.readUInt32LE(start);
+      const raw = buffer.readDoubleLE(start + 4);
+      const smoothed = buffer.readDoubleLE(start + 12);
+      const hasRaw = !Number.isNaN(raw);
+      this.onEvent({
+        type: "esi",
+        bearing: this.bearing,
+        minute,
+        value_raw_ms2: hasRaw ? raw : null,
+        value_raw_g: hasRaw ? raw / this.gravAccel : null,
+        value_smoothed_ms2: smoothed,
+        value_smoothed_g: smoothed / this.gravAccel,
+        error: null,
+      });
+    } else if (kind === KIND_RUL) {
+      const minute = buffer.readUInt32LE(start);
+      const rul = buffer.readDoubleLE(start + 4);
+      // Percentis das bandas de incerteza (NaN = null)
+      const band = (index) => {
+        const value = buffer.readDoubleLE(start + 12 + 8 * index);
+        return Number.isFinite(value) ? value : null;
+      };
+      this.onEvent({
+        type: "rul",
+        bearing: this.bearing,
+        minute,
+        rul_predicted_min: Number.isFinite(rul) ? rul : null,
+        is_inf: !Number.isFinite(rul) && !Number.isNaN(rul),
+        is_nan: Number.isNaN(rul),
+        rul_p5_min: band(0),
+        rul_p50_min: band(1),
+        rul_p95_min: band(2),
+      });
+    } else {
+      const event = JSON.parse(buffer.toString("utf8", start, end));
+      if (event.type === "protocol") this.gravAccel = event.grav_accel;
+      else this.onEvent(event);
+    }
+  }
+}
+
+module.exports = { LineFramer, BinaryFrameDecoder, LOG_PREFIX };
@@ -0,0 +1,235 @@
+// Pool de Workers do Motor Python
+// Mantém processos python-engine/worker.py residentes, para que uma simulação não pague a cada
+// início o custo de subir o interpretador e importar numpy/scipy/pandas. A comunicação é feita
+// por stdin/stdout com uma mensagem JSON por linha (ver o cabeçalho de worker.py).
+// Workers que morrem são reiniciados (com espera crescente enquanto não chegarem a ficar prontos,
+// desistindo após RESTART_MAX_FAILURES falhas seguidas), e workers que não respondem ao ping são
+// encerrados.
+// Além dos jobs, o pool encaminha consultas (ex.: histórico do store de resultados), respondidas
+// pela thread principal do worker mesmo durante um job.
+const { spawn } = require("child_process");
+const path = require("path");
+const { EventEmitter } = require("events");
+const { LineFramer } = require("./engineFraming");
+
+const WORKER_SCRIPT = path.join(
+  __dirname,
+  "..",
+  "..",
+  "python-engine",
+  "worker.py",
+);
+const HEALTH_INTERVAL_MS = 15000; // Intervalo entre pings
+const HEALTH_TIMEOUT_MS = 5000; // Sem pong nesse prazo, o worker é considerado travado
+const RESTART_DELAY_MS = 2000; // Espera antes de reiniciar; dobra a cada falha seguida
+const RESTART_MAX_DELAY_MS = 60000;
+const RESTART_MAX_FAILURES = 8; // Saídas seguidas sem 'ready' antes de desistir do worker
+const REQUEST_TIMEOUT_MS = 30000; // Prazo de resposta de uma consulta
+
+// Um processo worker.py e o estado conhecido dele
+class EngineWorker extends EventEmitter {
+  constructor(index) {
+    super();
+    this.index = index;
+    this.process = null;
+    this.ready = false;
+    this.job = null; // Job em execução neste worker
+    this.pendingPing = null;
+    this.framer = null;
+    this.failures = 0; // Saídas seguidas sem ter ficado pronto
+  }
+
+  start() {
+    console.log(`Iniciando worker Python #${this.index}: python3 ${WORKER_SCRIPT}`);
+    this.ready = false;
+    this.framer = new LineFramer((line) => this.handleLine(line));
+    this.process = spawn("python3", [WORKER_SCRIPT]);
+
+    this.process.stdout.on("data", (data) => this.framer.push(data));
+    this.process.stdin.on("error", (err) => this.handleStdinError(err));
+    this.process.stderr.on("data", (data) => this.emit("stderr", data));
+    this.process.on("close", (code) => this.handleClose(code));
+    this.process.on("error", (err) => {
+      console.error(`Falha ao iniciar o worker Python #${this.index}:`, err);
+    });
+  }
+
+  // Escrita em um processo que saiu (EPIPE): encerra-o para seguir pelo 'close' e pelo reinício
+  handleStdinError(err) {
+    console.error(`Falha ao escrever no worker Python #${this.index}:`, err);
+    this.ready = false;
+    if (this.process) this.process.kill("SIGKILL");
+  }
+
+  handleLine(line) {
+    try {
+      this.handleMessage(JSON.parse(line));
+    } catch (e) {
+      console.warn(`Saída inválida do worker Python #${this.index}:`, line);
+    }
+  }
+
+  handleMessage(message) {
+    if (message.type === "ready") {
+      this.ready = true;
+      this.failures = 0;
+      console.log(`Worker Python #${this.index} pronto (pid ${message.pid}).`);
+    } else if (message.type === "pong") {
+      clearTimeout(this.pendingPing);
+      this.pendingPing = null;
+    } else if (message.type === "job_end" && message.job === this.job) {
+      this.job = null;
+    }
+    this.emit("message", message);
+  }
+
+  handleClose(code) {
+    console.log(`Worker Python #${this.index} finalizado com código ${code}`);
+    clearTimeout(this.pendingPing);
+    this.pendingPing = null;
+    this.ready = false;
+    this.process = null;
+    this.failures++;
+    if (this.job) {
+      // O job em execução termina junto com o processo
+      const job = this.job;
+      this.job = null;
+      this.emit("message", { type: "job_end", job, status: "crashed", code });
+    }
+    this.emit("exit", code);
+  }
+
+  // Retorna false (sem escrever) se o processo já saiu ou o stdin foi fechado
+  send(message) {
+    if (!this.process || !this.process.stdin.writable) return false;
+    this.process.stdin.write(JSON.stringify(message) + "\n");
+    return true;
+  }
+
+  // Espera antes do próximo reinício, ou null se o worker falhou vezes demais seguidas
+  restartDelay() {
+    if (this.failures >= RESTART_MAX_FAILURES) return null;
+    return Math.min(
+      RESTART_DELAY_MS * 2 ** Math.max(this.failures - 1, 0),
+      RESTART_MAX_DELAY_MS,
+    );
+  }
+
+  ping() {
+    if (!this.ready || this.pendingPing) return;
+    this.pendingPing = setTimeout(() => {
+      console.error(
+        `Worker Python #${this.index} não respondeu ao ping. Encerrando.`,
+      );
+      if (this.process) this.process.kill("SIGKILL");
+    }, HEALTH_TIMEOUT_MS);
+    this.send({ op: "ping", id: Date.now() });
+  }
+}
+
+class EnginePool extends EventEmitter {
+  constructor(size) {
+    super();
+    this.size = size;
+    this.workers = [];
+    this.healthTimer = null;
+    this.pendingRequests = new Map(); // id da consulta -> { resolve, timer }
+    this.nextRequestId = 1;
+  }
+
+  start() {
+    for (let i = 0; i < this.size; i++) {
+      const worker = new EngineWorker(i);
+      worker.on("message", (message) => {
+        if (message.type === "reply") this.handleReply(message);
+        else this.emit("message", message);
+      });
+      worker.on("stderr", (data) => this.emit("stderr", data, worker.job));
+      worker.on("exit", () => this.restart(worker));
+      worker.start();
+      this.workers.push(worker);
+    }
+    this.healthTimer = setInterval(
+      () => this.workers.forEach((w) => w.ping()),
+      HEALTH_INTERVAL_MS,
+    );
+    this.healthTimer.unref();
+  }
+
+  restart(worker) {
+    const delay = worker.restartDelay();
+    if (delay === null) {
+      console.error(
+        `Worker Python #${worker.index} falhou ${worker.failures} vezes seguidas. Reinício desativado.`,
+      );
+      return;
+    }
+    setTimeout(() => worker.start(), delay);
+  }
+
+  // Envia o job a um worker pronto e livre. Retorna false se não houver nenhum.
+  runJob(jobId, params) {
+    const worker = this.workers.find((w) => w.ready && !w.job);
+    if (!worker) return false;
+    worker.job = jobId;
+    if (!worker.send({ op: "start", job: jobId, ...params })) {
+      worker.job = null;
+      return false;
+    }
+    return true;
+  }
+
+  cancel(jobId) {
+    const worker = this.workers.find((w) => w.job === jobId);
+    if (!worker) return false;
+    return worker.send({ op: "cancel", job: jobId });
+  }
+
+  // Envia uma consulta ({ op, ... }) a um worker pronto, livre ou não. Retorna uma Promise da
+  // resposta ({ result } ou { error }), ou null se não houver worker pronto.
+  request(message) {
+    const worker = this.workers.find((w) => w.ready);
+    if (!worker) return null;
+    const id = this.nextRequestId++;
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pendingRequests.delete(id);
+        reject(
+          new Error(
+            `Worker Python #${worker.index} não respondeu à consulta ${message.op}.`,
+          ),
+        );
+      }, REQUEST_TIMEOUT_MS);
+      this.pendingRequests.set(id, { resolve, timer });
+      if (!worker.send({ ...message, id })) {
+        clearTimeout(timer);
+        this.pendingRequests.delete(id);
+        reject(new Error(`Worker Python #${worker.index} indisponível.`));
+      }
+    });
+  }
+
+  handleReply(message) {
+    const pending = this.pendingRequests.get(message.id);
+    if (!pending) return;
+    clearTimeout(pending.timer);
+    this.pendingRequests.delete(message.id);
+    pending.resolve(message);
+  }
+
+  status() {
+    return this.workers.map((w) => ({
+      index: w.index,
+      pid: w.process ? w.process.pid : null,
+      ready: w.ready,
+      job: w.job,
+    }));
+  }
+}
+
+// Número de workers residentes (ENGINE_WORKERS=0 desativa o pool e volta ao spawn por simulação)
+const poolSize = parseInt(process.env.ENGINE_WORKERS ?? "1", 10);
+const enginePool = new EnginePool(Number.isNaN(poolSize) ? 1 : poolSize);
+if (enginePool.size > 0) enginePool.start();
+
+module.exports = enginePool;
@@ -0,0 +1,94 @@
+// Métricas das Sessões Instrumentadas
+// Para as sessões iniciadas com "profile": true, guarda o último evento 'metrics' emitido pelo
+// motor Python (p50/p95 por etapa, minutos/s, RSS; ver python-engine/profiling.py) e mede o
+// caminho de distribuição do Node (publicação SSE de cada evento). O endpoint /api/metrics
+// agrega esses dados das sessões ativas. Sessões sem instrumentação não são medidas.
+
+const WINDOW = 1024; // Medições mais recentes do broadcast usadas nos percentis
+
+// Amostras de duração (ms) em buffer circular, com contagem e total acumulados
+class DurationStats {
+  constructor() {
+    this.samples = new Float64Array(WINDOW);
+    this.count = 0;
+    this.totalMs = 0;
+  }
+
+  record(ms) {
+    this.samples[this.count % WINDOW] = ms;
+    this.count++;
+    this.totalMs += ms;
+  }
+
+  summary() {
+    const n = Math.min(this.count, WINDOW);
+    if (n === 0) return { count: 0 };
+    const sorted = this.samples.slice(0, n).sort();
+    const percentile = (p) => sorted[Math.min(n - 1, Math.floor(p * n))];
+    return {
+      count: this.count,
+      total_ms: this.totalMs,
+      mean_ms: this.totalMs / this.count,
+      p50_ms: percentile(0.5),
+      p95_ms: percentile(0.95),
+    };
+  }
+}
+
+class MetricsRegistry {
+  constructor() {
+    this.sessions = new Map(); // id da sessão -> { bearing, startedAt, engine, broadcast }
+  }
+
+  track(sessionId, bearing) {
+    this.sessions.set(sessionId, {
+      bearing,
+      startedAt: new Date().toISOString(),
+      engine: null,
+      broadcast: new DurationStats(),
+    });
+  }
+
+  untrack(sessionId) {
+    this.sessions.delete(sessionId);
+  }
+
+  isTracked(sessionId) {
+    return this.sessions.has(sessionId);
+  }
+
+  recordEngine(sessionId, event) {
+    const session = this.sessions.get(sessionId);
+    if (session) session.engine = event;
+  }
+
+  recordBroadcast(sessionId, ms) {
+    const session = this.sessions.get(sessionId);
+    if (session) session.broadcast.record(ms);
+  }
+
+  // Visão agregada das sessões instrumentadas ativas e do processo Node
+  snapshot() {
+    const sessions = [...this.sessions.entries()].map(([id, s]) => ({
+      session: id,
+      bearing: s.bearing,
+      startedAt: s.startedAt,
+      engine: s.engine,
+      broadcast: s.broadcast.summary(),
+    }));
+    const reporting = sessions.filter((s) => s.engine);
+    return {
+      timestamp: new Date().toISOString(),
+      active_sessions: sessions.length,
+      total_minutes_per_s: reporting.reduce(
+        (sum, s) => sum + (s.engine.minutes_per_s || 0),
+        0,
+      ),
+      engine_rss_mb: reporting.reduce((sum, s) => sum + (s.engine.rss_mb || 0), 0),
+      node_rss_mb: process.memoryUsage().rss / 2 ** 20,
+      sessions,
+    };
+  }
+}
+
+module.exports = new MetricsRegistry();
@@ -0,0 +1,81 @@
+// Histórico das Execuções
+// Consulta o store de resultados do motor Python (ver python-engine/results_store.py): as
+// execuções gravadas e as séries de ESI/RUL de uma delas, completa ou em andamento, reduzidas
+// ao número de pontos pedido (mínimo e máximo de cada faixa de minutos). Atende os clientes que
+// se conectam depois do início de uma simulação. A consulta vai a um worker residente (ver
+// enginePool); sem pool, é executada pela linha de comando do results_store.py.
+const { execFile } = require("child_process");
+const path = require("path");
+const enginePool = require("./enginePool");
+
+const STORE_SCRIPT = path.join(
+  __dirname,
+  "..",
+  "..",
+  "python-engine",
+  "results_store.py",
+);
+const CLI_TIMEOUT_MS = 30000;
+
+// Executa results_store.py e devolve a resposta no mesmo formato do worker ({ result } ou { error })
+function runCli(args) {
+  return new Promise((resolve, reject) => {
+    execFile(
+      "python3",
+      [STORE_SCRIPT, ...args],
+      { timeout: CLI_TIMEOUT_MS, maxBuffer: 64 * 1024 * 1024 },
+      (err, stdout) => {
+        let output;
+        try {
+          output = JSON.parse(stdout);
+        } catch (e) {
+          return reject(err || e);
+        }
+        resolve(output && output.error ? output : { result: output });
+      },
+    );
+  });
+}
+
+// Status HTTP de cada código de erro do store (ver python-engine/worker.py); os demais são 500
+const ERROR_STATUS = { not_found: 404, disabled: 503 };
+
+async function query(message, cliArgs) {
+  const pending = enginePool.request(message);
+  const reply = pending ? await pending : await runCli(cliArgs);
+  if (reply.error) {
+    const error = new Error(reply.error);
+    error.statusCode = ERROR_STATUS[reply.code] || 500;
+    throw error;
+  }
+  return reply.result;
+}
+
+// Execuções gravadas (de um rolamento, se informado), da mais recente para a mais antiga
+exports.runs = (bearingName) =>
+  query(
+    { op: "runs", bearing_name: bearingName || null },
+    bearingName ? ["runs", bearingName] : ["runs"],
+  );
+
+// options: { run, from, to, points } (todos opcionais; sem run, a execução mais recente do rolamento)
+exports.history = (bearingName, options = {}) => {
+  const { run, from, to, points } = options;
+  const args = ["history"];
+  if (bearingName) args.push(bearingName);
+  if (run) args.push("--run", run);
+  if (from) args.push("--from", String(from));
+  if (to) args.push("--to", String(to));
+  if (points) args.push("--points", String(points));
+  return query(
+    {
+      op: "history",
+      bearing_name: bearingName || null,
+      run: run || null,
+      from: from || null,
+      to: to || null,
+      points: points || null,
+    },
+    args,
+  );
+};
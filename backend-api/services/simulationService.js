@@ -1,23 +1,112 @@
 // Camada de Serviço
-// Encapsula a lógica de negócio do backend, como o gerenciamento do processo filho.
+// Encapsula a lógica de negócio do backend, como o gerenciamento dos processos filhos.
+// Cada simulação é uma sessão com ID próprio; até MAX_SIMULATIONS sessões rodam ao mesmo
+// tempo e as demais aguardam em uma fila, na ordem em que foram pedidas.
 const { spawn } = require("child_process");
 const path = require("path");
 const { EventEmitter } = require("events");
+const enginePool = require("./enginePool");
+const metricsRegistry = require("./metricsRegistry");
+const {
+  LineFramer,
+  BinaryFrameDecoder,
+  LOG_PREFIX,
+} = require("./engineFraming");
+
+const MAX_SIMULATIONS = parseInt(process.env.MAX_SIMULATIONS ?? "2", 10); // Sessões simultâneas
+const MAX_QUEUED = parseInt(process.env.MAX_QUEUED_SIMULATIONS ?? "10", 10); // Sessões aguardando
 
 class SimulationService extends EventEmitter {
   constructor() {
     super();
-    this.pythonProcess = null;
-    this.currentBearing = null;
+    this.sessions = new Map(); // id -> sessão (em execução ou na fila)
+    this.queue = []; // IDs das sessões aguardando vaga
+    this.nextId = 1;
+
+    enginePool.on("message", (message) => this.handleWorkerMessage(message));
+    enginePool.on("stderr", (data, job) => {
+      if (job && this.sessions.has(job)) this.emit("error", job, data);
+      else console.error(`Worker Python (stderr): ${data.toString()}`);
+    });
+  }
+
+  get runningCount() {
+    let count = 0;
+    this.sessions.forEach((s) => {
+      if (s.status === "running") count++;
+    });
+    return count;
   }
 
-  start(bearingName, basePath) {
-    if (this.pythonProcess) {
-      const error = new Error("Uma simulação já está em andamento.");
-      error.statusCode = 409; // Conflict
+  // options: { pacing, speed, rate, startMinute, endMinute, resume, profile } (todos opcionais)
+  start(bearingName, basePath, options = {}) {
+    if (this.runningCount >= MAX_SIMULATIONS && this.queue.length >= MAX_QUEUED) {
+      const error = new Error(
+        "Limite de simulações atingido e fila de espera cheia.",
+      );
+      error.statusCode = 429; // Too Many Requests
       throw error;
     }
 
+    const session = {
+      id: `${Date.now().toString(36)}-${this.nextId++}`,
+      bearing: bearingName,
+      basePath,
+      options,
+      status: "queued",
+      pythonProcess: null,
+      inWorker: false, // Executada por um worker residente (ver enginePool)
+      createdAt: new Date().toISOString(),
+    };
+    this.sessions.set(session.id, session);
+
+    if (this.runningCount < MAX_SIMULATIONS) {
+      this.launch(session);
+      return {
+        message: `Simulação para ${bearingName} iniciada.`,
+        session: session.id,
+        status: session.status,
+      };
+    }
+
+    this.queue.push(session.id);
+    console.log(
+      `Simulação ${session.id} (${bearingName}) na fila, posição ${this.queue.length}.`,
+    );
+    return {
+      message: `Simulação para ${bearingName} na fila.`,
+      session: session.id,
+      status: session.status,
+      position: this.queue.length,
+    };
+  }
+
+  launch(session) {
+    session.status = "running";
+    session.startedAt = new Date().toISOString();
+
+    // Preferencialmente usa um worker residente; sem worker livre, cai no spawn por simulação
+    const { pacing, speed, rate, startMinute, endMinute, resume, profile } =
+      session.options;
+    if (profile) metricsRegistry.track(session.id, session.bearing);
+    const params = {
+      bearing_name: session.bearing,
+      base_path: session.basePath,
+      use_custom_fdt: true,
+      pacing,
+      speed,
+      rate,
+      start_minute: startMinute,
+      end_minute: endMinute,
+      resume: Boolean(resume),
+      profile: Boolean(profile),
+    };
+    if (enginePool.runJob(session.id, params)) {
+      console.log(`Simulação ${session.id} enviada ao worker Python residente.`);
+      session.inWorker = true;
+      return;
+    }
+
     const scriptPath = path.join(
       __dirname,
       "..",
@@ -27,58 +116,172 @@ class SimulationService extends EventEmitter {
     );
     const args = [
       scriptPath,
-      bearingName,
+      session.bearing,
       "--base_path",
-      basePath,
+      session.basePath,
       "--use_custom_fdt",
+      "--protocol",
+      "binary",
     ];
-    // const args = [scriptPath, bearingName, "--base_path", basePath];
+    if (pacing) args.push("--pacing", pacing);
+    if (speed) args.push("--speed", String(speed));
+    if (rate) args.push("--rate", String(rate));
+    if (startMinute) args.push("--start_minute", String(startMinute));
+    if (endMinute) args.push("--end_minute", String(endMinute));
+    if (resume) args.push("--resume");
+    if (profile) args.push("--profile");
+    // const args = [scriptPath, session.bearing, "--base_path", session.basePath];
 
     console.log(`Iniciando: python3 ${args.join(" ")}`);
-    this.pythonProcess = spawn("python3", args);
-    this.currentBearing = bearingName;
+    const pythonProcess = spawn("python3", args);
+    session.pythonProcess = pythonProcess;
 
-    // Emite eventos que o controller pode ouvir
-    this.pythonProcess.stdout.on("data", (data) => this.emit("data", data));
-    this.pythonProcess.stderr.on("data", (data) => this.emit("error", data));
-    this.pythonProcess.on("close", (code) => this.handleClose(code));
-    this.pythonProcess.on("error", (err) => this.handleProcessError(err));
+    // stdout: eventos no protocolo binário; stderr: diagnósticos (LOG_PREFIX) e erros
+    const events = new BinaryFrameDecoder(session.bearing, (event) =>
+      this.emit("event", session.id, event),
+    );
+    const stderrLines = new LineFramer((line) =>
+      this.handleStderrLine(session.id, line),
+    );
 
-    return { message: `Simulação para ${bearingName} iniciada.` };
+    // Emite eventos que o controller pode ouvir
+    pythonProcess.stdout.on("data", (data) => events.push(data));
+    pythonProcess.stderr.on("data", (data) => {
+      stderrLines.push(data);
+      this.flushStderr(session.id);
+    });
+    pythonProcess.on("close", (code) => {
+      stderrLines.end();
+      this.flushStderr(session.id);
+      this.handleClose(session.id, code);
+    });
+    pythonProcess.on("error", (err) => this.handleProcessError(session.id, err));
   }
 
-  stop() {
-    if (!this.pythonProcess) {
-      return { message: "Nenhuma simulação em andamento para parar." };
+  // Para uma sessão. Sem ID, para todas as sessões ativas e esvazia a fila.
+  stop(sessionId) {
+    if (!sessionId) {
+      if (this.sessions.size === 0) {
+        return { message: "Nenhuma simulação em andamento para parar." };
+      }
+      [...this.queue].forEach((id) => this.stop(id));
+      [...this.sessions.keys()].forEach((id) => this.stop(id));
+      return { message: "Comando de parada enviado a todas as simulações." };
+    }
+
+    const session = this.sessions.get(sessionId);
+    if (!session) {
+      const error = new Error(`Sessão não encontrada: ${sessionId}`);
+      error.statusCode = 404;
+      throw error;
+    }
+
+    if (session.status === "queued") {
+      this.queue = this.queue.filter((id) => id !== sessionId);
+      console.log(`Simulação ${sessionId} removida da fila.`);
+      this.handleClose(sessionId, null);
+      return { message: "Simulação removida da fila." };
+    }
+    if (session.inWorker) {
+      console.log(`Comando de cancelamento enviado ao worker Python (${sessionId}).`);
+      enginePool.cancel(sessionId);
+    } else {
+      console.log(`Comando de parada enviado para a simulação ${sessionId}.`);
+      session.pythonProcess.kill("SIGINT"); // Envia sinal para encerramento
     }
-    console.log("Comando de parada enviado para a simulação.");
-    this.pythonProcess.kill("SIGINT"); // Envia sinal para encerramento
     return { message: "Comando de parada enviado." };
   }
 
-  handleClose(code) {
+  // True se a sessão está em execução ou na fila
+  has(sessionId) {
+    return this.sessions.has(sessionId);
+  }
+
+  list() {
+    return [...this.sessions.values()].map((s) => ({
+      session: s.id,
+      bearing: s.bearing,
+      status: s.status,
+      position:
+        s.status === "queued" ? this.queue.indexOf(s.id) + 1 : undefined,
+      createdAt: s.createdAt,
+      startedAt: s.startedAt,
+    }));
+  }
+
+  // Diagnósticos viram eventos log_python; as demais linhas (ex.: tracebacks) são agrupadas
+  // e enviadas como um único erro por chunk (ver flushStderr)
+  handleStderrLine(sessionId, line) {
+    if (line.startsWith(LOG_PREFIX)) {
+      this.emit("event", sessionId, {
+        type: "log_python",
+        channel: "stdout",
+        message: line.slice(LOG_PREFIX.length),
+      });
+      return;
+    }
+    const session = this.sessions.get(sessionId);
+    if (session) session.stderrLines = [...(session.stderrLines || []), line];
+  }
+
+  flushStderr(sessionId) {
+    const session = this.sessions.get(sessionId);
+    if (!session || !session.stderrLines) return;
+    this.emit("error", sessionId, session.stderrLines.join("\n"));
+    session.stderrLines = null;
+  }
+
+  // Traduz as mensagens do worker residente para os mesmos eventos do processo avulso
+  handleWorkerMessage(message) {
+    const session = this.sessions.get(message.job);
+    if (!session || !session.inWorker) return;
+    if (message.type === "event") {
+      this.emit("event", session.id, message.event);
+    } else if (message.type === "log") {
+      this.emit("event", session.id, {
+        type: "log_python",
+        channel: "stdout",
+        message: message.message,
+      });
+    } else if (message.type === "job_end") {
+      // Cancelamento equivale ao SIGINT do processo avulso (código null)
+      this.handleClose(session.id, message.code);
+    }
+  }
+
+  handleClose(sessionId, code) {
+    const session = this.sessions.get(sessionId);
+    if (!session) return;
     console.log(
-      `Processo Python para ${this.currentBearing} finalizado com código ${code}`,
+      `Processo Python para ${session.bearing} (${sessionId}) finalizado com código ${code}`,
     );
     const message = {
       type: "simulation_end",
-      bearing: this.currentBearing,
+      bearing: session.bearing,
       code: code,
     };
-    this.emit("end", message);
-    this.pythonProcess = null;
-    this.currentBearing = null;
+    this.sessions.delete(sessionId);
+    this.emit("end", sessionId, message);
+    this.launchQueued();
   }
 
-  handleProcessError(err) {
+  handleProcessError(sessionId, err) {
     console.error("Falha ao iniciar o processo Python:", err);
     const systemError = {
       type: "error_system",
       message: `Falha ao iniciar Python: ${err.message}`,
     };
-    this.emit("error", systemError);
-    this.pythonProcess = null;
-    this.currentBearing = null;
+    // O 'close' do processo vem em seguida (também após uma falha no spawn) e encerra a sessão
+    // em handleClose: simulation_end, liberação do buffer SSE e avanço da fila
+    this.emit("error", sessionId, systemError);
+  }
+
+  // Ocupa as vagas livres com as sessões mais antigas da fila
+  launchQueued() {
+    while (this.queue.length > 0 && this.runningCount < MAX_SIMULATIONS) {
+      const session = this.sessions.get(this.queue.shift());
+      if (session) this.launch(session);
+    }
   }
 }
 
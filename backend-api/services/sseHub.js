@@ -0,0 +1,167 @@
+// Distribuição de Eventos SSE
+// Mantém, para cada sessão (e para o fluxo global com todas as sessões), um buffer circular
+// dos eventos recentes com IDs crescentes. Um cliente que reconecta com o cabeçalho
+// Last-Event-ID recebe o que perdeu. Cada evento é serializado uma única vez; a escrita
+// respeita o 'drain' do socket e clientes que acumulam dados demais são desconectados
+// (ao reconectar, retomam a partir do buffer).
+
+const REPLAY_SIZE = parseInt(process.env.SSE_REPLAY_SIZE ?? "2000", 10); // Eventos guardados por fluxo
+const CLIENT_HIGH_WATER_BYTES = parseInt(
+  process.env.SSE_CLIENT_HIGH_WATER_BYTES ?? String(1024 * 1024),
+  10,
+); // Dados pendentes acima disso desconectam o cliente
+const RETENTION_MS = 5 * 60 * 1000; // Tempo que o buffer de uma sessão encerrada fica disponível
+const GLOBAL_STREAM = "*";
+
+class EventStream {
+  constructor() {
+    this.frames = new Array(REPLAY_SIZE); // Buffer circular de { id, frame }
+    this.nextId = 1;
+    this.clients = new Set();
+    this.info = {}; // Dados da sessão mantidos junto com o buffer (ex.: execução gravada)
+  }
+
+  // Guarda o evento no buffer e retorna o quadro SSE pronto para envio
+  append(json) {
+    const id = this.nextId++;
+    const frame = `id: ${id}\ndata: ${json}\n\n`;
+    this.frames[id % REPLAY_SIZE] = { id, frame };
+    return frame;
+  }
+
+  get oldestId() {
+    return Math.max(1, this.nextId - REPLAY_SIZE);
+  }
+
+  // Quadros com ID maior que lastId ainda presentes no buffer
+  since(lastId) {
+    const frames = [];
+    for (let id = Math.max(lastId + 1, this.oldestId); id < this.nextId; id++) {
+      frames.push(this.frames[id % REPLAY_SIZE].frame);
+    }
+    return frames;
+  }
+}
+
+// Um cliente conectado e o que ainda não foi aceito pelo socket dele
+class SseClient {
+  constructor(id, res) {
+    this.id = id;
+    this.res = res;
+    this.pending = [];
+    this.pendingBytes = 0;
+    this.waitingDrain = false;
+    this.closed = false;
+    res.on("drain", () => this.flush());
+  }
+
+  send(frame) {
+    if (this.closed) return;
+    if (this.waitingDrain) {
+      this.pending.push(frame);
+      this.pendingBytes += Buffer.byteLength(frame);
+      if (this.pendingBytes > CLIENT_HIGH_WATER_BYTES) {
+        console.warn(
+          `Cliente ${this.id} não acompanha o fluxo (${this.pendingBytes} bytes pendentes). Desconectando.`,
+        );
+        this.close();
+      }
+      return;
+    }
+    this.waitingDrain = !this.res.write(frame);
+  }
+
+  flush() {
+    this.waitingDrain = false;
+    while (this.pending.length > 0 && !this.waitingDrain) {
+      const frame = this.pending.shift();
+      this.pendingBytes -= Buffer.byteLength(frame);
+      this.waitingDrain = !this.res.write(frame);
+    }
+  }
+
+  close() {
+    this.closed = true;
+    this.pending = [];
+    this.pendingBytes = 0;
+    this.res.end();
+  }
+}
+
+class SseHub {
+  constructor() {
+    this.streams = new Map(); // id da sessão (ou GLOBAL_STREAM) -> EventStream
+    this.nextClientId = 1;
+  }
+
+  stream(key) {
+    if (!this.streams.has(key)) this.streams.set(key, new EventStream());
+    return this.streams.get(key);
+  }
+
+  // Publica um evento de uma sessão no fluxo dela e no fluxo global
+  publish(sessionId, data) {
+    const json = JSON.stringify({ ...data, session: sessionId });
+    for (const key of [sessionId, GLOBAL_STREAM]) {
+      const stream = this.stream(key);
+      const frame = stream.append(json);
+      stream.clients.forEach((client) => client.send(frame));
+    }
+  }
+
+  // Conecta um cliente SSE, reenviando os eventos posteriores ao Last-Event-ID recebido
+  subscribe(sessionId, req, res) {
+    const key = sessionId || GLOBAL_STREAM;
+    const stream = this.stream(key);
+    const client = new SseClient(this.nextClientId++, res);
+
+    const lastEventId = parseInt(
+      req.headers?.["last-event-id"] ?? req.query?.lastEventId,
+      10,
+    );
+    if (!Number.isNaN(lastEventId)) {
+      if (lastEventId + 1 < stream.oldestId) {
+        // Parte do que o cliente perdeu já saiu do buffer
+        client.send(
+          `data: ${JSON.stringify({ type: "replay_gap", session: sessionId, first_available_id: stream.oldestId })}\n\n`,
+        );
+      }
+      stream.since(lastEventId).forEach((frame) => client.send(frame));
+    }
+    stream.clients.add(client);
+
+    req.on("close", () => {
+      client.closed = true;
+      stream.clients.delete(client);
+    });
+    return client;
+  }
+
+  // Associa dados ao fluxo de uma sessão; ficam disponíveis enquanto o buffer for retido
+  annotate(sessionId, info) {
+    Object.assign(this.stream(sessionId).info, info);
+  }
+
+  info(sessionId) {
+    const stream = this.streams.get(sessionId);
+    return stream ? stream.info : null;
+  }
+
+  // True se a sessão tem um fluxo (ativo ou retido para reconexões após o fim)
+  has(sessionId) {
+    return this.streams.has(sessionId);
+  }
+
+  // Após o fim de uma sessão, o buffer fica disponível por RETENTION_MS para reconexões
+  release(sessionId) {
+    const stream = this.streams.get(sessionId);
+    if (!stream) return;
+    const timer = setTimeout(() => {
+      if (stream.clients.size === 0) this.streams.delete(sessionId);
+      else this.release(sessionId); // Ainda há clientes conectados: adia a remoção
+    }, RETENTION_MS);
+    timer.unref();
+  }
+}
+
+module.exports = new SseHub();
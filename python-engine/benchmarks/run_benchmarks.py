@@ -0,0 +1,231 @@
+# Suíte de Benchmarks do Motor Python
+# Mede o tempo de cada etapa do processamento (leitura, envelope, AES, ESI, FDT, EKF) e a vazão
+# ponta a ponta da simulação (minutos/s) para rolamentos de diferentes comprimentos, sobre um
+# dataset sintético no formato XJTU-SY (ver synthetic_dataset.py). Os resultados podem ser
+# gravados em JSON e comparados com uma execução anterior, sinalizando regressões.
+#
+# Os caches persistentes (gamma_bar, características por minuto, checkpoints) são isolados em um
+# diretório temporário e o cache de características fica desativado, para que cada medição
+# reflita o processamento real.
+#
+# Uso:
+#   python benchmarks/run_benchmarks.py [--data /caminho/synthetic] [--lengths 30,90] [--repeat 5] \
+#       [--save atual.json] [--compare base.json] [--threshold 0.15]
+
+import argparse
+import atexit
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Isola os caches antes de importar o motor (config lê o ambiente na importação)
+os.environ["BEARING_CACHE_DIR"] = tempfile.mkdtemp(prefix="bearing-bench-")
+atexit.register(shutil.rmtree, os.environ["BEARING_CACHE_DIR"], ignore_errors=True)
+os.environ["BEARING_FEATURE_CACHE"] = "0"
+os.environ["BEARING_RESULTS_STORE"] = "0"  # Execuções repetidas não podem ser servidas do store
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import scipy
+import config
+import processing
+import synthetic_dataset
+from feature_cache import MinuteFeatureExtractor
+from incremental import CenteredMovingAverage, EKFState, StreamingFDTDetector
+from pacing import Pacer
+from repository import BearingDataRepository, MemmapBearingDataRepository
+from simulation import BearingSimulator
+from threshold_store import GammaBarStore
+
+BENCH_BEARING = "Bearing1_2"  # Rolamento do artigo usado nas medições (condição 35Hz12kN)
+MIN_SAMPLE_S = 0.05  # Duração mínima de cada amostra; chamadas rápidas são repetidas dentro dela
+
+
+def measure(fn, repeat: int) -> dict:
+    """
+    Mede fn() 'repeat' vezes (após uma execução de aquecimento) e retorna a mediana e o mínimo
+    do tempo por chamada. Chamadas curtas são agrupadas até MIN_SAMPLE_S por amostra.
+    """
+    started = time.perf_counter()
+    fn()
+    number = max(1, int(MIN_SAMPLE_S / max(time.perf_counter() - started, 1e-9)))
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) / number)
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "repeat": repeat, "number": number}
+
+
+def prepare_dataset(data_path: str | None, minutes: int) -> str:
+    """Usa o dataset informado ou gera um dataset sintético temporário com 'minutes' minutos por referência."""
+    if data_path:
+        return data_path
+    data_path = os.path.join(os.environ["BEARING_CACHE_DIR"], "dataset")
+    for bearing_name in config.BEARINGS_FOR_GAMMA_BAR_CALC[config.ARTICLE_BEARINGS_MAP[BENCH_BEARING]["condition_key"]]:
+        synthetic_dataset.write_bearing(data_path, bearing_name, minutes)
+    print(f"Dataset sintético gerado em {data_path} ({minutes} minutos por rolamento).", file=sys.stderr)
+    return data_path
+
+
+def stage_benchmarks(repository, length: int, repeat: int) -> dict:
+    """Tempo de cada etapa por chamada; FDT e EKF são medidos sobre a série completa de 'length' minutos."""
+    condition = config.ARTICLE_BEARINGS_MAP[BENCH_BEARING]["condition_key"]
+    metadata = config.ARTICLE_BEARINGS_MAP[BENCH_BEARING]
+    results = {}
+
+    minute = min(length, metadata["t_eol_true"])
+    results["read_csv"] = measure(lambda: repository.get_signal_for_minute(condition, BENCH_BEARING, minute), repeat)
+    signal = repository.get_signal_for_minute(condition, BENCH_BEARING, minute)
+
+    results["envelope"] = measure(lambda: processing.get_envelope_from_signal(signal), repeat)
+    envelope = processing.get_envelope_from_signal(signal)
+    results["compute_aes"] = measure(lambda: processing.compute_aes(envelope, config.FS, config.AES_L, config.AES_OVERLAP), repeat)
+    S_e_amp, f_aes = processing.compute_aes(envelope, config.FS, config.AES_L, config.AES_OVERLAP)
+    results["compute_esi"] = measure(lambda: processing.compute_esi(S_e_amp, f_aes, condition), repeat)
+    results["minute_features"] = measure(lambda: MinuteFeatureExtractor.compute(signal, condition), repeat)
+
+    # Séries completas do rolamento (AES e ESI suavizado), calculadas uma vez para as etapas seguintes
+    features = MinuteFeatureExtractor(repository)
+    spectra, smoother = [], CenteredMovingAverage(window=4, capacity=length)
+    for _, S, esi, _ in features.iter_features(condition, BENCH_BEARING, range(1, length + 1)):
+        spectra.append(S if S is not None else np.zeros(len(f_aes)))
+        smoother.append(esi if not np.isnan(esi) else 0.0)
+    amps, z = np.array(spectra), smoother.history.copy()
+    fcf = config.FCFS[condition]
+
+    fdt_input = {"aes_frequencies": f_aes, "aes_amplitudes": amps, "fcf": fcf}
+    results["detect_fdt"] = measure(lambda: processing.detect_fdt(fdt_input), repeat)
+
+    def streaming_fdt():
+        detector = StreamingFDTDetector(f_aes, fcf)
+        for S in amps:
+            detector.update(S)
+    results["streaming_fdt"] = measure(streaming_fdt, repeat)
+
+    t_start = max(0, (metadata["t_fdt"] - config.N_PRIOR_FDT) - 1)
+    points = [n for n in range(1, length + 1) if n - 1 > t_start and n % 3 == 0]
+    gamma_bar = float(z.max())
+    results["run_ekf_and_get_rul"] = measure(lambda: processing.run_ekf_and_get_rul(
+        z, t_start, points, gamma_bar, metadata["vt"], metadata["wt"], length), repeat)
+
+    def incremental_ekf():
+        ekf = EKFState(t_start, metadata["vt"], metadata["wt"])
+        for n in points:
+            ekf.rul(z, n, gamma_bar)
+    results["ekf_incremental"] = measure(incremental_ekf, repeat)
+
+    for name in ("detect_fdt", "streaming_fdt", "run_ekf_and_get_rul", "ekf_incremental"):
+        results[name]["minutes"] = length  # Só são comparáveis entre execuções com o mesmo comprimento
+    return results
+
+
+def end_to_end_benchmarks(repository, lengths: list[int], repeat: int) -> dict:
+    """Vazão da simulação completa (leitura + características + suavização + FDT/EKF), sem pausas."""
+    gamma_store = GammaBarStore(repository, features=MinuteFeatureExtractor(repository))
+    gamma_store.get_gamma_bar()  # Resolvido fora da medição (custo de inicialização, não por minuto)
+
+    results = {}
+    for length in lengths:
+        def run():
+            simulator = BearingSimulator(BENCH_BEARING, repository, gamma_store=gamma_store)
+            simulator.pacer = Pacer.from_policy("batch")
+            simulator.checkpoint_every = 0
+            for _ in simulator.run_incremental_simulation(end_minute=length):
+                pass
+        result = measure(run, repeat)
+        result["minutes"] = length
+        result["minutes_per_s"] = length / result["median_s"]
+        results[f"simulation_{length}min"] = result
+    return results
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": commit, "python": platform.python_version(),
+        "numpy": np.__version__, "scipy": scipy.__version__, "machine": platform.machine(), "cpus": os.cpu_count(),
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Imprime a comparação com uma execução anterior e retorna os benchmarks que regrediram."""
+    regressions = []
+    print(f"\n{'benchmark':<26} {'base (ms)':>12} {'atual (ms)':>12} {'razão':>8}")
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<26} {'-':>12} {result['median_s'] * 1e3:>12.3f} {'novo':>8}")
+            continue
+        if base.get("minutes") != result.get("minutes"):
+            print(f"{name:<26} {base['median_s'] * 1e3:>12.3f} {result['median_s'] * 1e3:>12.3f} {'n/c':>8}  (comprimentos diferentes)")
+            continue
+        ratio = result["median_s"] / base["median_s"]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  REGRESSÃO"
+        elif ratio < 1 - threshold:
+            flag = "  melhora"
+        print(f"{name:<26} {base['median_s'] * 1e3:>12.3f} {result['median_s'] * 1e3:>12.3f} {ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks das etapas e da simulação ponta a ponta.")
+    parser.add_argument("--data", default=None,
+                        help="Dataset (real ou gerado por synthetic_dataset.py). Se omitido, um dataset sintético temporário é gerado.")
+    parser.add_argument("--store_path", default=None, help="Dataset empacotado por signal_store.py (mede a leitura por memmap).")
+    parser.add_argument("--lengths", default="30,90",
+                        help="Comprimentos (minutos) das simulações ponta a ponta, separados por vírgula (default: 30,90).")
+    parser.add_argument("--repeat", type=int, default=5, help="Amostras por benchmark (default: 5).")
+    parser.add_argument("--save", default=None, help="Grava os resultados em JSON.")
+    parser.add_argument("--compare", default=None, help="JSON de uma execução anterior para comparação.")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Aumento relativo da mediana considerado regressão (default: 0.15).")
+    args = parser.parse_args()
+
+    lengths = sorted(int(v) for v in args.lengths.split(","))
+    data_path = prepare_dataset(args.data, max(lengths))
+    repository = BearingDataRepository(data_path)
+
+    results = stage_benchmarks(repository, max(lengths), args.repeat)
+    if args.store_path:
+        packed = MemmapBearingDataRepository(data_path, args.store_path)
+        condition = config.ARTICLE_BEARINGS_MAP[BENCH_BEARING]["condition_key"]
+        results["read_memmap"] = measure(lambda: packed.get_signal_for_minute(condition, BENCH_BEARING, 1), args.repeat)
+    results.update(end_to_end_benchmarks(repository, lengths, args.repeat))
+
+    report = {"environment": environment(), "results": results}
+    print(f"{'benchmark':<26} {'mediana (ms)':>14} {'mínimo (ms)':>14} {'minutos/s':>10}")
+    for name, result in results.items():
+        rate = f"{result['minutes_per_s']:.1f}" if "minutes_per_s" in result else ""
+        print(f"{name:<26} {result['median_s'] * 1e3:>14.3f} {result['min_s'] * 1e3:>14.3f} {rate:>10}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressões acima de {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# Gerador de Dataset Sintético no Formato XJTU-SY
+# Escreve uma árvore <base>/<condição>/<rolamento>/<minuto>.csv com a mesma estrutura do dataset
+# real (cabeçalho e 2 canais x 32768 amostras em g), para medir desempenho e reproduzir a
+# simulação sem o dataset original.
+#
+# Cada minuto tem ruído de fundo e, a partir do início da falha, um tom de falha impulsivo: uma
+# ressonância estrutural modulada pela FCF da componente defeituosa (com harmônicas), cuja
+# amplitude cresce exponencialmente até o fim de vida. Para os rolamentos de
+# ARTICLE_BEARINGS_DATA, o início é o t_fdt e o fim de vida é o t_eol_true do artigo, então o FDT
+# e o RUL se comportam como nos dados reais. Os sinais são determinísticos (semente, rolamento, minuto).
+#
+# Uso:
+#   python benchmarks/synthetic_dataset.py --output /caminho/synthetic [--minutes N] [--workers N] [Bearing1_2 ...]
+
+import argparse
+import os
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+HEADER = "Horizontal_vibration_signals,Vertical_vibration_signals\n"
+NOISE_G = 0.3  # Desvio padrão do ruído de fundo (g)
+RESONANCE_HZ = 3000.0  # Ressonância excitada pelos impactos (acima do corte do passa-alta do envelope)
+FAULT_START_G = 0.3  # Amplitude no início da falha (g); detectável pelo FDT com os parâmetros padrão
+FAULT_EOL_G = 2.0  # Amplitude no fim de vida (g)
+IMPULSE_SHARPNESS = 8  # Expoente do trem de impulsos; valores maiores geram mais harmônicas da FCF
+FAULT_COMPONENT = {"Bearing2_1": "BPFI", "Bearing3_3": "BPFI", "Bearing3_4": "BPFI"}  # Demais: pista externa (BPFO)
+
+
+def condition_for(bearing_name: str) -> str:
+    return config.CONDITION_BY_BEARING_GROUP[bearing_name[len("Bearing")]]
+
+
+def fault_profile(bearing_name: str) -> tuple[int, int]:
+    """(minuto de início da falha, minuto de fim de vida) do rolamento."""
+    article = config.ARTICLE_BEARINGS_MAP.get(bearing_name)
+    if article:
+        return article["t_fdt"], article["t_eol_true"]
+    num_files = config.NUM_FILES_DICT_FULL[bearing_name]
+    return int(num_files * 0.6), num_files
+
+
+def fault_amplitude(minute: int, onset: int, eol: int) -> float:
+    """Amplitude (g) do tom de falha: zero antes do início, crescimento exponencial até o fim de vida."""
+    if minute < onset:
+        return 0.0
+    rate = np.log(FAULT_EOL_G / FAULT_START_G) / max(1, eol - onset)
+    return FAULT_START_G * np.exp(rate * (minute - onset))
+
+
+def generate_minute(bearing_name: str, minute: int, seed: int = 0) -> np.ndarray:
+    """Sinais (horizontal, vertical) de um minuto, em g, shape (EXPECTED_LEN, 2)."""
+    rng = np.random.default_rng([seed, zlib.crc32(bearing_name.encode()), minute])
+    t = np.arange(config.EXPECTED_LEN) / config.FS
+    signals = rng.normal(0.0, NOISE_G, size=(config.EXPECTED_LEN, 2))
+
+    onset, eol = fault_profile(bearing_name)
+    amplitude = fault_amplitude(minute, onset, eol)
+    if amplitude > 0:
+        fcf = config.FCFS[condition_for(bearing_name)][FAULT_COMPONENT.get(bearing_name, "BPFO")]
+        impulses = np.abs(np.cos(np.pi * fcf * t)) ** IMPULSE_SHARPNESS
+        tone = amplitude * impulses * np.sin(2 * np.pi * RESONANCE_HZ * t + rng.uniform(0, 2 * np.pi))
+        signals[:, 0] += tone
+        signals[:, 1] += 0.5 * tone  # O canal vertical recebe parte da vibração
+    return signals
+
+
+def write_minute(base_path: str, bearing_name: str, minute: int, seed: int = 0) -> str:
+    """Escreve o CSV de um minuto e retorna o caminho."""
+    directory = os.path.join(base_path, condition_for(bearing_name), bearing_name)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{minute}.csv")
+    signals = generate_minute(bearing_name, minute, seed)
+    with open(path, "w") as f:
+        f.write(HEADER)
+        f.write(("%.4f,%.4f\n" * len(signals)) % tuple(signals.ravel()))  # Muito mais rápido que np.savetxt
+    return path
+
+
+def write_bearing(base_path: str, bearing_name: str, minutes: int = None, seed: int = 0, executor=None) -> int:
+    """
+    Escreve os minutos 1..minutes de um rolamento (default: todos os de NUM_FILES_DICT_FULL).
+    Os minutos não escritos são tratados pelo repositório como arquivos ausentes.
+    """
+    total = config.NUM_FILES_DICT_FULL[bearing_name]
+    count = total if minutes is None else min(minutes, total)
+    if executor is not None:
+        list(executor.map(write_minute, [base_path] * count, [bearing_name] * count, range(1, count + 1), [seed] * count,
+                          chunksize=8))
+    else:
+        for minute in range(1, count + 1):
+            write_minute(base_path, bearing_name, minute, seed)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um dataset sintético com a estrutura do XJTU-SY.")
+    parser.add_argument("bearings", nargs="*",
+                        help="Rolamentos a gerar (default: as referências do gamma_bar da condição 35Hz12kN).")
+    parser.add_argument("--output", required=True, help="Diretório base do dataset gerado.")
+    parser.add_argument("--minutes", type=int, default=None,
+                        help="Minutos gerados por rolamento (default: o número real de arquivos de cada um).")
+    parser.add_argument("--seed", type=int, default=0, help="Semente dos sinais (default: 0).")
+    parser.add_argument("--workers", type=int, default=1, help="Processos de escrita (default: 1).")
+    args = parser.parse_args()
+
+    bearings = args.bearings or config.BEARINGS_FOR_GAMMA_BAR_CALC["35Hz12kN"]
+    unknown = [b for b in bearings if b not in config.NUM_FILES_DICT_FULL]
+    if unknown:
+        parser.error(f"Rolamentos desconhecidos: {', '.join(unknown)}")
+
+    executor = ProcessPoolExecutor(args.workers) if args.workers > 1 else None
+    try:
+        for bearing_name in bearings:
+            count = write_bearing(args.output, bearing_name, args.minutes, args.seed, executor)
+            onset, eol = fault_profile(bearing_name)
+            print(f"{bearing_name}: {count} minutos escritos (falha a partir do minuto {onset}, fim de vida em {eol}).")
+    finally:
+        if executor:
+            executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Checkpoints da Simulação
+# Persiste periodicamente o estado de uma simulação em andamento (histórico de ESI, estado do
+# suavizador, do EKF e do detector de FDT, FDT resolvido, gamma_bar e último minuto emitido),
+# para que um processo interrompido (SIGINT do backend, queda) retome a partir do minuto
+# seguinte em vez de reprocessar o rolamento desde o minuto 1.
+#
+# Formato: um arquivo .npz por execução. Os arrays NumPy do estado são gravados como entradas
+# do arquivo (chaves "componente.campo") e os escalares em uma entrada JSON ("__meta__"), sem
+# pickle. A gravação é atômica: escreve em um arquivo temporário e o renomeia.
+
+import hashlib
+import json
+import os
+import numpy as np
+import config
+
+CHECKPOINT_VERSION = 1
+META_KEY = "__meta__"
+
+
+def checkpoint_path(identity: dict, directory: str = None) -> str:
+    """
+    Caminho do checkpoint de uma execução. 'identity' reúne tudo de que o estado depende
+    (rolamento, simulador, parâmetros); execuções com identidades diferentes não compartilham arquivo.
+    """
+    digest = hashlib.sha1(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(directory or config.CHECKPOINT_DIR, f"{identity['bearing']}-{digest}.npz")
+
+
+def _split(state: dict, prefix: str, arrays: dict) -> dict:
+    """Separa os arrays NumPy (recursivamente) do restante do estado, que vai para o JSON."""
+    meta = {}
+    for key, value in state.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, np.ndarray):
+            arrays[name] = value
+        elif isinstance(value, dict):
+            meta[key] = _split(value, f"{name}.", arrays)
+        else:
+            meta[key] = value
+    return meta
+
+
+def _join(meta: dict, prefix: str, arrays: dict) -> dict:
+    state = {}
+    for key, value in meta.items():
+        state[key] = _join(value, f"{prefix}{key}.", arrays) if isinstance(value, dict) else value
+    for name, array in arrays.items():
+        if name.startswith(prefix) and "." not in name[len(prefix):]:
+            state[name[len(prefix):]] = array
+    return state
+
+
+def save(path: str, state: dict) -> None:
+    """Grava o estado (dict com escalares, listas, dicts e arrays NumPy) de forma atômica."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    arrays = {}
+    meta = _split(state, "", arrays)
+    meta["version"] = CHECKPOINT_VERSION
+    # Escalares NumPy (np.float64, np.bool_) viram tipos nativos; floats fazem ida e volta exata no JSON
+    arrays[META_KEY] = np.array(json.dumps(meta, default=lambda o: o.item()))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load(path: str) -> dict | None:
+    """Lê um checkpoint. Retorna None se ele não existir ou for de outra versão do formato."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files}
+    meta = json.loads(str(arrays.pop(META_KEY)))
+    if meta.pop("version", None) != CHECKPOINT_VERSION:
+        return None
+    return _join(meta, "", arrays)
+
+
+def discard(path: str) -> None:
+    """Remove o checkpoint de uma execução concluída."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,13 +1,59 @@
 # Módulo de Configuração
 # Centraliza todas as constantes e parâmetros globais da simulação para fácil manutenção.
+import os
 
 # Parâmetros de Sinal
 FS = 25600  # Frequência de amostragem
 EXPECTED_LEN = 32768  # Comprimento esperado do sinal
 GRAV_ACCEL = 9.81  # Aceleração da gravidade
 
+# Parâmetros do Envelope
+ENVELOPE_FILTER_ORDER = 4  # Ordem do filtro Butterworth passa-alta
+ENVELOPE_CUTOFF_HZ = 1000.0  # Frequência de corte do passa-alta
+
+# Parâmetros do Espectro de Envelope (AES)
+AES_L = 8192  # Comprimento de cada segmento da FFT
+AES_OVERLAP = 2048  # Sobreposição entre segmentos consecutivos
+
 # Parâmetros de Simulação
 N_PRIOR_FDT = 10  # Número de minutos antes do FDT para iniciar o EKF
+RUL_MC_SAMPLES = 4096  # Trajetórias (ESI, b) sorteadas da posterior do EKF para as bandas P5/P50/P95 do RUL
+RUL_MC_SEED = 0  # Semente das trajetórias (bandas determinísticas entre execuções)
+
+# Leitura Antecipada (prefetch)
+PREFETCH_DEPTH = 4  # Minutos lidos/decodificados em segundo plano à frente do minuto atual (0 desativa)
+PREFETCH_WORKERS = 2  # Threads de leitura
+PREFETCH_MAX_BYTES = 64 * 1024 * 1024  # Teto de memória dos minutos em espera
+
+# Modo Frota
+FLEET_CHUNK_MINUTES = 64  # Minutos por tarefa enviada a cada worker do pool
+
+# Cache Persistente
+CACHE_DIR = os.environ.get("BEARING_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache"))
+GAMMA_BAR_STORE_PATH = os.path.join(CACHE_DIR, "gamma_bar.json")  # ESI máximo dos rolamentos de referência
+FEATURE_CACHE_PATH = os.path.join(CACHE_DIR, "features.sqlite")  # AES e ESI de cada minuto já processado
+FEATURE_CACHE_MAX_BYTES = 2 * 1024**3  # Acima disso, os minutos menos usados recentemente são descartados
+FEATURE_CACHE_ENABLED = os.environ.get("BEARING_FEATURE_CACHE", "1") != "0"
+RESULTS_STORE_PATH = os.path.join(CACHE_DIR, "results.sqlite")  # Séries de ESI/RUL de cada execução (ver results_store.py)
+RESULTS_STORE_ENABLED = os.environ.get("BEARING_RESULTS_STORE", "1") != "0"
+RESULTS_FLUSH_MINUTES = 10  # Minutos gravados por transação durante a simulação
+RESULTS_HISTORY_POINTS = 500  # Faixas padrão de uma consulta de histórico
+
+# Checkpoints (ver checkpoint.py)
+CHECKPOINT_DIR = os.path.join(CACHE_DIR, "checkpoints")  # Um arquivo .npz por execução interrompida ou parcial
+CHECKPOINT_INTERVAL_MINUTES = 10  # Minutos processados entre dois checkpoints (0 desativa)
+
+# Ingestão ao Vivo (ver live_source.py)
+LIVE_CHANNELS = 2  # Canais intercalados no fluxo (float32 little-endian, em g); o horizontal é o primeiro
+LIVE_BUFFER_MINUTES = 8  # Minutos completos mantidos no buffer circular à espera do processamento
+LIVE_OVERRUN_POLICY = "drop_oldest"  # Buffer cheio: 'drop_oldest', 'drop_newest' ou 'block' (contrapressão)
+LIVE_MAX_MINUTES = 100_000  # Teto de minutos de uma sessão ao vivo (dimensiona o histórico pré-alocado)
+LIVE_RECV_BYTES = 256 * 1024  # Buffer fixo de recepção dos produtores
+LIVE_TAIL_POLL_S = 0.1  # Intervalo entre leituras de um arquivo acompanhado sem dados novos
+
+# Instrumentação (ver profiling.py)
+PROFILE_INTERVAL_MINUTES = 10  # Minutos entre dois eventos 'metrics'
+PROFILE_WINDOW = 1024  # Medições mais recentes por etapa usadas nos percentis p50/p95
 
 # Dicionários de Metadados
 BEARINGS_FOR_GAMMA_BAR_CALC = {
@@ -22,6 +68,10 @@ FCFS = { # Frequências Características de Falha (FCFs)
     "40Hz10kN": {"FTF": 15.42, "BSF": 82.66, "BPFO": 123.32, "BPFI": 196.68},
 }
 
+CONDITION_BY_BEARING_GROUP = { # Condição de operação de cada grupo de rolamentos (BearingX_*)
+    "1": "35Hz12kN", "2": "37.5Hz11kN", "3": "40Hz10kN",
+}
+
 NUM_FILES_DICT_FULL = {
     "Bearing1_1": 123, "Bearing1_2": 161, "Bearing1_3": 158, "Bearing1_4": 122, "Bearing1_5": 52,
     "Bearing2_1": 491, "Bearing2_2": 161, "Bearing2_3": 533, "Bearing2_4": 42, "Bearing2_5": 339,
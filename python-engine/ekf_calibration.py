@@ -0,0 +1,248 @@
+# Calibração dos Ruídos do EKF (vt, wt)
+# Avalia uma grade de pares (vt, wt) do EKF de uma só vez e pontua o RUL previsto contra o
+# t_eol_true de ARTICLE_BEARINGS_DATA, indicando o melhor par de cada rolamento.
+#
+# O estado do filtro (ESI, b) e a covariância 2x2 são arrays ao longo do eixo das combinações
+# (e, no modo 'reinit', também dos pontos de predição), avançados juntos a cada medição com a
+# mesma álgebra fechada de incremental.EKFState. A série de ESI suavizado é montada como no
+# simulador, incluindo os valores provisórios da média móvel centrada que o EKF enxerga em cada
+# minuto, então o RUL de cada par é o mesmo que a simulação emitiria com ele. A grade pode ser
+# dividida entre processos (--workers).
+#
+# Uso:
+#   python ekf_calibration.py --base_path /caminho/XJTU-SY [--store_path /caminho/packed] \
+#       [--vt 0.01:0.2:0.01] [--wt 0.01:0.2:0.01] [--ekf_mode stateful] [--workers N] [--output calib.csv] [Bearing1_2 ...]
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import config
+from fdt_sweep import parse_grid
+from feature_cache import MinuteFeatureExtractor
+from incremental import CenteredMovingAverage
+from repository import MemmapBearingDataRepository
+from threshold_store import GammaBarStore
+
+RUL_EVERY_MINUTES = 3  # Mesma cadência de predição do simulador (process_minute)
+
+
+def load_smoothed_series(features: MinuteFeatureExtractor, bearing_name: str) -> dict:
+    """
+    Calcula a série de ESI suavizado de um rolamento como o simulador a vê.
+
+    Returns:
+        dict: 'z' (histórico suavizado final, N valores) e 'z_last' (z_last[n] = último valor,
+              ainda provisório, do histórico no minuto n; z_last[0] não é usado).
+    """
+    repository = features.repository
+    condition = repository.get_bearing_metadata(bearing_name)["condition_key"]
+    num_files = repository.get_num_files_for_bearing(bearing_name)
+
+    smoother = CenteredMovingAverage(window=4, capacity=num_files)
+    z_last = np.zeros(num_files + 1)
+    for minute, _, esi, _ in features.iter_features(condition, bearing_name, range(1, num_files + 1)):
+        smoother.append(esi if not np.isnan(esi) else 0.0)
+        z_last[minute] = smoother.history[-1]
+    return {"z": smoother.history.copy(), "z_last": z_last}
+
+
+def prediction_points(t_start: int, num_files: int, every: int = RUL_EVERY_MINUTES) -> np.ndarray:
+    """Minutos em que o simulador calcula o RUL (após o início do EKF, a cada 'every' minutos)."""
+    minutes = np.arange(1, num_files + 1)
+    return minutes[(minutes - 1 > t_start) & (minutes % every == 0)]
+
+
+def _initial_b(z: np.ndarray, z_last: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """Vetorização de EKFState.initial_b(z, n - 1) com o histórico visto no minuto n de cada ponto."""
+    cur, prev = z_last[points], z[points - 2]
+    valid = (cur > 1e-9) & (prev > 1e-9)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        b0 = np.abs(np.log(np.where(valid, cur, 1.0) / np.where(valid, prev, 1.0)))
+    return np.where(valid & (b0 > 1e-9), b0, 0.001)
+
+
+def _step(state: list, z_k: float, q: np.ndarray, r: np.ndarray) -> None:
+    """Um passo de predição/atualização de EKFState._step, aplicado a todas as colunas de 'state' ativas."""
+    x0, x1, p00, p01, p10, p11 = state
+    active = x0 > 1e-9  # ESI estimado ~0: o filtro para, como em EKFState._run_until
+    e = np.exp(x1)
+    f01 = e * x0
+
+    fp00 = e * p00 + f01 * p10
+    fp01 = e * p01 + f01 * p11
+    pp00 = fp00 * e + fp01 * f01 + q
+    pp10 = p10 * e + p11 * f01
+
+    s = pp00 + r
+    ok = np.abs(s) >= 1e-12
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k0 = np.where(ok, pp00 / s, 0.0)
+        k1 = np.where(ok, pp10 / s, 0.0)
+    innovation = z_k - e * x0
+
+    updates = (e * x0 + k0 * innovation, x1 + k1 * innovation,
+               (1 - k0) * pp00, (1 - k0) * fp01, pp10 - k1 * pp00, p11 - k1 * fp01)
+    for array, new in zip(state, updates):
+        np.copyto(array, new, where=active)
+
+
+def _rul_from_state(x0: np.ndarray, x1: np.ndarray, gamma_bar: float) -> np.ndarray:
+    """Vetorização de EKFState.rul_from_state."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crossing = np.where(gamma_bar > x0, np.log(gamma_bar / x0) / x1, 0.0)
+    rul = np.where(x1 > 1e-9, crossing, np.inf)
+    return np.where((x0 > 1e-9) & (gamma_bar > 1e-9), rul, np.nan)
+
+
+def batched_ekf_rul(series: dict, t_start: int, points: np.ndarray, gamma_bar: float, vt: np.ndarray,
+                    wt: np.ndarray, mode: str = "stateful") -> np.ndarray:
+    """
+    RUL previsto em cada ponto de predição para cada combinação (vt[i], wt[i]).
+
+    Args:
+        series (dict): Saída de load_smoothed_series.
+        t_start (int): Índice (baseado em 0) da primeira medição do EKF.
+        points (np.ndarray): Minutos de predição (crescentes, todos com n - 1 > t_start).
+        gamma_bar (float): Limiar de falha.
+        vt, wt (np.ndarray): Desvios padrão dos ruídos de processo e de medição, um par por combinação.
+        mode (str): 'stateful' ou 'reinit' (ver incremental.EKFState).
+
+    Returns:
+        np.ndarray: RUL com forma (combinações, pontos).
+    """
+    z, z_last = series["z"], series["z_last"]
+    n_comb, n_pts = len(vt), len(points)
+    q = (np.asarray(vt, dtype=float) ** 2)[:, None]
+    r = (np.asarray(wt, dtype=float) ** 2)[:, None]
+    rul = np.full((n_comb, n_pts), np.nan)
+    if n_pts == 0:
+        return rul
+
+    if mode == "reinit":
+        # Um filtro por (combinação, ponto), reinicializado em t_start com o b0 do seu ponto. Como os pontos
+        # são crescentes, os filtros ainda ativos no índice t formam um sufixo das colunas.
+        shape = (n_comb, n_pts)
+        state = [np.full(shape, z[t_start]), np.broadcast_to(_initial_b(z, z_last, points), shape).copy(),
+                 np.full(shape, 0.1), np.zeros(shape), np.zeros(shape), np.full(shape, 0.1)]
+        first = 0
+        for t in range(t_start, points[-1] - 1):
+            while points[first] - 1 <= t:  # O ponto n incorpora as medições até n - 2
+                first += 1
+            _step([a[:, first:] for a in state], z[t], q, r)
+        rul = _rul_from_state(state[0], state[1], gamma_bar)
+    elif mode == "stateful":
+        # Um filtro por combinação, inicializado no primeiro minuto em que o simulador chama advance()
+        init_minute = t_start + 2
+        b0 = _initial_b(z, z_last, np.array([init_minute]))[0]
+        shape = (n_comb, 1)
+        state = [np.full(shape, z[t_start]), np.full(shape, b0),
+                 np.full(shape, 0.1), np.zeros(shape), np.zeros(shape), np.full(shape, 0.1)]
+        column = {n: i for i, n in enumerate(points)}
+        for t in range(t_start, points[-1] - 1):
+            _step(state, z[t], q, r)
+            if t + 2 in column:
+                rul[:, column[t + 2]] = _rul_from_state(state[0], state[1], gamma_bar)[:, 0]
+    else:
+        raise ValueError(f"Modo de EKF inválido: {mode}")
+
+    # Série nula até o ponto de predição: RUL indefinido (EKFState._all_zero)
+    nonzero = np.flatnonzero(np.abs(z) >= 1e-9)
+    first_nonzero = nonzero[0] if nonzero.size else len(z)
+    all_zero = (first_nonzero >= points - 1) & (np.abs(z_last[points]) < 1e-9)
+    rul[:, all_zero] = np.nan
+    return rul
+
+
+def score_rul(rul: np.ndarray, points: np.ndarray, t_eol_true: int) -> dict:
+    """
+    Erro do RUL previsto em relação ao RUL real (t_eol_true - minuto) nos pontos até o fim de vida.
+
+    Returns:
+        dict: 'rmse', 'mae' (sobre as predições finitas) e 'invalid' (predições inf/NaN), por combinação.
+    """
+    scored = points <= t_eol_true
+    error = rul[:, scored] - (t_eol_true - points[scored])[None, :]
+    finite = np.isfinite(error)
+    count = finite.sum(axis=1)
+    sq = np.where(finite, error**2, 0.0).sum(axis=1)
+    ab = np.where(finite, np.abs(error), 0.0).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {"rmse": np.sqrt(sq / count), "mae": ab / count, "invalid": (~finite).sum(axis=1)}
+
+
+def _calibrate_chunk(series: dict, t_start: int, points: np.ndarray, gamma_bar: float, t_eol_true: int,
+                     vt: np.ndarray, wt: np.ndarray, mode: str) -> dict:
+    """Executado nos workers: EKF e pontuação de um bloco de combinações."""
+    return score_rul(batched_ekf_rul(series, t_start, points, gamma_bar, vt, wt, mode), points, t_eol_true)
+
+
+def calibrate_bearing(features: MinuteFeatureExtractor, bearing_name: str, gamma_bar: float, vt_grid, wt_grid,
+                      mode: str = "stateful", executor: ProcessPoolExecutor = None, chunks: int = 1) -> pd.DataFrame:
+    """Pontua todos os pares (vt, wt) da grade para um rolamento do artigo."""
+    metadata = config.ARTICLE_BEARINGS_MAP[bearing_name]
+    series = load_smoothed_series(features, bearing_name)
+    t_start = max(0, (metadata["t_fdt"] - config.N_PRIOR_FDT) - 1)  # Como em BearingSimulator.set_fdt
+    points = prediction_points(t_start, len(series["z"]))
+
+    vt, wt = (a.ravel() for a in np.meshgrid(vt_grid, wt_grid, indexing="ij"))
+    bounds = np.linspace(0, len(vt), max(1, chunks) + 1).astype(int)
+    args = [(series, t_start, points, gamma_bar, metadata["t_eol_true"], vt[a:b], wt[a:b], mode)
+            for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+    parts = list(executor.map(_calibrate_chunk, *zip(*args))) if executor else [_calibrate_chunk(*a) for a in args]
+
+    table = pd.DataFrame({"bearing": bearing_name, "vt": vt, "wt": wt})
+    for key in ("rmse", "mae", "invalid"):
+        table[key] = np.concatenate([part[key] for part in parts])
+    table["points"] = int((points <= metadata["t_eol_true"]).sum())
+    table["is_current"] = np.isclose(table["vt"], metadata["vt"]) & np.isclose(table["wt"], metadata["wt"])
+    return table
+
+
+def best_pairs(table: pd.DataFrame) -> pd.DataFrame:
+    """Melhor par de cada rolamento: menos predições inválidas e, depois, menor RMSE."""
+    ranked = table.sort_values(["bearing", "invalid", "rmse", "mae"])
+    return ranked.groupby("bearing", sort=False).head(1).set_index("bearing")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibra os ruídos (vt, wt) do EKF por busca em grade.")
+    parser.add_argument("bearings", nargs="*", help="Rolamentos do artigo a calibrar (default: todos de ARTICLE_BEARINGS_DATA).")
+    parser.add_argument("--base_path", required=True, help="Caminho base para o dataset XJTU-SY.")
+    parser.add_argument("--store_path", default=None, help="Diretório do dataset empacotado por signal_store.py.")
+    parser.add_argument("--vt", default="0.01:0.2:0.01", help="Valores de vt, 'a,b,c' ou 'início:fim[:passo]' (default: 0.01:0.2:0.01).")
+    parser.add_argument("--wt", default="0.01:0.2:0.01", help="Valores de wt (default: 0.01:0.2:0.01).")
+    parser.add_argument("--ekf_mode", choices=["stateful", "reinit"], default="stateful",
+                        help="Semântica do EKF avaliada, como no main.py (default: stateful).")
+    parser.add_argument("--workers", type=int, default=1, help="Processos para dividir a grade (default: 1, sem pool).")
+    parser.add_argument("--output", default=None, help="Arquivo CSV com a pontuação de todos os pares (default: não grava).")
+    args = parser.parse_args()
+
+    bearings = args.bearings or [b["name_in_code"] for b in config.ARTICLE_BEARINGS_DATA]
+    unknown = [b for b in bearings if b not in config.ARTICLE_BEARINGS_MAP]
+    if unknown:
+        parser.error(f"Rolamentos sem t_fdt/t_eol_true de referência: {', '.join(unknown)}")
+    vt_grid, wt_grid = parse_grid(args.vt), parse_grid(args.wt)
+
+    repository = MemmapBearingDataRepository(args.base_path, args.store_path)
+    features = MinuteFeatureExtractor(repository)
+    gamma_bar = GammaBarStore(repository, features=features).get_gamma_bar()
+
+    executor = ProcessPoolExecutor(args.workers) if args.workers > 1 else None
+    try:
+        table = pd.concat([calibrate_bearing(features, b, gamma_bar, vt_grid, wt_grid, args.ekf_mode, executor, args.workers)
+                           for b in bearings], ignore_index=True)
+    finally:
+        if executor:
+            executor.shutdown()
+
+    if args.output:
+        table.to_csv(args.output, index=False)
+    current = table[table["is_current"]].set_index("bearing")[["vt", "wt", "rmse", "invalid"]]
+    best = best_pairs(table)[["vt", "wt", "rmse", "mae", "invalid", "points"]]
+    print(f"{len(vt_grid) * len(wt_grid)} pares (vt, wt) x {len(bearings)} rolamentos avaliados (EKF '{args.ekf_mode}').")
+    print(best.join(current, rsuffix="_atual").to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# Varredura de Parâmetros do FDT
+# Avalia uma grade inteira de (warmup, persistence_len, amp_offset) do detector de FDT de uma
+# só vez, sem reprocessar o dataset a cada configuração.
+#
+# O AES de cada minuto vem do cache de características (feature_cache.py), e apenas as 12 séries
+# das harmônicas das FCFs (4 componentes x 3 harmônicas) são guardadas. A detecção usa
+# operações vetorizadas:
+#   - a linha de base de cada warmup é o máximo acumulado das séries;
+#   - os limiares (warmup x offset) são comparados por broadcasting com todas as séries;
+#   - o comprimento da sequência acima do limiar vem do índice do último ponto abaixo dele
+#     (máximo acumulado), e o primeiro minuto em que cada persistência é atingida é encontrado
+#     com uma única busca binária sobre todas as séries.
+# O resultado é idêntico ao de processing.detect_fdt / incremental.StreamingFDTDetector.
+#
+# Uso:
+#   python fdt_sweep.py --base_path /caminho/XJTU-SY [--store_path /caminho/packed] \
+#       [--warmup 1:10] [--persistence_len 1:6] [--amp_offset 0:0.1:0.005] [--output sweep.csv] [Bearing1_2 ...]
+
+import argparse
+import sys
+import numpy as np
+import pandas as pd
+import config
+import processing
+from feature_cache import MinuteFeatureExtractor
+from incremental import StreamingFDTDetector
+from repository import MemmapBearingDataRepository
+
+
+def load_fcf_series(features: MinuteFeatureExtractor, bearing_name: str) -> tuple[np.ndarray, list]:
+    """
+    Lê (do cache, ou calculando) o AES de todos os minutos de um rolamento e extrai as séries
+    das harmônicas das FCFs.
+
+    Returns:
+        tuple: (séries (N_minutos x 12), [(componente, harmônica), ...] na ordem das colunas)
+    """
+    repository = features.repository
+    condition = repository.get_bearing_metadata(bearing_name)["condition_key"]
+    num_files = repository.get_num_files_for_bearing(bearing_name)
+    detector = StreamingFDTDetector(processing.aes_freq_vector(config.FS, config.AES_L), config.FCFS[condition])
+
+    series = np.zeros((num_files, len(detector.bins)))
+    for minute, S_e_amp, _, _ in features.iter_features(condition, bearing_name, range(1, num_files + 1)):
+        if S_e_amp is not None:  # Minuto ausente ou com erro: zeros, como no detector online
+            series[minute - 1] = S_e_amp[detector.bins]
+    return series, detector.series_meta
+
+
+SWEEP_BLOCK_ELEMENTS = 8_000_000  # Teto de elementos dos arrays intermediários (W x O x N x S) por bloco de warmups
+
+
+def sweep_fdt(series: np.ndarray, warmups, persistence_lens, amp_offsets) -> dict:
+    """
+    Detecta o FDT para todas as combinações de parâmetros.
+
+    Args:
+        series (np.ndarray): Séries das harmônicas (N_minutos x N_series).
+        warmups, persistence_lens, amp_offsets: Valores de cada parâmetro da grade.
+
+    Returns:
+        dict: 'fdt' (índice baseado em 0, -1 se não detectado) e 'trigger' (coluna da série que
+              disparou, -1 se não detectado), ambos com forma (W, P, O).
+    """
+    warmups = np.asarray(warmups, dtype=np.int64)
+    persistence_lens = np.asarray(persistence_lens, dtype=np.int64)
+    amp_offsets = np.asarray(amp_offsets, dtype=float)
+    if warmups.min() < 1 or persistence_lens.min() < 1:
+        raise ValueError("warmup e persistence_len devem ser >= 1.")
+    # Blocos de warmups limitam a memória dos arrays intermediários em grades grandes
+    block = max(1, SWEEP_BLOCK_ELEMENTS // max(1, len(amp_offsets) * series.size))
+    if len(warmups) > block:
+        parts = [sweep_fdt(series, warmups[i:i + block], persistence_lens, amp_offsets)
+                 for i in range(0, len(warmups), block)]
+        return {key: np.concatenate([part[key] for part in parts]) for key in ("fdt", "trigger")}
+
+    n_pts, n_series = series.shape
+    n_w, n_p, n_o = len(warmups), len(persistence_lens), len(amp_offsets)
+
+    # Limiar de cada (warmup, offset): máximo das séries nos primeiros 'warmup' minutos + offset
+    # (warmup maior que a série: limiar infinito, nunca detecta)
+    base = np.full(n_w, np.inf)
+    valid_w = warmups <= n_pts
+    base[valid_w] = np.maximum.accumulate(series.max(axis=1))[warmups[valid_w] - 1]
+    thresholds = base[:, None] + amp_offsets[None, :]  # (W, O)
+
+    # Pontos acima do limiar, ignorando o período de warmup: (W, O, N, S)
+    t = np.arange(n_pts)
+    above = series[None, None, :, :] > thresholds[:, :, None, None]
+    above &= (t[None, :] >= warmups[:, None])[:, None, :, None]
+
+    # Comprimento da sequência terminada em cada ponto e seu máximo acumulado (não decrescente)
+    last_below = np.maximum.accumulate(np.where(above, -1, t[None, None, :, None]), axis=2)
+    longest = np.maximum.accumulate(t[None, None, :, None] - last_below, axis=2)
+
+    # Primeiro ponto em que cada série atinge cada persistência: busca binária em todas as linhas de uma vez,
+    # deslocando cada linha (w, o, s) para uma faixa própria de valores
+    rows = np.moveaxis(longest, 2, -1).reshape(-1, n_pts)  # (W*O*S, N), linhas não decrescentes em [0, N]
+    row_ids = np.arange(rows.shape[0])[:, None]
+    keys = (rows + row_ids * (n_pts + 2)).ravel()
+    queries = np.minimum(persistence_lens, n_pts + 1)[None, :] + row_ids * (n_pts + 2)  # (W*O*S, P)
+    first_end = np.searchsorted(keys, queries) - row_ids * n_pts  # Posição dentro da linha (N = não atingida)
+    first_end = first_end.reshape(n_w, n_o, n_series, n_p)
+
+    # A série que atinge a persistência primeiro dispara o FDT; empates ficam com a primeira série (ordem de detect_fdt)
+    trigger = first_end.argmin(axis=2)  # (W, O, P)
+    end = first_end.min(axis=2)
+    detected = end < n_pts
+    fdt = np.where(detected, end - persistence_lens[None, None, :] + 1, -1)
+    trigger = np.where(detected, trigger, -1)
+    return {"fdt": fdt.transpose(0, 2, 1), "trigger": trigger.transpose(0, 2, 1)}
+
+
+def sweep_bearings(features: MinuteFeatureExtractor, bearings: list[str], warmups, persistence_lens,
+                   amp_offsets) -> pd.DataFrame:
+    """
+    Varre a grade para cada rolamento e retorna uma linha por (rolamento, warmup, persistence_len, amp_offset),
+    com o FDT detectado (minuto, como em CustomFDTBearingSimulator) e o erro em relação ao t_fdt do artigo.
+    """
+    grid = np.meshgrid(warmups, persistence_lens, amp_offsets, indexing="ij")
+    frames = []
+    for bearing_name in bearings:
+        series, series_meta = load_fcf_series(features, bearing_name)
+        result = sweep_fdt(series, warmups, persistence_lens, amp_offsets)
+        fdt_minute = np.where(result["fdt"] >= 0, result["fdt"] + 1, -1).ravel()
+        trigger = result["trigger"].ravel()
+        article = config.ARTICLE_BEARINGS_MAP.get(bearing_name)
+
+        frame = pd.DataFrame({
+            "bearing": bearing_name,
+            "warmup": grid[0].ravel(), "persistence_len": grid[1].ravel(), "amp_offset": grid[2].ravel(),
+            "fdt_minute": pd.array([m if m > 0 else None for m in fdt_minute], dtype="Int64"),
+            "trigger_component": [series_meta[i][0] if i >= 0 else None for i in trigger],
+            "trigger_harmonic": pd.array([series_meta[i][1] if i >= 0 else None for i in trigger], dtype="Int64"),
+        })
+        frame["t_fdt"] = article["t_fdt"] if article else pd.NA
+        frame["error"] = frame["fdt_minute"] - frame["t_fdt"] if article else pd.NA
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def summarize(table: pd.DataFrame, top: int = 10) -> pd.DataFrame:
+    """Classifica as configurações por rolamentos sem detecção e, depois, pelo erro absoluto médio."""
+    known = table.dropna(subset=["t_fdt"]).copy()
+    known["abs_error"] = known["error"].abs().astype(float)
+    known["missed"] = known["fdt_minute"].isna()
+    summary = known.groupby(["warmup", "persistence_len", "amp_offset"]).agg(
+        missed=("missed", "sum"), mae=("abs_error", "mean"), max_abs_error=("abs_error", "max"))
+    return summary.sort_values(["missed", "mae", "max_abs_error"]).head(top)
+
+
+def parse_grid(spec: str, cast=float) -> np.ndarray:
+    """Converte 'a,b,c' ou 'início:fim[:passo]' (fim incluso) nos valores da grade."""
+    if ":" in spec:
+        parts = [float(p) for p in spec.split(":")]
+        start, stop = parts[0], parts[1]
+        step = parts[2] if len(parts) > 2 else 1.0
+        values = start + step * np.arange(int(np.floor((stop - start) / step + 1e-9)) + 1)
+        values = np.round(values, 12)
+    else:
+        values = np.array([float(p) for p in spec.split(",")])
+    return values.astype(np.int64) if cast is int else values
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Varre uma grade de parâmetros do detector de FDT.")
+    parser.add_argument("bearings", nargs="*",
+                        help="Rolamentos a avaliar (default: os de ARTICLE_BEARINGS_DATA, que têm t_fdt de referência).")
+    parser.add_argument("--base_path", required=True, help="Caminho base para o dataset XJTU-SY.")
+    parser.add_argument("--store_path", default=None, help="Diretório do dataset empacotado por signal_store.py.")
+    parser.add_argument("--warmup", default="1:10", help="Valores de warmup, 'a,b,c' ou 'início:fim[:passo]' (default: 1:10).")
+    parser.add_argument("--persistence_len", default="1:6", help="Valores de persistence_len (default: 1:6).")
+    parser.add_argument("--amp_offset", default="0:0.1:0.005", help="Valores de amp_offset (default: 0:0.1:0.005).")
+    parser.add_argument("--output", default=None, help="Arquivo CSV com o resultado completo (default: stdout).")
+    parser.add_argument("--top", type=int, default=10, help="Configurações exibidas no resumo (stderr).")
+    args = parser.parse_args()
+
+    bearings = args.bearings or [b["name_in_code"] for b in config.ARTICLE_BEARINGS_DATA]
+    warmups = parse_grid(args.warmup, int)
+    persistence_lens = parse_grid(args.persistence_len, int)
+    amp_offsets = parse_grid(args.amp_offset)
+
+    features = MinuteFeatureExtractor(MemmapBearingDataRepository(args.base_path, args.store_path))
+    table = sweep_bearings(features, bearings, warmups, persistence_lens, amp_offsets)
+    table.to_csv(args.output or sys.stdout, index=False)
+
+    n_configs = len(warmups) * len(persistence_lens) * len(amp_offsets)
+    print(f"{n_configs} configurações x {len(bearings)} rolamentos avaliadas.", file=sys.stderr)
+    print(summarize(table, args.top).to_string(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
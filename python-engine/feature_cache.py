@@ -0,0 +1,251 @@
+# Cache Persistente de Características por Minuto
+# Guarda em disco (SQLite) o AES e o ESI de cada minuto já processado, para que um mesmo minuto
+# seja calculado no máximo uma vez por conjunto de parâmetros: entre o cálculo do gamma_bar, o
+# FDT dinâmico e o laço da simulação, entre execuções e entre processos (modo frota).
+#
+# A chave de cada minuto combina o dataset, o rolamento, o minuto, o mtime do arquivo de origem
+# e os parâmetros do envelope/AES (e as FCFs, das quais o ESI depende). Alterar qualquer um deles
+# gera uma chave nova; as entradas antigas deixam de ser usadas e acabam removidas pela política LRU.
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import numpy as np
+import config
+import processing
+from profiling import profiler
+
+_default_caches = {}  # Cache padrão de cada processo (as conexões SQLite não sobrevivem a um fork)
+
+
+class FeatureCache:
+    """
+    Armazenamento das características por minuto em um arquivo SQLite em modo WAL, que permite
+    leituras e escritas concorrentes de vários processos. O AES é gravado como o vetor float64
+    bruto (bytes), então um acerto no cache reproduz exatamente o valor calculado.
+    O tamanho total é limitado a max_bytes, descartando as entradas usadas há mais tempo.
+    Os acessos de get() ficam em memória e são gravados em lote (junto do próximo put(), antes de
+    cada remoção LRU ou a cada ACCESS_FLUSH_INTERVAL acertos), sem uma transação por leitura.
+    """
+    EVICTION_CHECK_INTERVAL = 32  # Inserções entre verificações do tamanho total
+    ACCESS_FLUSH_INTERVAL = 64  # Acessos pendentes que disparam a gravação do last_access
+
+    def __init__(self, path: str = config.FEATURE_CACHE_PATH, max_bytes: int = config.FEATURE_CACHE_MAX_BYTES):
+        """
+        Args:
+            path (str): Caminho do arquivo SQLite.
+            max_bytes (int): Tamanho máximo (soma dos AES e ESIs armazenados).
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn = None
+        self._conn_pid = None
+        self._puts_since_check = 0
+        self._pending_access = {}  # key -> instante do último get() ainda não gravado
+
+    @classmethod
+    def default(cls) -> "FeatureCache | None":
+        """Cache compartilhado pelo processo atual, ou None se desativado (BEARING_FEATURE_CACHE=0)."""
+        if not config.FEATURE_CACHE_ENABLED:
+            return None
+        pid = os.getpid()
+        if pid not in _default_caches:
+            _default_caches[pid] = cls()
+            atexit.register(_default_caches[pid].flush_access)
+        return _default_caches[pid]
+
+    def _connection(self) -> sqlite3.Connection:
+        """Abre (uma vez por processo) a conexão e cria a tabela se necessário."""
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS features ("
+                " key TEXT PRIMARY KEY, bearing TEXT, minute INTEGER,"
+                " esi REAL, aes BLOB, nbytes INTEGER, last_access REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS features_lru ON features (last_access)")
+            conn.commit()
+            self._conn, self._conn_pid = conn, os.getpid()
+            self._pending_access = {}  # Acessos herdados do processo pai pertencem à conexão dele
+        return self._conn
+
+    def existing(self, keys: list[str]) -> set[str]:
+        """Retorna o subconjunto de 'keys' presente no cache (sem carregar os espectros)."""
+        conn = self._connection()
+        found = set()
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            rows = conn.execute(f"SELECT key FROM features WHERE key IN ({','.join('?' * len(batch))})", batch)
+            found.update(row[0] for row in rows)
+        return found
+
+    def get(self, key: str) -> tuple[np.ndarray, float] | None:
+        """Retorna (AES, ESI) de uma chave, ou None se ela não estiver no cache."""
+        conn = self._connection()
+        row = conn.execute("SELECT aes, esi FROM features WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._pending_access[key] = time.time()
+        if len(self._pending_access) >= self.ACCESS_FLUSH_INTERVAL:
+            self.flush_access()
+        return np.frombuffer(row[0], dtype=np.float64), float(row[1])
+
+    def _write_access(self, conn: sqlite3.Connection) -> None:
+        """Aplica os acessos pendentes na transação corrente (sem commit)."""
+        if self._pending_access:
+            conn.executemany(
+                "UPDATE features SET last_access = ? WHERE key = ?",
+                [(t, key) for key, t in self._pending_access.items()],
+            )
+            self._pending_access = {}
+
+    def flush_access(self) -> None:
+        """Grava os instantes de acesso pendentes em uma única transação."""
+        if not self._pending_access or self._conn_pid != os.getpid():
+            return
+        conn = self._connection()
+        self._write_access(conn)
+        conn.commit()
+
+    def put(self, key: str, bearing_name: str, minute: int, aes: np.ndarray, esi: float) -> None:
+        """Grava as características de um minuto."""
+        blob = np.ascontiguousarray(aes, dtype=np.float64).tobytes()
+        conn = self._connection()
+        self._write_access(conn)
+        conn.execute(
+            "INSERT OR REPLACE INTO features (key, bearing, minute, esi, aes, nbytes, last_access)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, bearing_name, minute, float(esi), blob, len(blob) + 8, time.time()),
+        )
+        conn.commit()
+
+        self._puts_since_check += 1
+        if self._puts_since_check >= self.EVICTION_CHECK_INTERVAL:
+            self._puts_since_check = 0
+            self.evict()
+
+    def evict(self) -> int:
+        """Se o cache passou de max_bytes, remove as entradas menos usadas até 90% do limite. Retorna quantas saíram."""
+        self.flush_access()
+        conn = self._connection()
+        total = conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM features").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+
+        target = int(self.max_bytes * 0.9)
+        to_remove = []
+        for key, nbytes in conn.execute("SELECT key, nbytes FROM features ORDER BY last_access"):
+            if total <= target:
+                break
+            to_remove.append((key,))
+            total -= nbytes
+        conn.executemany("DELETE FROM features WHERE key = ?", to_remove)
+        conn.commit()
+        return len(to_remove)
+
+
+class MinuteFeatureExtractor:
+    """
+    Ponto único de cálculo das características de um minuto (envelope -> AES -> ESI), usado pelo
+    simulador, pelo GammaBarStore, pelo cálculo de FDT dinâmico e pelos workers do modo frota.
+    Minutos presentes no cache não são lidos do disco nem reprocessados.
+    """
+    def __init__(self, repository, cache: FeatureCache | None = None):
+        """
+        Args:
+            repository (BearingDataRepository): Repositório usado para ler os minutos ausentes do cache.
+            cache (FeatureCache, optional): Cache a usar (default: FeatureCache.default()).
+        """
+        self.repository = repository
+        self.cache = cache if cache is not None else FeatureCache.default()
+        self._source_mtimes = {}
+
+    @staticmethod
+    def params(condition: str) -> dict:
+        """Parâmetros de processamento dos quais as características de um minuto dependem."""
+        return {
+            "fs": config.FS,
+            "envelope": {"order": config.ENVELOPE_FILTER_ORDER, "cutoff_hz": config.ENVELOPE_CUTOFF_HZ},
+            "aes": {"L": config.AES_L, "overlap": config.AES_OVERLAP, "window": "rect"},
+            "fcfs": config.FCFS[condition],
+        }
+
+    def source_mtimes(self, condition: str, bearing_name: str) -> list[int | None]:
+        """mtimes dos arquivos de origem do rolamento (consultados uma vez por extrator)."""
+        if (condition, bearing_name) not in self._source_mtimes:
+            self._source_mtimes[(condition, bearing_name)] = self.repository.get_source_mtimes(condition, bearing_name)
+        return self._source_mtimes[(condition, bearing_name)]
+
+    def minute_keys(self, condition: str, bearing_name: str, minutes: list[int]) -> dict[int, str | None]:
+        """Chave de cache de cada minuto (None para minutos sem arquivo de origem, que não são cacheados)."""
+        mtimes = self.source_mtimes(condition, bearing_name)
+
+        prefix = json.dumps({
+            "base_path": os.path.abspath(self.repository.base_path),
+            "condition": condition, "bearing": bearing_name,
+            "params": self.params(condition),
+        }, sort_keys=True)
+        keys = {}
+        for minute in minutes:
+            mtime = mtimes[minute - 1] if 0 < minute <= len(mtimes) else None
+            keys[minute] = None if mtime is None else hashlib.sha1(f"{prefix}|{minute}|{mtime}".encode("utf-8")).hexdigest()
+        return keys
+
+    @staticmethod
+    def compute(signal: np.ndarray | None, condition: str) -> tuple[np.ndarray | None, float, str | None]:
+        """Calcula o AES e o ESI bruto de um minuto. Retorna (AES ou None, esi, mensagem de erro ou None)."""
+        if signal is None:
+            return None, np.nan, "file_not_found"
+        try:
+            with profiler.stage("envelope"):
+                env = processing.get_envelope_from_signal(signal)
+            with profiler.stage("compute_aes"):
+                S_e_amp, f_aes = processing.compute_aes(env, config.FS, config.AES_L, config.AES_OVERLAP)
+            with profiler.stage("compute_esi"):
+                esi = processing.compute_esi(S_e_amp, f_aes, condition)
+            return S_e_amp, esi, None
+        except Exception as e:
+            return None, np.nan, str(e)
+
+    def iter_features(self, condition: str, bearing_name: str, minutes):
+        """
+        Gera (minuto, AES ou None, esi, mensagem de erro ou None) na ordem de 'minutes'.
+        Os minutos ausentes do cache são lidos com leitura antecipada (repository.iter_signals),
+        calculados e gravados no cache. Termina antes se a fonte de sinais se esgotar.
+        """
+        minutes = list(minutes)
+        keys = self.minute_keys(condition, bearing_name, minutes) if self.cache else {}
+        cached = self.cache.existing([k for k in keys.values() if k]) if self.cache else set()
+
+        signals = self.repository.iter_signals(condition, bearing_name, [m for m in minutes if keys.get(m) not in cached])
+        try:
+            for minute in minutes:
+                key = keys.get(minute)
+                if key in cached:
+                    hit = self.cache.get(key)
+                    if hit is not None:
+                        profiler.count("feature_cache_hits")
+                        yield minute, hit[0], hit[1], None
+                        continue
+                    # Entrada removida por outro processo depois da consulta: lê o minuto diretamente
+                    signal = self.repository.get_signal_for_minute(condition, bearing_name, minute)
+                else:
+                    item = next(signals, None)
+                    if item is None:  # Fonte encerrada antes de 'minutes' (fluxo ao vivo, ver StreamingBearingDataRepository)
+                        return
+                    _, signal = item
+
+                S_e_amp, esi, error_msg = self.compute(signal, condition)
+                if key is not None and error_msg is None:
+                    self.cache.put(key, bearing_name, minute, S_e_amp, esi)
+                yield minute, S_e_amp, esi, error_msg
+        finally:
+            signals.close()
+            if self.cache:
+                self.cache.flush_access()
@@ -0,0 +1,208 @@
+# Modo Frota (Processamento em Lote)
+# Calcula as trajetórias de ESI e RUL de vários rolamentos em paralelo, distribuindo blocos
+# de minutos entre os núcleos da máquina com um ProcessPoolExecutor e sem pausas entre minutos.
+#
+# O custo dominante (leitura + envelope + AES + ESI de cada minuto) é independente entre minutos
+# e é feito pelos workers. A suavização e o EKF são sequenciais e baratos, e rodam no processo
+# principal assim que todos os blocos de um rolamento terminam. Os resultados são emitidos como
+# linhas JSON marcadas com o rolamento, na ordem em que ficam prontos.
+#
+# Uso:
+#   python fleet.py --base_path /caminho/XJTU-SY [--store_path /caminho/packed] [--workers N] [Bearing1_2 ...]
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import config
+from feature_cache import MinuteFeatureExtractor
+from incremental import CenteredMovingAverage
+from repository import MemmapBearingDataRepository
+from simulation import BearingSimulator
+from threshold_store import GammaBarStore
+
+_worker_repositories = {}  # Extratores (e repositórios) abertos em cada processo worker (mantêm os memmaps abertos)
+
+
+def _compute_esi_chunk(base_path: str, store_path: str | None, condition: str, bearing_name: str,
+                       first_minute: int, last_minute: int) -> dict:
+    """Executado nos workers: calcula o ESI bruto dos minutos [first_minute, last_minute]."""
+    key = (base_path, store_path)
+    if key not in _worker_repositories:
+        _worker_repositories[key] = MinuteFeatureExtractor(MemmapBearingDataRepository(base_path, store_path))
+    features = _worker_repositories[key]
+
+    started = time.perf_counter()
+    esi_values, errors = [], []
+    for _, _, esi, error_msg in features.iter_features(condition, bearing_name, range(first_minute, last_minute + 1)):
+        esi_values.append(esi)
+        errors.append(error_msg)
+
+    return {
+        "bearing": bearing_name, "first_minute": first_minute,
+        "esi": esi_values, "errors": errors,
+        "pid": os.getpid(), "busy_s": time.perf_counter() - started,
+    }
+
+
+class FleetRunner:
+    """Orquestra o processamento de vários rolamentos no pool de processos."""
+    def __init__(self, base_path: str, store_path: str = None, workers: int = None,
+                 chunk_minutes: int = config.FLEET_CHUNK_MINUTES, ekf_mode: str = "stateful"):
+        self.base_path = base_path
+        self.store_path = store_path
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_minutes = chunk_minutes
+        self.ekf_mode = ekf_mode
+        self.repository = MemmapBearingDataRepository(base_path, store_path)
+        self.gamma_store = GammaBarStore(self.repository)
+
+    def _finalize_bearing(self, bearing_name: str, esi: np.ndarray, errors: list, gamma_bar: float) -> dict:
+        """Aplica suavização e EKF (se houver metadados do artigo) à série de ESI bruto de um rolamento."""
+        rul = []
+        if self.repository.get_bearing_metadata(bearing_name):
+            # Só o passo de suavização/EKF/RUL é usado: gamma_bar já resolvido e nada gravado no store de resultados
+            simulator = BearingSimulator(bearing_name, self.repository, self.ekf_mode, self.gamma_store)
+            simulator.results = None
+            simulator.start_run(gamma_bar)
+            for minute_idx, (esi_raw, error_msg) in enumerate(zip(esi, errors)):
+                for event in simulator.process_minute(minute_idx + 1, esi_raw, error_msg):
+                    if event["type"] == "rul":
+                        rul.append({k: event[k] for k in ("minute", "rul_predicted_min", "is_inf", "is_nan",
+                                                          "rul_p5_min", "rul_p50_min", "rul_p95_min")})
+            smoothed = simulator.all_esi_smoothed
+        else:
+            # Rolamentos fora do artigo não têm FDT/ruídos calibrados: apenas o ESI é calculado
+            smoother = CenteredMovingAverage(window=4, capacity=len(esi))
+            for esi_raw in esi:
+                smoother.append(esi_raw)
+            smoothed = smoother.history
+
+        return {
+            "type": "fleet_result", "bearing": bearing_name,
+            "condition": self.repository.get_condition_for_bearing(bearing_name),
+            "minutes": len(esi),
+            "esi_raw_ms2": [None if np.isnan(v) else float(v) for v in esi],
+            "esi_smoothed_ms2": [float(v) for v in smoothed],
+            "rul": rul,
+            "errors": sum(1 for e in errors if e is not None),
+        }
+
+    def run(self, bearings: list[str]):
+        """
+        Processa os rolamentos pedidos e gera (yield) linhas JSON: um 'fleet_result' por
+        rolamento, à medida que ficam prontos, e um 'fleet_summary' ao final.
+        """
+        started = time.perf_counter()
+
+        # Referências do gamma_bar desatualizadas entram no mesmo pool que os rolamentos pedidos
+        stale_refs = {bearing: (condition, fp) for condition, bearing, fp in self.gamma_store.stale_references()}
+        to_process = list(dict.fromkeys(list(stale_refs) + bearings))
+
+        series = {}
+        for bearing_name in to_process:
+            num_files = self.repository.get_num_files_for_bearing(bearing_name)
+            condition = self.repository.get_condition_for_bearing(bearing_name)
+            if not num_files or condition is None:
+                yield json.dumps({"type": "error", "bearing": bearing_name, "message": "Rolamento desconhecido."})
+                continue
+            series[bearing_name] = {
+                "condition": condition, "esi": np.full(num_files, np.nan),
+                "errors": [None] * num_files, "pending": 0,
+            }
+
+        worker_stats = {}
+        ready, gamma_bar = [], None
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = []
+            for bearing_name, state in series.items():
+                num_files = len(state["esi"])
+                for first in range(1, num_files + 1, self.chunk_minutes):
+                    last = min(num_files, first + self.chunk_minutes - 1)
+                    futures.append(executor.submit(_compute_esi_chunk, self.base_path, self.store_path,
+                                                   state["condition"], bearing_name, first, last))
+                    state["pending"] += 1
+
+            if not stale_refs:
+                gamma_bar = self.gamma_store.get_gamma_bar()
+
+            for future in as_completed(futures):
+                chunk = future.result()
+                state = series[chunk["bearing"]]
+                offset = chunk["first_minute"] - 1
+                state["esi"][offset:offset + len(chunk["esi"])] = chunk["esi"]
+                state["errors"][offset:offset + len(chunk["errors"])] = chunk["errors"]
+                state["pending"] -= 1
+
+                stats = worker_stats.setdefault(chunk["pid"], {"minutes": 0, "busy_s": 0.0})
+                stats["minutes"] += len(chunk["esi"])
+                stats["busy_s"] += chunk["busy_s"]
+
+                if state["pending"]:
+                    continue
+
+                bearing_name = chunk["bearing"]
+                if bearing_name in stale_refs:
+                    condition, fp = stale_refs.pop(bearing_name)
+                    valid = state["esi"][~np.isnan(state["esi"])]
+                    self.gamma_store.put(condition, bearing_name, fp, float(valid.max()) if valid.size else None)
+                    if not stale_refs:
+                        gamma_bar = self.gamma_store.get_gamma_bar()
+                if bearing_name in bearings:
+                    ready.append(bearing_name)
+
+                # Sem gamma_bar (referências ainda em processamento), os rolamentos prontos aguardam
+                while ready and gamma_bar is not None:
+                    name = ready.pop(0)
+                    yield json.dumps(self._finalize_bearing(name, series[name]["esi"], series[name]["errors"], gamma_bar))
+
+        # Rolamentos que ainda aguardam o gamma_bar (ex.: uma referência sem dados no pool)
+        if ready and gamma_bar is None:
+            gamma_bar = self.gamma_store.get_gamma_bar()
+        for name in ready:
+            yield json.dumps(self._finalize_bearing(name, series[name]["esi"], series[name]["errors"], gamma_bar))
+
+        wall_clock_s = time.perf_counter() - started
+        total_minutes = sum(s["minutes"] for s in worker_stats.values())
+        yield json.dumps({
+            "type": "fleet_summary",
+            "bearings": [b for b in bearings if b in series],
+            "workers": self.workers,
+            "wall_clock_s": wall_clock_s,
+            "minutes_total": total_minutes,
+            "minutes_per_s": total_minutes / wall_clock_s if wall_clock_s > 0 else None,
+            "per_worker": [
+                {"pid": pid, "minutes": s["minutes"], "busy_s": s["busy_s"],
+                 "minutes_per_s": s["minutes"] / s["busy_s"] if s["busy_s"] > 0 else None}
+                for pid, s in sorted(worker_stats.items())
+            ],
+        })
+
+
+def main():
+    """Função principal do modo frota."""
+    parser = argparse.ArgumentParser(description="Processa vários rolamentos em paralelo (modo frota).")
+    parser.add_argument("bearings", nargs="*", help="Rolamentos a processar (default: todos de NUM_FILES_DICT_FULL).")
+    parser.add_argument("--base_path", required=True, help="Caminho base para o dataset XJTU-SY.")
+    parser.add_argument("--store_path", default=None, help="Diretório do dataset empacotado por signal_store.py.")
+    parser.add_argument("--workers", type=int, default=None, help="Número de processos (default: núcleos da máquina).")
+    parser.add_argument("--chunk_minutes", type=int, default=config.FLEET_CHUNK_MINUTES,
+                        help=f"Minutos por tarefa enviada aos workers (default: {config.FLEET_CHUNK_MINUTES}).")
+    parser.add_argument("--ekf_mode", choices=["stateful", "reinit"], default="stateful",
+                        help="Modo do EKF (ver main.py).")
+    args = parser.parse_args()
+
+    try:
+        runner = FleetRunner(args.base_path, args.store_path, args.workers, args.chunk_minutes, args.ekf_mode)
+        for result_json in runner.run(args.bearings or list(config.NUM_FILES_DICT_FULL)):
+            print(result_json, flush=True)
+    except (ValueError, RuntimeError, OSError) as e:
+        print(json.dumps({"type": "error", "message": str(e)}), flush=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
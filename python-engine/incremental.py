@@ -0,0 +1,422 @@
+# Camada de Lógica de Domínio (Estado Incremental)
+# Contém os algoritmos com estado que avançam uma amostra por minuto, para que o custo
+# por minuto da simulação seja constante em vez de crescer com o histórico.
+
+import math
+import numpy as np
+import processing
+
+
+class CenteredMovingAverage:
+    """
+    Média móvel centrada incremental, equivalente a
+    pd.Series(x).fillna(0).rolling(window, center=True, min_periods=1).mean().
+
+    A janela do índice i cobre [i + right - window + 1, i + right], com right = (window - 1) // 2, truncada
+    nas bordas (min_periods=1). Uma nova amostra só altera os 'right + 1' valores mais recentes.
+    Para reproduzir o pandas bit a bit, o acumulador usa a mesma soma de Kahan com
+    inclusões/remoções do roll_mean: o estado consolidado (após o último índice cuja janela já
+    está completa) avança uma posição por amostra, e os valores provisórios são recalculados a
+    partir dele. As amostras brutas necessárias ficam em um buffer circular de 'window + 1'
+    posições e o histórico suavizado em um array NumPy pré-alocado.
+    """
+    def __init__(self, window: int = 4, capacity: int = 0):
+        """
+        Args:
+            window (int): Tamanho da janela da média móvel.
+            capacity (int): Número esperado de amostras (o array cresce se for excedido).
+        """
+        self.window = window
+        self.right = (window - 1) // 2
+        self._ring = [0.0] * (window + 1)  # A janela atual e a amostra que acabou de sair dela
+        self._values = np.zeros(max(1, capacity))
+        self.count = 0
+        self._committed = None  # Estado do acumulador após o último índice consolidado
+
+    @property
+    def history(self) -> np.ndarray:
+        """Visão do histórico suavizado até a última amostra recebida."""
+        return self._values[:self.count]
+
+    def state_dict(self) -> dict:
+        """Estado serializável (ver checkpoint.py): histórico suavizado, buffer circular e acumulador."""
+        return {"window": self.window, "count": self.count, "ring": list(self._ring),
+                "committed": self._committed, "values": self.history.copy()}
+
+    def load_state(self, state: dict) -> None:
+        """Restaura o estado produzido por state_dict()."""
+        if state["window"] != self.window:
+            raise ValueError(f"Checkpoint com janela {state['window']} incompatível com a janela {self.window}.")
+        self.count = state["count"]
+        self._ring = [float(v) for v in state["ring"]]
+        self._committed = list(state["committed"]) if state["committed"] is not None else None
+        self._values = np.zeros(max(len(self._values), self.count, 1))
+        self._values[:self.count] = state["values"]
+
+    def append(self, x: float) -> None:
+        """Adiciona uma amostra bruta (NaN é tratado como 0) e atualiza os valores afetados."""
+        n = self.count
+        if n >= len(self._values):
+            self._values = np.concatenate([self._values, np.zeros(len(self._values))])
+
+        self._ring[n % len(self._ring)] = 0.0 if math.isnan(x) else float(x)
+        self.count = n + 1
+
+        # O índice n - right passa a ter a janela completa: consolida o acumulador até ele
+        first_provisional = max(0, n - self.right)
+        if n - self.right >= 0:
+            self._committed = self._advance(self._committed, n - self.right, self.count)
+            self._values[n - self.right] = self._mean(self._committed)
+            first_provisional += 1
+
+        state = self._committed
+        for i in range(first_provisional, n + 1):
+            state = self._advance(state, i, self.count)
+            self._values[i] = self._mean(state)
+
+    def _advance(self, state: list | None, i: int, n: int) -> list:
+        """Retorna o estado do acumulador após o índice i, com n amostras disponíveis."""
+        end = min(i + 1 + self.right, n)
+        start = max(i + 1 + self.right - self.window, 0)
+        ring, w = self._ring, len(self._ring)
+
+        if state is None or start >= state[8]:
+            # nobs, soma, negativos, compensação (inclusão/remoção), repetições, último valor, início, fim
+            new = [0, 0.0, 0, 0.0, 0.0, 0, ring[start % w], start, end]
+            for j in range(start, end):
+                self._add(new, ring[j % w])
+            return new
+
+        new = list(state)
+        for j in range(state[7], start):
+            self._remove(new, ring[j % w])
+        for j in range(state[8], end):
+            self._add(new, ring[j % w])
+        new[7], new[8] = start, end
+        return new
+
+    @staticmethod
+    def _add(state: list, val: float) -> None:
+        state[0] += 1
+        y = val - state[3]
+        t = state[1] + y
+        state[3] = t - state[1] - y
+        state[1] = t
+        if math.copysign(1.0, val) < 0:
+            state[2] += 1
+        state[5] = state[5] + 1 if val == state[6] else 1
+        state[6] = val
+
+    @staticmethod
+    def _remove(state: list, val: float) -> None:
+        state[0] -= 1
+        y = -val - state[4]
+        t = state[1] + y
+        state[4] = t - state[1] - y
+        state[1] = t
+        if math.copysign(1.0, val) < 0:
+            state[2] -= 1
+
+    @staticmethod
+    def _mean(state: list) -> float:
+        nobs, sum_x, neg_ct = state[0], state[1], state[2]
+        if nobs <= 0:
+            return math.nan
+        result = sum_x / nobs
+        if state[5] >= nobs:
+            result = state[6]
+        elif neg_ct == 0 and result < 0:
+            result = 0.0
+        elif neg_ct == nobs and result > 0:
+            result = 0.0
+        return result
+
+
+class EKFState:
+    """
+    Filtro de Kalman estendido do modelo exponencial de degradação (ESI_k = ESI_{k-1} * e^b),
+    mantido entre minutos e avançado uma medição por vez.
+
+    O estado é (ESI, b) e a covariância P é uma matriz 2x2 guardada em quatro escalares;
+    a predição e a atualização usam a álgebra fechada correspondente, sem alocar matrizes.
+    No minuto n (n amostras suavizadas), o filtro incorpora as medições até o índice n - 2,
+    as mesmas usadas por processing.run_ekf_and_get_rul para o ponto de predição n.
+
+    Modos:
+        - 'stateful': o estado é inicializado uma única vez (b0 a partir das duas últimas
+          amostras disponíveis nesse momento) e avançado a cada minuto. Custo O(1) por minuto.
+        - 'reinit': modo de equivalência. A cada ponto de predição o filtro é reinicializado em
+          t_start com b0 das duas últimas amostras e reexecutado, reproduzindo a semântica de
+          processing.run_ekf_and_get_rul para validação.
+    """
+    def __init__(self, t_start: int, vt: float, wt: float, mode: str = "stateful"):
+        """
+        Args:
+            t_start (int): Índice (baseado em 0) da primeira medição do EKF.
+            vt (float): Desvio padrão do ruído de processo do ESI.
+            wt (float): Desvio padrão do ruído de medição.
+            mode (str): 'stateful' ou 'reinit'.
+        """
+        if mode not in ("stateful", "reinit"):
+            raise ValueError(f"Modo de EKF inválido: {mode}")
+        self.t_start = t_start
+        self.q = vt**2
+        self.r = wt**2
+        self.mode = mode
+        self.initialized = False
+        self._nonzero_until = 0  # Índices consolidados já verificados para o critério de série nula
+        self._nonzero_seen = False
+        self._reset(0.0, 0.001)
+
+    # Estado do filtro e do critério de série nula. A configuração (t_start, q, r, modo) não faz
+    # parte do estado: vem do construtor e é coberta pela identidade do checkpoint
+    STATE_FIELDS = ("x0", "x1", "p00", "p01", "p10", "p11", "next_idx", "halted", "initialized",
+                    "_nonzero_until", "_nonzero_seen")
+
+    def state_dict(self) -> dict:
+        """Estado serializável (ver checkpoint.py): escalares do filtro e do critério de série nula."""
+        return {field: getattr(self, field) for field in self.STATE_FIELDS}
+
+    def load_state(self, state: dict) -> None:
+        """Restaura o estado produzido por state_dict()."""
+        for field in self.STATE_FIELDS:
+            setattr(self, field, state[field])
+
+    def _reset(self, esi0: float, b0: float) -> None:
+        self.x0, self.x1 = esi0, b0
+        self.p00, self.p01, self.p10, self.p11 = 0.1, 0.0, 0.0, 0.1
+        self.next_idx = self.t_start  # Próxima medição a ser incorporada
+        self.halted = False  # ESI estimado chegou a ~0: o filtro para, como no laço original
+
+    @staticmethod
+    def initial_b(z: np.ndarray, pt_idx: int) -> float:
+        """Taxa inicial b0 = |ln(z[pt_idx] / z[pt_idx - 1])|, ou 0.001 se indefinida ou ~0."""
+        if 0 < pt_idx < len(z) and z[pt_idx] > 1e-9 and z[pt_idx - 1] > 1e-9:
+            b0 = np.abs(np.log(z[pt_idx] / z[pt_idx - 1]))
+            return b0 if b0 > 1e-9 else 0.001
+        return 0.001
+
+    def _initialize(self, z: np.ndarray, n: int) -> None:
+        self._reset(z[self.t_start], self.initial_b(z, n - 1))
+        self.initialized = True
+
+    def _step(self, z_k: float) -> None:
+        """Um passo de predição/atualização com a medição z_k (álgebra 2x2 em forma fechada)."""
+        e = np.exp(self.x1)
+        f01 = e * self.x0
+
+        # P_pred = F P F^T + Q, com F = [[e, e*x0], [0, 1]] e Q = diag(q, 0)
+        fp00 = e * self.p00 + f01 * self.p10
+        fp01 = e * self.p01 + f01 * self.p11
+        pp00 = fp00 * e + fp01 * f01 + self.q
+        pp01 = fp01
+        pp10 = self.p10 * e + self.p11 * f01
+        pp11 = self.p11
+
+        # Atualização com H = [1, 0]
+        s = pp00 + self.r
+        k0, k1 = (pp00 / s, pp10 / s) if np.abs(s) >= 1e-12 else (0.0, 0.0)
+        innovation = z_k - e * self.x0
+        self.x0 = e * self.x0 + k0 * innovation
+        self.x1 = self.x1 + k1 * innovation
+        self.p00, self.p01 = (1 - k0) * pp00, (1 - k0) * pp01
+        self.p10, self.p11 = pp10 - k1 * pp00, pp11 - k1 * pp01
+
+    def _run_until(self, z: np.ndarray, stop: int) -> None:
+        """Incorpora as medições de next_idx até stop - 1."""
+        while self.next_idx < stop and not self.halted:
+            if self.x0 <= 1e-9:
+                self.halted = True
+                break
+            self._step(z[self.next_idx])
+            self.next_idx += 1
+
+    def advance(self, z: np.ndarray, n: int) -> None:
+        """
+        Avança o filtro com as medições consolidadas até o índice n - 2.
+        No modo 'reinit' não faz nada: todo o trabalho é feito em rul().
+        """
+        if self.mode != "stateful" or n - 1 <= self.t_start:
+            return
+        if not self.initialized:
+            self._initialize(z, n)
+        self._run_until(z, n - 1)
+
+    def _all_zero(self, z: np.ndarray, n: int) -> bool:
+        """Equivalente a np.all(np.abs(z[:n]) < 1e-9), visitando cada índice consolidado uma única vez."""
+        while not self._nonzero_seen and self._nonzero_until < n - 1:
+            self._nonzero_seen = abs(z[self._nonzero_until]) >= 1e-9
+            self._nonzero_until += 1
+        return not self._nonzero_seen and abs(z[n - 1]) < 1e-9
+
+    def rul_from_state(self, gamma_bar: float) -> float:
+        """RUL (em minutos) até o ESI estimado cruzar gamma_bar, segundo o modelo exponencial."""
+        if self.x0 > 1e-9 and gamma_bar > 1e-9:
+            if self.x1 > 1e-9:
+                return np.log(gamma_bar / self.x0) / self.x1 if gamma_bar > self.x0 else 0.0
+            return np.inf
+        return np.nan
+
+    def rul(self, z: np.ndarray, n: int, gamma_bar: float) -> float:
+        """
+        Calcula o RUL no ponto de predição n (número de amostras disponíveis em z).
+
+        Args:
+            z (np.ndarray): Série de ESI suavizado (ao menos n valores).
+            n (int): Minuto atual (ponto de predição).
+            gamma_bar (float): Limiar de falha.
+        """
+        if n <= 0 or self._all_zero(z, n) or self.t_start >= n - 1:
+            return np.nan
+        if self.mode == "reinit":
+            self._initialize(z, n)
+            self._run_until(z, n - 1)
+        else:
+            self.advance(z, n)
+        return self.rul_from_state(gamma_bar)
+
+
+class RULSampler:
+    """
+    Bandas de incerteza do RUL por Monte Carlo. Em cada ponto de predição, sorteia trajetórias
+    (ESI, b) da posterior do EKF N(x, P), propaga cada uma pelo modelo exponencial até o
+    cruzamento de gamma_bar (RUL = ln(gamma_bar / ESI) / b, com as mesmas regras de
+    EKFState.rul_from_state) e retorna os percentis P5, P50 e P95, tudo em operações vetorizadas
+    sobre buffers pré-alocados.
+
+    As normais padrão são sorteadas uma única vez (semente fixa) e transformadas pelo fator de
+    Cholesky de P a cada predição: as bandas são determinísticas (iguais na retomada de um
+    checkpoint e no replay) e não oscilam entre minutos por causa do sorteio.
+    """
+    PERCENTILES = (5, 50, 95)
+
+    def __init__(self, n_samples: int, seed: int = 0):
+        """
+        Args:
+            n_samples (int): Trajetórias por ponto de predição.
+            seed (int): Semente das normais padrão.
+        """
+        if n_samples < 1:
+            raise ValueError("n_samples deve ser >= 1.")
+        self.n_samples = n_samples
+        self.seed = seed
+        self.z0, self.z1 = np.random.default_rng(seed).standard_normal((2, n_samples))
+        self._q = np.array(self.PERCENTILES) / 100.0
+        self._esi = np.empty(n_samples)
+        self._b = np.empty(n_samples)
+        self._rul = np.empty(n_samples)
+
+    def quantiles(self, ekf: EKFState, gamma_bar: float) -> np.ndarray:
+        """
+        Percentis (P5, P50, P95) do RUL em minutos, a partir do estado atual do filtro. Trajetórias
+        sem cruzamento (b <= 0) contam como RUL infinito; as de ESI não positivo são descartadas.
+        Retorna NaN se nenhuma trajetória for válida.
+        """
+        # Fator de Cholesky da covariância 2x2 (simetrizada e truncada em semidefinida positiva)
+        c = 0.5 * (ekf.p01 + ekf.p10)
+        l00 = math.sqrt(max(ekf.p00, 0.0))
+        l10 = c / l00 if l00 > 0.0 else 0.0
+        l11 = math.sqrt(max(ekf.p11 - l10 * l10, 0.0))
+
+        esi, b, rul = self._esi, self._b, self._rul
+        np.multiply(self.z0, l00, out=esi)
+        esi += ekf.x0
+        np.multiply(self.z0, l10, out=b)
+        np.multiply(self.z1, l11, out=rul)
+        b += rul
+        b += ekf.x1
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            np.divide(gamma_bar, esi, out=rul)
+            np.log(rul, out=rul)
+            rul /= b
+        rul[esi >= gamma_bar] = 0.0
+        rul[b <= 1e-9] = np.inf
+        valid = rul[esi > 1e-9]
+        if valid.size == 0:
+            return np.full(len(self._q), np.nan)
+        return np.quantile(valid, self._q, method="inverted_cdf")
+
+
+class StreamingFDTDetector:
+    """
+    Detector online do Failure Detection Time (FDT), equivalente a processing.detect_fdt
+    aplicado ao histórico completo, mas alimentado com um AES por minuto.
+
+    Guarda apenas as amplitudes dos 12 bins das harmônicas das FCFs (4 componentes x 3
+    harmônicas), o máximo da linha de base do warmup e um contador de sequência acima do
+    limiar por série. O FDT é emitido no minuto em que a condição de persistência é atendida.
+    """
+    N_HARMONICS = 3
+
+    def __init__(self, freqs: np.ndarray, fcf: dict, warmup: int = 3, persistence_len: int = 3,
+                 amp_offset: float = 0.02):
+        """
+        Args:
+            freqs (np.ndarray): Vetor de frequências do AES.
+            fcf (dict): Frequências Características de Falha da condição do rolamento.
+            warmup (int): Número de pontos iniciais usados para a linha de base (>= 1).
+            persistence_len (int): Pontos consecutivos acima do limiar para acionar o FDT.
+            amp_offset (float): Offset somado ao máximo da linha de base para formar o limiar.
+        """
+        if warmup < 1:
+            raise ValueError("warmup deve ser >= 1.")
+        self.warmup = warmup
+        self.persistence_len = persistence_len
+        self.amp_offset = amp_offset
+
+        # Mesma ordem de séries de detect_fdt (componente, depois harmônica), usada no desempate
+        self.series_meta, self.bins = processing.harmonic_table_for(freqs, fcf, self.N_HARMONICS).series_bins(fcf)
+
+        self.count = 0
+        self.base_max = -np.inf
+        self.threshold = None
+        self.runs = np.zeros(len(self.bins), dtype=np.int64)
+        self.fdt = None
+        self.trigger = None
+
+    def state_dict(self) -> dict:
+        """Estado serializável (ver checkpoint.py). Séries e bins são refeitos pelo construtor."""
+        return {"count": self.count, "base_max": self.base_max, "threshold": self.threshold,
+                "runs": self.runs.copy(), "fdt": self.fdt, "trigger": self.trigger}
+
+    def load_state(self, state: dict) -> None:
+        """Restaura o estado produzido por state_dict()."""
+        if len(state["runs"]) != len(self.bins):
+            raise ValueError("Checkpoint do detector de FDT incompatível com as séries monitoradas.")
+        self.count = state["count"]
+        self.base_max = state["base_max"]
+        self.threshold = state["threshold"]
+        self.runs = np.array(state["runs"], dtype=np.int64)
+        self.fdt = state["fdt"]
+        self.trigger = tuple(state["trigger"]) if state["trigger"] is not None else None
+
+    def update(self, amplitudes: np.ndarray | None) -> int | None:
+        """
+        Processa o AES do próximo minuto (None para minuto ausente, tratado como zeros).
+
+        Returns:
+            int | None: O índice do FDT (baseado em 0) no minuto em que ele é detectado; None caso contrário.
+        """
+        if self.fdt is not None:
+            self.count += 1
+            return None
+
+        t = self.count
+        self.count += 1
+        vals = amplitudes[self.bins] if amplitudes is not None else np.zeros(len(self.bins))
+
+        if t < self.warmup:
+            self.base_max = np.maximum(self.base_max, vals.max())
+            if t == self.warmup - 1:
+                self.threshold = self.base_max + self.amp_offset
+            return None
+
+        self.runs = (self.runs + 1) * (vals > self.threshold)
+        hits = np.flatnonzero(self.runs >= self.persistence_len)
+        if hits.size == 0:
+            return None
+
+        self.fdt = t - self.persistence_len + 1
+        self.trigger = self.series_meta[hits[0]]
+        return self.fdt
@@ -0,0 +1,162 @@
+# Ingestão de Sinais ao Vivo
+# Produtores que alimentam um StreamingBearingDataRepository (repository.py) com as amostras de
+# um sensor, para que a simulação processe minutos recém-medidos em vez de arquivos do dataset:
+#   - tcp://host:porta   servidor TCP; o coletor do acelerômetro conecta e envia as amostras
+#   - unix:/caminho      o mesmo, sobre um socket Unix
+#   - file:/caminho      acompanha um arquivo que cresce (como 'tail -f')
+#
+# Formato do fluxo: amostras float32 little-endian em g, com LIVE_CHANNELS canais intercalados
+# (horizontal primeiro) e sem cabeçalho — o conteúdo dos CSVs do XJTU-SY em binário. Cada
+# produtor roda em uma thread e lê com recv_into/readinto em um buffer fixo, sem alocação por
+# bloco recebido. Uma sessão aceita um único produtor; o fim da conexão (ou do arquivo, após
+# 'idle_timeout_s' sem dados) encerra o fluxo e a simulação.
+#
+# A latência de cada minuto (da chegada da sua última amostra até a emissão do ESI) é reportada
+# em eventos 'latency' (ver with_latency), junto com a ocupação do buffer e os minutos perdidos por overrun.
+#
+# Uso (ver main.py --live):
+#   python main.py Bearing1_2 --base_path /caminho/XJTU-SY --live tcp://0.0.0.0:9000 --use_custom_fdt
+
+import os
+import socket
+import threading
+import time
+import config
+from profiling import profiler
+from repository import StreamingBearingDataRepository
+
+
+class SocketSource(threading.Thread):
+    """Servidor (TCP ou Unix) que aceita um produtor e repassa os bytes recebidos ao repositório."""
+    def __init__(self, repository: StreamingBearingDataRepository, family: int, address):
+        super().__init__(name="live-socket", daemon=True)
+        self.repository = repository
+        self.family = family
+        self.address = address
+        self.server = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_UNIX:
+            if os.path.exists(address):
+                os.remove(address)  # Socket de uma sessão anterior
+        else:
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # O bind acontece no construtor para que erros de endereço cheguem a quem abriu a fonte
+        self.server.bind(address)
+        self.server.listen(1)
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        buffer = bytearray(config.LIVE_RECV_BYTES)
+        view = memoryview(buffer)
+        try:
+            print(f"Aguardando produtor em {self.repository.base_path}...")
+            conn, peer = self.server.accept()
+            print(f"Produtor conectado: {peer or self.address}.")
+            with conn:
+                while not self._stopped.is_set():
+                    n = conn.recv_into(buffer)
+                    if n == 0:
+                        break
+                    self.repository.feed_bytes(view[:n])
+            print("Produtor desconectado; encerrando o fluxo ao vivo.")
+        except OSError as e:
+            if not self._stopped.is_set():
+                print(f"Erro na fonte ao vivo {self.repository.base_path}: {e}")
+        finally:
+            self.server.close()
+            if self.family == socket.AF_UNIX and os.path.exists(self.address):
+                os.remove(self.address)
+            self.repository.close()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        try:
+            self.server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.server.close()
+
+
+class FileTailSource(threading.Thread):
+    """Acompanha um arquivo binário que cresce e repassa cada trecho novo ao repositório."""
+    def __init__(self, repository: StreamingBearingDataRepository, path: str, poll_s: float = None,
+                 idle_timeout_s: float = None):
+        """
+        Args:
+            repository (StreamingBearingDataRepository): Repositório alimentado.
+            path (str): Arquivo acompanhado (lido desde o início).
+            poll_s (float, optional): Espera entre leituras sem dados novos (default: config.LIVE_TAIL_POLL_S).
+            idle_timeout_s (float, optional): Encerra o fluxo após esse tempo sem dados; None acompanha indefinidamente.
+        """
+        super().__init__(name="live-tail", daemon=True)
+        self.repository = repository
+        self.path = path
+        self.poll_s = config.LIVE_TAIL_POLL_S if poll_s is None else poll_s
+        self.idle_timeout_s = idle_timeout_s
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        buffer = bytearray(config.LIVE_RECV_BYTES)
+        view = memoryview(buffer)
+        try:
+            with open(self.path, "rb", buffering=0) as f:
+                last_data = time.monotonic()
+                while not self._stopped.is_set():
+                    n = f.readinto(buffer)
+                    if n:
+                        self.repository.feed_bytes(view[:n])
+                        last_data = time.monotonic()
+                    elif self.idle_timeout_s is not None and time.monotonic() - last_data > self.idle_timeout_s:
+                        print(f"Nenhum dado novo em {self.path} há {self.idle_timeout_s:g} s; encerrando o fluxo ao vivo.")
+                        break
+                    else:
+                        self._stopped.wait(self.poll_s)
+        except OSError as e:
+            print(f"Erro na fonte ao vivo {self.path}: {e}")
+        finally:
+            self.repository.close()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+
+def open_source(spec: str, repository: StreamingBearingDataRepository, idle_timeout_s: float = None) -> threading.Thread:
+    """
+    Cria e inicia o produtor descrito por 'spec' ('tcp://host:porta', 'unix:/caminho' ou 'file:/caminho').
+
+    Raises:
+        ValueError: Se a especificação for inválida.
+        OSError: Se o endereço não puder ser aberto (ex.: porta em uso).
+    """
+    scheme, _, target = spec.partition(":")
+    target = target.removeprefix("//")
+    if scheme == "tcp":
+        host, _, port = target.rpartition(":")
+        if not port.isdigit():
+            raise ValueError(f"Fonte ao vivo inválida: {spec} (esperado tcp://host:porta)")
+        source = SocketSource(repository, socket.AF_INET, (host or "0.0.0.0", int(port)))
+    elif scheme == "unix" and target:
+        source = SocketSource(repository, socket.AF_UNIX, target)
+    elif scheme == "file" and target:
+        source = FileTailSource(repository, target, idle_timeout_s=idle_timeout_s)
+    else:
+        raise ValueError(f"Fonte ao vivo inválida: {spec} (use tcp://host:porta, unix:/caminho ou file:/caminho)")
+    source.start()
+    return source
+
+
+def with_latency(events, repository: StreamingBearingDataRepository):
+    """
+    Repassa os eventos da simulação e, depois que o ESI de cada minuto é entregue ao consumidor,
+    gera um evento 'latency' com o tempo desde a chegada da última amostra do minuto e o estado do buffer.
+    """
+    for event in events:
+        yield event
+        if event.get("type") == "esi":
+            arrival = repository.pop_arrival(event["minute"])
+            if arrival is not None:
+                latency = time.monotonic() - arrival
+                profiler.record("live_latency", latency)
+                yield {
+                    "type": "latency", "bearing": event["bearing"], "minute": event["minute"],
+                    "latency_ms": latency * 1e3, **repository.stats(),
+                }
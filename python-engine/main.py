@@ -1,16 +1,70 @@
 # Ponto de Entrada Principal da Aplicação Python
 # Responsável por parsear argumentos da linha de comando e iniciar a simulação.
 import sys
-import json
 import argparse
-from repository import BearingDataRepository, CustomFDTBearingDataRepository
+import config
+import protocol
+from profiling import profiler
+import live_source
+from repository import MemmapBearingDataRepository, StreamingBearingDataRepository
 from simulation import BearingSimulator, CustomFDTBearingSimulator
+from threshold_store import GammaBarStore
+from pacing import Pacer, DEFAULT_SPEED
 
 def main():
     """Função principal que executa o processo."""
     parser = argparse.ArgumentParser(description="Processa dados de rolamento incrementalmente.")
     parser.add_argument("bearing_name", help="Nome do rolamento a ser processado (ex: Bearing1_2).")
     parser.add_argument("--base_path", required=True, help="Caminho base para o dataset XJTU-SY.")
+    parser.add_argument("--store_path", default=None,
+                        help="Diretório do dataset empacotado por signal_store.py. Se omitido (ou se o "
+                             "rolamento não estiver empacotado), os CSVs são lidos diretamente.")
+    parser.add_argument("--ekf_mode", choices=["stateful", "reinit"], default="stateful",
+                        help="'stateful' avança o EKF uma medição por minuto; 'reinit' reinicializa o filtro "
+                             "em cada ponto de predição, como no cálculo original (validação).")
+    parser.add_argument("--prefetch_depth", type=int, default=config.PREFETCH_DEPTH,
+                        help=f"Minutos lidos em segundo plano à frente do atual; 0 desativa (default: {config.PREFETCH_DEPTH}).")
+    parser.add_argument("--prefetch_max_mb", type=float, default=config.PREFETCH_MAX_BYTES / 2**20,
+                        help="Teto de memória, em MiB, dos minutos em leitura antecipada "
+                             f"(default: {config.PREFETCH_MAX_BYTES // 2**20}).")
+    parser.add_argument("--pacing", choices=["batch", "realtime", "rate"], default="realtime",
+                        help="Ritmo entre minutos: 'batch' (sem espera), 'realtime' (velocidade --speed em relação "
+                             "ao tempo real do ensaio) ou 'rate' (--rate minutos por segundo). Default: realtime.")
+    parser.add_argument("--speed", type=float, default=DEFAULT_SPEED,
+                        help=f"Multiplicador de tempo real do modo realtime (default: {DEFAULT_SPEED:g}, ou seja, 10 s por minuto).")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Minutos simulados por segundo no modo rate.")
+    parser.add_argument("--start_minute", "--start-minute", type=int, default=1,
+                        help="Primeiro minuto emitido; os anteriores são processados sem emitir eventos nem pausar.")
+    parser.add_argument("--end_minute", "--end-minute", type=int, default=None,
+                        help="Último minuto processado (default: o último arquivo do rolamento).")
+    parser.add_argument("--resume", action="store_true",
+                        help="Retoma do último checkpoint desta execução (mesmo rolamento e parâmetros), "
+                             "emitindo a partir do minuto seguinte ao último emitido.")
+    parser.add_argument("--checkpoint_every", type=int, default=config.CHECKPOINT_INTERVAL_MINUTES,
+                        help=f"Minutos entre checkpoints; 0 desativa (default: {config.CHECKPOINT_INTERVAL_MINUTES}).")
+    parser.add_argument("--protocol", choices=["json", "binary"], default="json",
+                        help="Formato dos eventos no stdout: 'json' (uma linha por evento) ou 'binary' "
+                             "(quadros com prefixo de tamanho, ver protocol.py).")
+    parser.add_argument("--live", default=None,
+                        help="Processa um fluxo ao vivo em vez dos arquivos do rolamento: tcp://host:porta, "
+                             "unix:/caminho ou file:/caminho (ver live_source.py). O rolamento informado define a "
+                             "condição e os parâmetros do EKF; o gamma_bar vem do dataset em --base_path.")
+    parser.add_argument("--live_buffer_minutes", type=int, default=config.LIVE_BUFFER_MINUTES,
+                        help=f"Minutos completos no buffer circular do fluxo ao vivo (default: {config.LIVE_BUFFER_MINUTES}).")
+    parser.add_argument("--live_overrun", choices=StreamingBearingDataRepository.OVERRUN_POLICIES,
+                        default=config.LIVE_OVERRUN_POLICY,
+                        help="O que fazer com o buffer cheio: descartar o minuto mais antigo, o que está chegando, "
+                             f"ou bloquear o produtor (default: {config.LIVE_OVERRUN_POLICY}).")
+    parser.add_argument("--live_channels", type=int, default=config.LIVE_CHANNELS,
+                        help=f"Canais float32 intercalados no fluxo ao vivo (default: {config.LIVE_CHANNELS}).")
+    parser.add_argument("--live_idle_timeout", type=float, default=None,
+                        help="Com file:, encerra o fluxo após esse tempo (s) sem dados novos (default: nunca).")
+    parser.add_argument("--profile", action="store_true",
+                        help="Mede o tempo de cada etapa e emite eventos 'metrics' (p50/p95 por etapa, minutos/s, RSS); "
+                             "ver profiling.py.")
+    parser.add_argument("--profile_interval", type=int, default=config.PROFILE_INTERVAL_MINUTES,
+                        help=f"Minutos entre eventos 'metrics' (default: {config.PROFILE_INTERVAL_MINUTES}).")
     parser.add_argument("--use_custom_fdt", action="store_true",
                         help="Usa o cálculo dinâmico de FDT ao invés do valor predefinido em config.")
     # Adicione parâmetros para o FDT customizado se quiser torná-los configuráveis via linha de comando
@@ -23,37 +77,81 @@ def main():
 
     args = parser.parse_args()
 
+    # O stdout transporta apenas os eventos; os prints de diagnóstico vão para o stderr
+    output = sys.stdout.buffer
+    sys.stdout = protocol.PrefixedLog(sys.stderr)
+    encoder = protocol.make_encoder(args.protocol)
+
+    def emit(event: dict) -> None:
+        with profiler.stage("encode"):
+            frame = encoder.encode(event)
+        with profiler.stage("write"):
+            output.write(frame)
+            output.flush()
+
+    output.write(encoder.header())
+    profiler.reset(enabled=args.profile)
+    source = None
     try:
+        if args.live and args.resume:
+            raise ValueError("--resume não se aplica a um fluxo ao vivo.")
+        live_repo = gamma_store = None
+        fdt_params = {
+            'warmup': args.fdt_warmup,
+            'persistence_len': args.fdt_persistence_len,
+            'amp_offset': args.fdt_amp_offset
+        }
+        if args.live:
+            live_repo = StreamingBearingDataRepository(args.live, args.live_buffer_minutes, args.live_overrun,
+                                                       args.live_channels, fdt_params=fdt_params)
+            # Os rolamentos de referência do gamma_bar continuam sendo lidos do dataset; o limiar é
+            # resolvido antes de aceitar o produtor, para que o buffer não encha durante o cálculo
+            gamma_store = GammaBarStore(MemmapBearingDataRepository(args.base_path, args.store_path))
+            gamma_store.get_gamma_bar()
+
         # 1. Decidir qual repositório e simulador usar
         if args.use_custom_fdt:
             print("Usando cálculo de FDT dinâmico...")
-            # Prepara os parâmetros para detect_fdt
-            fdt_params = {
-                'warmup': args.fdt_warmup,
-                'persistence_len': args.fdt_persistence_len,
-                'amp_offset': args.fdt_amp_offset
-            }
             # O CustomFDTBearingSimulator já cria e gerencia seu CustomFDTBearingDataRepository
-            simulator = CustomFDTBearingSimulator(args.bearing_name, args.base_path, fdt_params)
+            simulator = CustomFDTBearingSimulator(args.bearing_name, args.base_path, fdt_params, args.store_path,
+                                                  args.ekf_mode, gamma_store, live_repo)
         else:
             print("Usando FDT do arquivo de configuração...")
-            repo = BearingDataRepository(args.base_path)
-            simulator = BearingSimulator(args.bearing_name, repo)
+            repo = live_repo or MemmapBearingDataRepository(args.base_path, args.store_path)
+            simulator = BearingSimulator(args.bearing_name, repo, args.ekf_mode, gamma_store)
+
+        simulator.repository.prefetch_depth = args.prefetch_depth
+        simulator.repository.prefetch_max_bytes = int(args.prefetch_max_mb * 2**20)
+        simulator.pacer = Pacer.from_policy(args.pacing, args.speed, args.rate)
+        simulator.checkpoint_every = args.checkpoint_every
+        simulator.metrics_every = max(1, args.profile_interval)
+
+        events = simulator.run_incremental_simulation(args.start_minute, args.end_minute, args.resume)
+        if live_repo is not None:
+            # Os minutos chegam no ritmo do sensor: sem pausas entre eles, checkpoints ou store de resultados
+            simulator.pacer = Pacer.from_policy("batch")
+            simulator.checkpoint_every = 0
+            simulator.results = None
+            source = live_source.open_source(args.live, live_repo, args.live_idle_timeout)
+            events = live_source.with_latency(events, live_repo)
 
-        # 2. Executar o gerador da simulação e imprimir cada resultado
-        for result_json in simulator.run_incremental_simulation():
-            print(result_json, flush=True)
+        # 2. Executar o gerador da simulação e emitir cada resultado
+        for event in events:
+            emit(event)
 
-    except (ValueError, RuntimeError, FileNotFoundError) as e:
+    except (ValueError, RuntimeError, OSError) as e:
         # Captura erros de configuração ou de execução e envia como um JSON de erro
         error_output = {"type": "error", "message": str(e)}
-        print(json.dumps(error_output), flush=True)
+        emit(error_output)
         sys.exit(1)
     except Exception as e:
         # Captura qualquer outro erro inesperado
         error_output = {"type": "error", "message": f"Erro inesperado no script Python: {e}"}
-        print(json.dumps(error_output), flush=True)
+        emit(error_output)
         sys.exit(1)
+    finally:
+        if source is not None:
+            source.stop()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,69 @@
+# Ritmo da Simulação (Pacing)
+# Define quanto tempo real separa a emissão de dois minutos consecutivos da simulação.
+#
+# Políticas:
+#   - 'batch'   : sem espera; os minutos são processados o mais rápido possível.
+#   - 'realtime': velocidade relativa ao tempo real do ensaio (um arquivo por minuto no XJTU-SY);
+#                 speed=6 equivale à pausa fixa de 10 s usada originalmente.
+#   - 'rate'    : taxa alvo de minutos simulados por segundo.
+#
+# As esperas são calculadas por prazo (deadline): o tempo gasto processando o minuto é
+# descontado do intervalo, em vez de somar uma pausa fixa a ele.
+
+import time
+
+SECONDS_PER_DATASET_MINUTE = 60.0
+DEFAULT_SPEED = 6.0  # 10 s por minuto, como o time.sleep(10) original
+
+
+class Pacer:
+    """Controla o intervalo entre minutos. 'sleep' pode ser trocado por uma espera cancelável."""
+    def __init__(self, interval_s: float, sleep=time.sleep, clock=time.monotonic):
+        """
+        Args:
+            interval_s (float): Intervalo alvo entre minutos, em segundos (0 = sem espera).
+            sleep (callable): Função de espera (recebe segundos).
+            clock (callable): Relógio monotônico.
+        """
+        self.interval_s = interval_s
+        self.sleep = sleep
+        self.clock = clock
+        self._deadline = None
+
+    @classmethod
+    def from_policy(cls, pacing: str = "realtime", speed: float = DEFAULT_SPEED, rate: float = None, **kwargs) -> "Pacer":
+        """
+        Cria o Pacer de uma política ('batch', 'realtime' ou 'rate').
+
+        Raises:
+            ValueError: Para política desconhecida ou velocidade/taxa não positiva.
+        """
+        if pacing == "batch":
+            return cls(0.0, **kwargs)
+        if pacing == "realtime":
+            if not speed or speed <= 0:
+                raise ValueError(f"Velocidade inválida para o modo realtime: {speed}")
+            return cls(SECONDS_PER_DATASET_MINUTE / speed, **kwargs)
+        if pacing == "rate":
+            if not rate or rate <= 0:
+                raise ValueError(f"Taxa inválida para o modo rate (minutos por segundo): {rate}")
+            return cls(1.0 / rate, **kwargs)
+        raise ValueError(f"Política de ritmo desconhecida: {pacing}")
+
+    def start(self) -> None:
+        """Marca o início do primeiro intervalo (chamado quando o primeiro minuto paceado começa)."""
+        self._deadline = self.clock() + self.interval_s
+
+    def tick(self) -> None:
+        """Espera até o fim do intervalo do minuto atual e abre o intervalo do próximo."""
+        if self.interval_s <= 0:
+            return
+        if self._deadline is None:
+            self.start()
+        remaining = self._deadline - self.clock()
+        if remaining > 0:
+            self.sleep(remaining)
+            self._deadline += self.interval_s
+        else:
+            # Atrasado (processamento mais lento que o ritmo): não acumula atraso para compensar em rajada
+            self._deadline = self.clock() + self.interval_s
@@ -3,71 +3,149 @@
 # Essas funções não dependem de onde os dados vêm, apenas dos dados em si.
 
 import numpy as np
-from scipy.signal import butter, filtfilt, hilbert
+from functools import lru_cache
+from scipy.signal import butter, sosfiltfilt, hilbert
 from scipy.signal.windows import hann
+from numpy.lib.stride_tricks import sliding_window_view
 import config
 
 # Funções de cálculo (compute_aes, compute_esi, run_ekf_and_get_rul)
-# As funções compute_aes e run_ekf_and_get_rul são mantidas como no original,
-# mas agora recebem todos os parâmetros de que precisam, em vez de usar globais.
+# A função run_ekf_and_get_rul é mantida como no original, mas agora recebe todos os
+# parâmetros de que precisa, em vez de usar globais. compute_aes foi vetorizada e aceita
+# blocos de sinais, mantendo a mesma escala de amplitude e o mesmo vetor de frequências.
+# compute_esi e detect_fdt usam uma tabela memoizada dos bins das harmônicas das FCFs.
 
 def compute_aes(env, fs_signal, L, overlap, use_hanning_window=False):
-    # (Mesmo código da função original, sem alterações na lógica interna)
+    """
+    Calcula o espectro de amplitude do envelope (AES) pelo método de Welch.
+
+    Os segmentos sobrepostos são obtidos como uma visão (sem cópia) do sinal e transformados
+    com uma única rfft em lote; a média é feita em uma única redução. Aceita um sinal 1-D ou
+    um bloco N-D (ex.: minutos x amostras), processado ao longo do último eixo.
+
+    Returns:
+        tuple: (amplitudes, freq_vector), com amplitudes de shape (..., L // 2).
+    """
+    env = np.asarray(env)
     step = L - overlap
-    if len(env) < L: env = np.pad(env, (0, L - len(env)), 'constant', constant_values=0)
+    n = env.shape[-1]
+    if n < L:
+        pad_width = [(0, 0)] * (env.ndim - 1) + [(0, L - n)]
+        env = np.pad(env, pad_width, 'constant', constant_values=0)
     if step <= 0:
         if L > 0 : step = L
         else: return np.array([]), np.array([])
 
-    Ns = (len(env) - L) // step + 1
-    if Ns <= 0: Ns = 1
+    # Visão (..., Ns, L) dos segmentos; todos têm comprimento L, pois len(env) >= L
+    segments = sliding_window_view(env, L, axis=-1)[..., ::step, :]
+    if use_hanning_window: segments = segments * hann(L, sym=False)
 
-    power_spec_sum = np.zeros(L)
-    window = np.ones(L)
-    if use_hanning_window: window = hann(L, sym=False)
+    spectrum = np.fft.rfft(segments, n=L, axis=-1)[..., :L // 2]
+    avg_power_spec_scaled = np.mean(spectrum.real**2 + spectrum.imag**2, axis=-2) / (L**2)
 
-    actual_segments_processed = 0
-    for s_idx in range(Ns):
-        seg_start, seg_end = s_idx * step, s_idx * step + L
-        current_seg = env[seg_start : seg_end]
-        if len(current_seg) < L: current_seg = np.pad(current_seg, (0, L - len(current_seg)), 'constant', constant_values=0)
+    final_amplitude_spec = np.sqrt(np.maximum(0, avg_power_spec_scaled))
+    if final_amplitude_spec.shape[-1] > 1: final_amplitude_spec[..., 1:] *= 2
 
-        windowed_seg = current_seg * window
-        power_spec_segment = np.abs(np.fft.fft(windowed_seg))**2 / (L**2)
-        power_spec_sum += power_spec_segment
-        actual_segments_processed +=1
+    return final_amplitude_spec, aes_freq_vector(fs_signal, L)
 
-    if actual_segments_processed == 0: avg_power_spec_scaled = np.zeros(L // 2)
-    else: avg_power_spec_scaled = (power_spec_sum / actual_segments_processed)[:L//2]
 
-    avg_amplitude_spec_unscaled = np.sqrt(np.maximum(0, avg_power_spec_scaled))
-    final_amplitude_spec = np.copy(avg_amplitude_spec_unscaled)
-    if len(final_amplitude_spec) > 1: final_amplitude_spec[1:] = 2 * final_amplitude_spec[1:]
+def aes_freq_vector(fs_signal, L):
+    """Vetor de frequências (L // 2 bins) associado ao AES de compute_aes."""
+    return np.arange(L//2) * fs_signal / L
 
-    freq_vector = np.arange(L//2) * fs_signal / L
-    return final_amplitude_spec, freq_vector
 
+FCF_COMPONENTS = ("FTF", "BSF", "BPFO", "BPFI")  # Ordem das componentes no somatório do ESI
 
-def compute_esi(S_e_amplitude, f_vector, condition, N_harm=3, bw=0):
-    # (Mesmo código da função original, sem alterações na lógica interna)
-    esi_val = 0.0
-    fcf_values = config.FCFS[condition]
-    if len(S_e_amplitude) == 0 or len(f_vector) == 0: return 0.0
 
-    for n_h in range(1, N_harm + 1):
-        for fcf_type in ["FTF", "BSF", "BPFO", "BPFI"]:
-            target_freq = n_h * fcf_values[fcf_type]
-            if len(f_vector) == 0: continue
+class HarmonicIndexTable:
+    """
+    Tabela dos bins do AES ao redor das harmônicas das FCFs, montada uma única vez por
+    configuração (ver harmonic_index_table) em vez de refazer a busca do bin mais próximo a
+    cada minuto.
+
+    Atributos:
+        bins (np.ndarray): Bin mais próximo de cada (harmônica, componente), shape (N_harm, 4).
+        index (np.ndarray): Bins de cada (harmônica, componente, deslocamento -bw..bw), limitados
+                            ao vetor de frequências, shape (N_harm, 4, 2 * bw + 1).
+        mask (np.ndarray): 1.0 para os bins dentro do vetor e 0.0 para os que caíram fora dele.
+    """
+    def __init__(self, f_vector: np.ndarray, fcf: dict, n_harm: int = 3, bw: int = 0):
+        f_vector = np.asarray(f_vector)
+        self.components = FCF_COMPONENTS
+        self.n_harm = n_harm
+        self.bw = bw
+        targets = np.arange(1, n_harm + 1)[:, None] * np.array([fcf[c] for c in self.components])[None, :]
+        self.bins = np.abs(f_vector[None, None, :] - targets[:, :, None]).argmin(axis=-1) if len(f_vector) else \
+            np.zeros(targets.shape, dtype=np.int64)
+
+        positions = self.bins[:, :, None] + np.arange(-bw, bw + 1)
+        inside = (positions >= 0) & (positions < len(f_vector))
+        self.index = np.clip(positions, 0, max(len(f_vector) - 1, 0))
+        self.mask = inside.astype(float)
+        self._masked = not inside.all()
+        self._empty = len(f_vector) == 0
+
+    def series_bins(self, fcf: dict) -> tuple[list, np.ndarray]:
+        """Séries (componente, harmônica) na ordem de detect_fdt (componente, depois harmônica) e seus bins."""
+        series_meta = [(comp, h) for comp in fcf for h in range(1, self.n_harm + 1)]
+        bins = np.array([self.bins[h - 1, self.components.index(comp)] for comp, h in series_meta], dtype=np.int64)
+        return series_meta, bins
+
+    def esi(self, S_e_amplitude: np.ndarray, return_components: bool = False):
+        """
+        ESI de um espectro (1-D) ou de um bloco de espectros (..., N_frequências).
+
+        A soma é sequencial na ordem (harmônica, componente, bin). Com bw=0 o resultado é idêntico
+        bit a bit ao do cálculo original; com bw>0 a soma acumulada difere da soma por janela do
+        original em até ~1e-14 (arredondamento). Com return_components=True, também retorna o ESI de cada
+        componente (FTF/BSF/BPFO/BPFI), shape (..., 4), a partir dos mesmos valores coletados.
+        """
+        S_e_amplitude = np.asarray(S_e_amplitude)
+        if self._empty or S_e_amplitude.shape[-1] == 0:
+            esi = np.zeros(S_e_amplitude.shape[:-1])[()]
+            return (esi, np.zeros(S_e_amplitude.shape[:-1] + (len(self.components),))) if return_components else esi
+
+        values = S_e_amplitude[..., self.index]  # (..., N_harm, 4, 2 * bw + 1)
+        if self._masked:
+            values = values * self.mask
+        esi = np.cumsum(values.reshape(values.shape[:-3] + (-1,)), axis=-1)[..., -1]
+        if return_components:
+            return esi, values.sum(axis=(-3, -1))
+        return esi
+
 
-            idx = np.argmin(np.abs(f_vector - target_freq))
-            start_idx = max(0, idx - bw)
-            end_idx = min(len(S_e_amplitude) -1 , idx + bw)
+@lru_cache(maxsize=None)
+def harmonic_index_table(condition: str, fs_signal: float, L: int, n_harm: int = 3, bw: int = 0) -> HarmonicIndexTable:
+    """Tabela de bins das harmônicas para o AES de compute_aes(fs_signal, L) (memoizada por configuração)."""
+    return HarmonicIndexTable(aes_freq_vector(fs_signal, L), config.FCFS[condition], n_harm, bw)
 
-            if start_idx <= end_idx:
-                esi_val += np.sum(S_e_amplitude[start_idx : end_idx + 1])
-            elif start_idx == end_idx + 1 and start_idx < len(S_e_amplitude):
-                 esi_val += S_e_amplitude[start_idx]
-    return esi_val
+
+def harmonic_table_for(f_vector: np.ndarray, fcf: dict, n_harm: int = 3, bw: int = 0) -> HarmonicIndexTable:
+    """
+    Tabela para um vetor de frequências e um dicionário de FCFs quaisquer. Quando eles são os de
+    uma condição de config.FCFS e de aes_freq_vector, usa a tabela memoizada.
+    """
+    f_vector = np.asarray(f_vector)
+    condition = next((c for c, values in config.FCFS.items() if values == fcf), None)
+    n = len(f_vector)
+    if condition is not None and n > 1:
+        L, fs_signal = 2 * n, f_vector[1] * 2 * n
+        if f_vector[0] == 0 and f_vector[-1] == (n - 1) * fs_signal / L:
+            return harmonic_index_table(condition, float(fs_signal), L, n_harm, bw)
+    return HarmonicIndexTable(f_vector, fcf, n_harm, bw)
+
+
+def compute_esi(S_e_amplitude, f_vector, condition, N_harm=3, bw=0, return_components=False):
+    """
+    Calcula o ESI: soma das amplitudes do AES nos bins das N_harm primeiras harmônicas das
+    FCFs da condição (mais 'bw' bins de cada lado).
+
+    Aceita um espectro (retorna um escalar) ou um bloco de espectros (..., N_frequências),
+    retornando um array de ESIs. Com return_components=True, retorna também o ESI de cada
+    componente (FTF/BSF/BPFO/BPFI) no último eixo.
+    """
+    table = harmonic_table_for(f_vector, config.FCFS[condition], N_harm, bw)
+    return table.esi(S_e_amplitude, return_components)
 
 def run_ekf_and_get_rul(esi_series_input, t_start_ekf, t_pts_list, gamma_bar_val,
                         vt_noise_val, wt_noise_val, num_files_bearing_total_or_upto_pt, esi_type_label=""):
@@ -133,11 +211,33 @@ def run_ekf_and_get_rul(esi_series_input, t_start_ekf, t_pts_list, gamma_bar_val
     return RULs_ekf, b_k_histories_ekf, final_b_estimates_ekf, initial_b_states_used_ekf
 
 
-def get_envelope_from_signal(signal: np.ndarray) -> np.ndarray:
-    """Aplica filtro passa-alta e calcula o envelope de um sinal."""
-    b_filt, a_filt = butter(4, 1000 / (config.FS / 2), btype='highpass')
-    filtered_sig = filtfilt(b_filt, a_filt, signal)
-    return np.abs(hilbert(filtered_sig))
+@lru_cache(maxsize=None)
+def design_highpass_sos(order: int, cutoff_hz: float, fs: float) -> np.ndarray:
+    """
+    Projeta (uma única vez por combinação de parâmetros) o filtro Butterworth passa-alta
+    do envelope, na forma de seções de segunda ordem (SOS). O array retornado é compartilhado
+    entre as chamadas e não deve ser modificado.
+    """
+    return butter(order, cutoff_hz / (fs / 2), btype='highpass', output='sos')
+
+def get_envelope_from_signal(signal: np.ndarray, axis: int = -1, use_float32: bool = False) -> np.ndarray:
+    """
+    Aplica filtro passa-alta (fase zero) e calcula o envelope de um sinal.
+
+    Aceita um único minuto ou um bloco N-D (ex.: minutos x amostras, ou os dois canais juntos);
+    a filtragem e a transformada de Hilbert são feitas ao longo de 'axis' em uma única chamada.
+
+    Args:
+        signal (np.ndarray): Sinal(is) em m/s^2.
+        axis (int): Eixo das amostras.
+        use_float32 (bool): Calcula em float32 (mais rápido, metade da memória). Em relação ao
+            caminho float64, o erro absoluto do envelope fica abaixo de 1e-5 x max(|envelope|) e o
+            ESI resultante difere menos de 1e-5 em termos relativos.
+    """
+    sos = design_highpass_sos(config.ENVELOPE_FILTER_ORDER, config.ENVELOPE_CUTOFF_HZ, config.FS)
+    dtype = np.float32 if use_float32 else np.float64
+    filtered_sig = sosfiltfilt(sos.astype(dtype, copy=False), np.asarray(signal, dtype=dtype), axis=axis)
+    return np.abs(hilbert(filtered_sig, axis=axis))
 
 def detect_fdt(results, warmup=3, persistence_len=3, amp_offset=0.02):
     """
@@ -169,15 +269,9 @@ def detect_fdt(results, warmup=3, persistence_len=3, amp_offset=0.02):
 
     fcf = results['fcf']
 
-    series_meta = []
-    # Coleta as amplitudes para as harmônicas das FCFs
-    for comp, f0 in fcf.items():
-        for h in (1, 2, 3): # Considera as primeiras 3 harmônicas
-            target_freq = h * f0
-            # Encontra o índice da frequência mais próxima
-            idx = np.argmin(np.abs(freqs - target_freq))
-            # Armazena a componente, harmônica e a série temporal das amplitudes para essa frequência
-            series_meta.append((comp, h, amps[:, idx])) # amps[:, idx] é a série temporal para uma frequência
+    # Coleta as amplitudes para as 3 primeiras harmônicas das FCFs (bins da tabela memoizada)
+    series_keys, bins = harmonic_table_for(freqs, fcf).series_bins(fcf)
+    series_meta = [(comp, h, amps[:, idx]) for (comp, h), idx in zip(series_keys, bins)] # amps[:, idx] é a série temporal para uma frequência
 
     # Calcula a linha de base máxima usando os primeiros 'warmup' pontos para todas as séries
     # Considera o valor máximo em todas as séries dentro do período de warmup
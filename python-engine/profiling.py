@@ -0,0 +1,134 @@
+# Instrumentação do Caminho Crítico (Profiling)
+# Mede o tempo de cada etapa do processamento de um minuto (leitura, envelope, AES, ESI,
+# suavização, EKF, FDT, codificação e escrita dos eventos) e conta ocorrências relevantes
+# (minutos processados, acertos do cache de características), para mostrar onde o tempo de
+# uma execução é gasto. Desativada (padrão), cada ponto de medição custa uma verificação de
+# atributo: stage() retorna um contexto nulo compartilhado e record()/count() retornam direto.
+#
+# Com a instrumentação ativa (main.py --profile ou "profile": true na requisição), a simulação
+# emite a cada PROFILE_INTERVAL_MINUTES minutos (e ao terminar) um evento 'metrics' com
+# contagem, tempo total, p50 e p95 de cada etapa (percentis sobre as últimas PROFILE_WINDOW
+# medições), minutos/s desde o início da execução e a memória residente (RSS) do processo.
+#
+# As medições são globais ao processo (o worker residente executa um job por vez, e as threads
+# de leitura antecipada registram a leitura dos minutos); reset() inicia uma nova execução.
+
+import contextlib
+import os
+import sys
+import threading
+import time
+from collections import deque
+import numpy as np
+import config
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class _Stage:
+    """Contexto que mede uma etapa e registra a duração no profiler ao sair."""
+    __slots__ = ("profiler", "name", "started")
+
+    def __init__(self, profiler: "StageProfiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def rss_bytes() -> int | None:
+    """Memória residente atual do processo (fora do Linux, o pico informado por getrusage)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # macOS informa bytes; Linux/BSD, KiB
+
+
+class StageProfiler:
+    """Tempos por etapa e contadores de uma execução."""
+    def __init__(self, window: int = None):
+        """
+        Args:
+            window (int, optional): Medições mais recentes guardadas por etapa para os percentis
+                                    (default: config.PROFILE_WINDOW).
+        """
+        self.window = window or config.PROFILE_WINDOW
+        self._lock = threading.Lock()
+        self.reset(enabled=False)
+
+    def reset(self, enabled: bool = True) -> None:
+        """Descarta as medições anteriores e ativa (ou desativa) a instrumentação."""
+        with self._lock:
+            self.enabled = enabled
+            self.samples = {}  # Etapa -> últimas durações (s)
+            self.totals = {}  # Etapa -> [contagem, tempo total (s)]
+            self.counters = {}
+            self.started = time.perf_counter()
+
+    def stage(self, name: str):
+        """Contexto que mede o bloco como a etapa 'name' (nulo com a instrumentação desativada)."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name: str, seconds: float) -> None:
+        """Registra uma duração (s) da etapa 'name'."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.window)
+                self.totals[name] = [0, 0.0]
+            self.samples[name].append(seconds)
+            totals = self.totals[name]
+            totals[0] += 1
+            totals[1] += seconds
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Incrementa o contador 'name'."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def metrics_event(self, bearing_name: str, minute: int) -> dict:
+        """Evento 'metrics' com o resumo das medições até agora."""
+        with self._lock:
+            samples = {name: np.fromiter(values, dtype=float, count=len(values)) for name, values in self.samples.items()}
+            totals = {name: tuple(values) for name, values in self.totals.items()}
+            counters = dict(self.counters)
+        elapsed = time.perf_counter() - self.started
+
+        stages = {}
+        for name, values in samples.items():
+            p50, p95 = np.percentile(values, [50, 95]) * 1e3
+            count, total = totals[name]
+            stages[name] = {"count": count, "total_ms": total * 1e3, "mean_ms": total * 1e3 / count,
+                            "p50_ms": float(p50), "p95_ms": float(p95)}
+        minutes = counters.pop("minutes", 0)
+        rss = rss_bytes()
+        return {
+            "type": "metrics", "bearing": bearing_name, "minute": minute,
+            "minutes": minutes, "elapsed_s": elapsed, "minutes_per_s": minutes / elapsed if elapsed > 0 else None,
+            "rss_mb": rss / 2**20 if rss is not None else None,
+            "stages": stages, "counters": counters,
+        }
+
+
+profiler = StageProfiler()  # Instância do processo, usada pelos pontos de medição
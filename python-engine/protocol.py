@@ -0,0 +1,95 @@
+# Protocolo de Saída do Motor Python
+# Codifica os eventos da simulação (dicts) para o stdout lido pelo backend Node.
+#
+# Dois formatos:
+#   - 'json'  : uma linha JSON por evento (formato original, legível no terminal).
+#   - 'binary': quadros com prefixo de tamanho. Cada quadro é
+#               <uint32 LE: tamanho do conteúdo> <uint8: tipo> <conteúdo>
+#               tipo 0 = evento JSON (UTF-8), 1 = esi e 2 = rul em layout fixo (little-endian):
+#                 esi: <uint32 minuto> <float64 value_raw_ms2 (NaN = null)> <float64 value_smoothed_ms2>
+#                 rul: <uint32 minuto> <float64 RUL (inf/NaN preservados)> <float64 P5> <float64 P50> <float64 P95>
+#                      (percentis das bandas de incerteza; NaN = null)
+#               Os campos derivados (valores em g, is_inf, is_nan) e o rolamento da sessão são
+#               reconstruídos pelo decodificador. O primeiro quadro é um JSON {"type": "protocol", ...}
+#               com a versão e a constante de gravidade usada na conversão para g.
+#
+# Os prints de diagnóstico não passam por aqui: o main.py os envia ao stderr com o prefixo LOG_PREFIX.
+
+import json
+import struct
+import numpy as np
+import config
+
+PROTOCOL_VERSION = 2
+LOG_PREFIX = "[log] "
+
+FRAME_HEADER = struct.Struct("<IB")
+ESI_RECORD = struct.Struct("<Idd")
+RUL_RECORD = struct.Struct("<Idddd")
+KIND_JSON, KIND_ESI, KIND_RUL = 0, 1, 2
+
+
+class JsonLinesEncoder:
+    """Uma linha JSON por evento."""
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, event: dict) -> bytes:
+        return (json.dumps(event) + "\n").encode("utf-8")
+
+
+class BinaryEncoder:
+    """Quadros com prefixo de tamanho; esi e rul sem erro usam o layout fixo."""
+    def header(self) -> bytes:
+        return self._frame(KIND_JSON, json.dumps({
+            "type": "protocol", "version": PROTOCOL_VERSION, "grav_accel": config.GRAV_ACCEL,
+        }).encode("utf-8"))
+
+    @staticmethod
+    def _frame(kind: int, payload: bytes) -> bytes:
+        return FRAME_HEADER.pack(len(payload) + 1, kind) + payload
+
+    def encode(self, event: dict) -> bytes:
+        event_type = event.get("type")
+        if event_type == "esi" and event["error"] is None:
+            raw = event["value_raw_ms2"]
+            return self._frame(KIND_ESI, ESI_RECORD.pack(
+                event["minute"], np.nan if raw is None else raw, event["value_smoothed_ms2"]))
+        if event_type == "rul":
+            if event["is_nan"]:
+                value = np.nan
+            elif event["is_inf"]:
+                value = np.inf
+            else:
+                value = event["rul_predicted_min"]
+            bands = (np.nan if event[key] is None else event[key] for key in ("rul_p5_min", "rul_p50_min", "rul_p95_min"))
+            return self._frame(KIND_RUL, RUL_RECORD.pack(event["minute"], value, *bands))
+        return self._frame(KIND_JSON, json.dumps(event).encode("utf-8"))
+
+
+def make_encoder(name: str):
+    """Retorna o codificador do formato pedido ('json' ou 'binary')."""
+    if name == "binary":
+        return BinaryEncoder()
+    if name == "json":
+        return JsonLinesEncoder()
+    raise ValueError(f"Protocolo desconhecido: {name}")
+
+
+class PrefixedLog:
+    """Substitui sys.stdout: cada linha impressa vai para 'stream' (stderr) precedida de LOG_PREFIX."""
+    def __init__(self, stream):
+        self.stream = stream
+        self._buffer = ""
+
+    def write(self, text: str) -> int:
+        self._buffer += text
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            if line.strip():
+                self.stream.write(LOG_PREFIX + line + "\n")
+                self.stream.flush()
+        return len(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
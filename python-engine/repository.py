@@ -5,8 +5,17 @@
 import pandas as pd
 import numpy as np
 import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 import config
 import processing
+from incremental import StreamingFDTDetector
+from feature_cache import MinuteFeatureExtractor
+from signal_store import PackedSignalStore
+from profiling import profiler
 
 class BearingDataRepository:
     """
@@ -20,6 +29,8 @@ class BearingDataRepository:
             base_path (str): O caminho raiz para a pasta do dataset XJTU-SY.
         """
         self.base_path = base_path
+        self.prefetch_depth = config.PREFETCH_DEPTH
+        self.prefetch_max_bytes = config.PREFETCH_MAX_BYTES
 
     def get_bearing_metadata(self, bearing_name: str) -> dict | None:
         """Retorna os metadados de um rolamento específico."""
@@ -29,21 +40,55 @@ class BearingDataRepository:
         """Retorna os metadados de todos os rolamentos listados no artigo."""
         return config.ARTICLE_BEARINGS_DATA
 
+    def get_condition_for_bearing(self, bearing_name: str) -> str | None:
+        """Retorna a condição de operação de um rolamento, inclusive dos que não estão no artigo."""
+        metadata = self.get_bearing_metadata(bearing_name)
+        if metadata:
+            return metadata["condition_key"]
+        group = bearing_name.removeprefix("Bearing").split("_")[0]
+        return config.CONDITION_BY_BEARING_GROUP.get(group)
+
     def get_num_files_for_bearing(self, bearing_name: str) -> int | None:
         """Retorna o número total de arquivos para um rolamento."""
         return config.NUM_FILES_DICT_FULL.get(bearing_name)
 
+    def get_source_mtimes(self, condition: str, bearing_name: str) -> list[int | None]:
+        """
+        Retorna o mtime (em ns) de cada arquivo de minuto do rolamento, na ordem dos minutos.
+        Arquivos ausentes são representados por None. Usado para invalidar caches derivados dos dados.
+        """
+        num_files = self.get_num_files_for_bearing(bearing_name) or 0
+        mtimes = []
+        for minute in range(1, num_files + 1):
+            file_path = os.path.join(self.base_path, condition, bearing_name, f"{minute}.csv")
+            try:
+                mtimes.append(os.stat(file_path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return mtimes
+
+    def read_minute_channels(self, condition: str, bearing_name: str, minute: int) -> list[np.ndarray]:
+        """
+        Lê o CSV de um minuto e retorna os canais (horizontal, vertical) em m/s^2,
+        como float32 e sem ajuste de comprimento. Propaga exceções de leitura.
+        """
+        file_path = os.path.join(self.base_path, condition, bearing_name, f"{minute}.csv")
+        df = pd.read_csv(file_path, header=None, skiprows=1)
+
+        # Converte para numpy, aplica aceleração da gravidade e garante tipo float
+        return [
+            pd.to_numeric(df.iloc[:, ch], errors='coerce').dropna().to_numpy(np.float32) * config.GRAV_ACCEL
+            for ch in range(min(2, df.shape[1]))
+        ]
+
     def get_signal_for_minute(self, condition: str, bearing_name: str, minute: int) -> np.ndarray | None:
         """
         Busca, lê e pré-processa o sinal de um rolamento para um minuto específico.
         Retorna o sinal em m/s^2 ou None se o arquivo não for encontrado.
         """
         try:
-            file_path = os.path.join(self.base_path, condition, bearing_name, f"{minute}.csv")
-            df = pd.read_csv(file_path, header=None, skiprows=1)
-
-            # Converte para numpy, aplica aceleração da gravidade e garante tipo float
-            sig = pd.to_numeric(df.iloc[:, 0], errors='coerce').dropna().to_numpy(np.float32) * config.GRAV_ACCEL
+            with profiler.stage("read_csv"):
+                sig = self.read_minute_channels(condition, bearing_name, minute)[0]
 
             # Garante que o sinal tenha o comprimento esperado (padding ou truncating)
             if len(sig) < config.EXPECTED_LEN:
@@ -58,12 +103,98 @@ class BearingDataRepository:
             # Captura outras exceções de leitura de arquivo ou processamento
             return None
 
-class CustomFDTBearingDataRepository(BearingDataRepository):
+    def _prefetch_minute(self, condition: str, bearing_name: str, minute: int) -> np.ndarray | None:
+        """Leitura executada nas threads de prefetch (por padrão, a mesma de get_signal_for_minute)."""
+        return self.get_signal_for_minute(condition, bearing_name, minute)
+
+    def iter_signals(self, condition: str, bearing_name: str, minutes, depth: int = None, max_bytes: int = None):
+        """
+        Gera (minuto, sinal) na ordem de 'minutes', mantendo os próximos minutos sendo lidos e
+        decodificados em threads de segundo plano enquanto o minuto atual é processado.
+
+        Args:
+            condition (str): Condição de operação do rolamento.
+            bearing_name (str): Nome do rolamento.
+            minutes (iterable[int]): Minutos a ler, em ordem.
+            depth (int, optional): Máximo de minutos em leitura antecipada (default: self.prefetch_depth).
+                0 lê de forma sequencial, sem threads.
+            max_bytes (int, optional): Teto de memória dos minutos em espera (default: self.prefetch_max_bytes).
+        """
+        depth = self.prefetch_depth if depth is None else depth
+        max_bytes = self.prefetch_max_bytes if max_bytes is None else max_bytes
+        depth = min(depth, max_bytes // (config.EXPECTED_LEN * np.dtype(np.float32).itemsize))
+
+        minutes = iter(minutes)
+        if depth <= 0:
+            for minute in minutes:
+                yield minute, self.get_signal_for_minute(condition, bearing_name, minute)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=min(depth, config.PREFETCH_WORKERS), thread_name_prefix="prefetch")
+        try:
+            pending = deque((m, executor.submit(self._prefetch_minute, condition, bearing_name, m))
+                            for m in islice(minutes, depth))
+            while pending:
+                minute, future = pending.popleft()
+                for next_minute in islice(minutes, 1):
+                    pending.append((next_minute, executor.submit(self._prefetch_minute, condition, bearing_name, next_minute)))
+                with profiler.stage("signal_wait"):  # Tempo em que o processamento espera a leitura antecipada
+                    signal = future.result()
+                yield minute, signal
+        finally:
+            # Se o consumidor parar antes do fim, as leituras ainda não iniciadas são descartadas
+            executor.shutdown(wait=False, cancel_futures=True)
+
+class MemmapBearingDataRepository(BearingDataRepository):
+    """
+    Repositório que serve os minutos a partir do dataset empacotado por signal_store.py
+    (um arquivo .npy float32 de shape minutos x EXPECTED_LEN x 2 por rolamento).
+    Cada minuto é uma fatia sem cópia do arquivo mapeado em memória. Rolamentos não
+    empacotados (ou store_path=None) são lidos dos CSVs originais.
+    """
+    def __init__(self, base_path: str, store_path: str = None):
+        """
+        Args:
+            base_path (str): O caminho raiz para a pasta do dataset XJTU-SY (fallback CSV).
+            store_path (str, optional): Diretório do dataset empacotado.
+        """
+        super().__init__(base_path)
+        self.signal_store = PackedSignalStore(store_path) if store_path else None
+
+    def get_source_mtimes(self, condition: str, bearing_name: str) -> list[int | None]:
+        """Para rolamentos empacotados, retorna os mtimes dos CSVs registrados no momento do empacotamento."""
+        packed = self.signal_store.open(condition, bearing_name) if self.signal_store else None
+        if packed is None:
+            return super().get_source_mtimes(condition, bearing_name)
+        return packed.index["source_mtimes"]
+
+    def get_signal_for_minute(self, condition: str, bearing_name: str, minute: int) -> np.ndarray | None:
+        """Retorna o canal horizontal do minuto como uma visão do memmap, ou None se o minuto estiver ausente."""
+        packed = self.signal_store.open(condition, bearing_name) if self.signal_store else None
+        if packed is None:
+            return super().get_signal_for_minute(condition, bearing_name, minute)
+        return packed.get_minute(minute, channel=0)
+
+    def _prefetch_minute(self, condition: str, bearing_name: str, minute: int) -> np.ndarray | None:
+        """
+        Na leitura antecipada, copia o minuto para a memória: as faltas de página (a E/S real do
+        memmap) acontecem na thread de prefetch e não no processamento do minuto.
+        """
+        packed = self.signal_store.open(condition, bearing_name) if self.signal_store else None
+        if packed is None:
+            return super()._prefetch_minute(condition, bearing_name, minute)
+        signal = packed.get_minute(minute, channel=0)
+        if signal is None:
+            return None
+        with profiler.stage("read_memmap"):
+            return np.array(signal)
+
+class CustomFDTBearingDataRepository(MemmapBearingDataRepository):
     """
     Um Repositório de Dados de Rolamento estendido que calcula o FDT
     dinamicamente usando a função 'detect_fdt' em vez de valores de configuração.
     """
-    def __init__(self, base_path: str, fdt_params: dict = None):
+    def __init__(self, base_path: str, fdt_params: dict = None, store_path: str = None):
         """
         Inicializa o repositório CustomFDT.
         Args:
@@ -71,8 +202,9 @@ class CustomFDTBearingDataRepository(BearingDataRepository):
             fdt_params (dict, optional): Parâmetros para a função detect_fdt
                                          (e.g., {'warmup': 3, 'persistence_len': 3, 'amp_offset': 0.02}).
                                          Se None, usará valores padrão.
+            store_path (str, optional): Diretório do dataset empacotado (ver MemmapBearingDataRepository).
         """
-        super().__init__(base_path)
+        super().__init__(base_path, store_path)
         # Define parâmetros padrão para detect_fdt
         self.fdt_params = fdt_params if fdt_params is not None else {
             'warmup': 3,
@@ -82,9 +214,9 @@ class CustomFDTBearingDataRepository(BearingDataRepository):
 
     def calculate_fdt(self, bearing_name: str) -> int | None:
         """
-        Calcula o FDT para um rolamento específico usando a função detect_fdt.
-        Este método requer a coleta de todos os dados de espectro de envelope (AES)
-        para o rolamento em questão antes de calcular o FDT.
+        Calcula o FDT para um rolamento específico em uma única passada pelos dados,
+        alimentando um StreamingFDTDetector com o espectro de envelope (AES) de cada minuto.
+        A leitura para assim que o FDT é detectado.
 
         Args:
             bearing_name (str): O nome do rolamento para o qual o FDT será calculado.
@@ -103,47 +235,222 @@ class CustomFDTBearingDataRepository(BearingDataRepository):
             print(f"Nenhum arquivo encontrado para o rolamento: {bearing_name}. Não é possível calcular FDT.")
             return None
 
-        all_aes_amplitudes = []
-        aes_frequencies = None # Para armazenar o vetor de frequências uma vez
+        aes_frequencies = processing.aes_freq_vector(config.FS, config.AES_L)
+        detector = StreamingFDTDetector(aes_frequencies, config.FCFS[condition], **self.fdt_params)
+
+        print(f"Iniciando cálculo de FDT para {bearing_name}...")
+        # Minutos ausentes ou com erro chegam com S_e_amp=None e contam como espectro nulo
+        for minute, S_e_amp, _, error_msg in MinuteFeatureExtractor(self).iter_features(
+                condition, bearing_name, range(1, num_files + 1)):
+            if error_msg == "file_not_found":
+                print(f"Arquivo não encontrado para {bearing_name}, minuto {minute}. Pulando.")
+            elif error_msg is not None:
+                print(f"Erro ao processar minuto {minute} para {bearing_name}: {error_msg}")
 
-        L_aes, overlap_aes = 8192, 2048 # Parâmetros para compute_aes, podem vir do config ou ser otimizados
+            fdt = detector.update(S_e_amp)
+            if fdt is not None:
+                print(f"FDT calculado para {bearing_name}: {fdt} minutos.")
+                return fdt
 
-        print(f"Iniciando coleta de dados para cálculo de FDT para {bearing_name}...")
-        for minute in range(1, num_files + 1):
-            signal = self.get_signal_for_minute(condition, bearing_name, minute)
-            if signal is not None:
-                try:
-                    env = processing.get_envelope_from_signal(signal)
-                    S_e_amp, f_aes = processing.compute_aes(env, config.FS, L_aes, overlap_aes)
-                    all_aes_amplitudes.append(S_e_amp)
-                    if aes_frequencies is None:
-                        aes_frequencies = f_aes
-                except Exception as e:
-                    print(f"Erro ao processar minuto {minute} para {bearing_name}: {e}")
-                    # Em caso de erro, adicione um array de zeros para manter o shape, ou trate como NaN
-                    # Para FDT, é melhor ter um valor para representar a ausência/erro
-                    all_aes_amplitudes.append(np.zeros_like(aes_frequencies) if aes_frequencies is not None else np.zeros(L_aes // 2))
+        print(f"FDT não detectado para {bearing_name}.")
+        return None
+
+class StreamingBearingDataRepository(BearingDataRepository):
+    """
+    Repositório alimentado por um fluxo contínuo de amostras (sensor ao vivo, ver live_source.py)
+    em vez de arquivos. As amostras são montadas em blocos de EXPECTED_LEN (um minuto) diretamente
+    em um buffer circular pré-alocado de 'buffer_minutes' minutos, sem realocação por bloco
+    recebido; cada minuto completo é entregue pela mesma interface get_signal_for_minute, que
+    espera até que ele chegue.
+
+    Se o processamento não acompanhar o produtor e o buffer encher (overrun), a política define
+    o que é perdido:
+      - 'drop_oldest': o minuto completo mais antigo ainda não processado é descartado;
+      - 'drop_newest': o minuto que está chegando é descartado;
+      - 'block': o produtor espera a liberação de um slot (contrapressão; no TCP, a janela de
+        recepção se fecha e o sensor desacelera).
+    Minutos descartados são entregues como ausentes (None), como um arquivo faltante do dataset.
+
+    Os metadados (condição, vt, wt) são os do rolamento informado na simulação, como nos demais repositórios.
+    """
+    OVERRUN_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+    def __init__(self, base_path: str, buffer_minutes: int = None, overrun_policy: str = None, channels: int = None,
+                 max_minutes: int = None, fdt_params: dict = None):
+        """
+        Args:
+            base_path (str): Descrição da origem do fluxo (ex.: 'tcp://0.0.0.0:9000'); não é um diretório.
+            buffer_minutes (int, optional): Minutos completos no buffer circular (default: config.LIVE_BUFFER_MINUTES).
+            overrun_policy (str, optional): Política de overrun (default: config.LIVE_OVERRUN_POLICY).
+            channels (int, optional): Canais intercalados por amostra em feed_bytes (default: config.LIVE_CHANNELS).
+            max_minutes (int, optional): Teto de minutos da sessão (default: config.LIVE_MAX_MINUTES).
+            fdt_params (dict, optional): Parâmetros do FDT dinâmico, usados por CustomFDTBearingSimulator
+                                         (se None, os padrões de StreamingFDTDetector).
+        """
+        super().__init__(base_path)
+        self.overrun_policy = overrun_policy or config.LIVE_OVERRUN_POLICY
+        if self.overrun_policy not in self.OVERRUN_POLICIES:
+            raise ValueError(f"Política de overrun desconhecida: {self.overrun_policy}")
+        self.channels = channels or config.LIVE_CHANNELS
+        self.max_minutes = max_minutes or config.LIVE_MAX_MINUTES
+        self.fdt_params = fdt_params if fdt_params is not None else {}
+
+        self._slots = np.zeros((buffer_minutes or config.LIVE_BUFFER_MINUTES, config.EXPECTED_LEN), dtype=np.float32)
+        self._owners = [0] * len(self._slots)  # Minuto cujas amostras estão em cada slot
+        self._frame_bytes = self.channels * np.dtype(np.float32).itemsize
+        self._carry = bytearray(self._frame_bytes)  # Amostra incompleta no fim do último bloco de bytes
+        self._carry_len = 0
+        self._minute = 1  # Minuto em montagem
+        self._fill = 0  # Amostras já escritas no minuto em montagem
+        self._discarding = False  # Minuto em montagem descartado (drop_newest)
+        self._ready = {}  # Minuto completo ainda não processado -> instante (monotônico) da última amostra
+        self._dropped = set()  # Minutos descartados ainda não solicitados
+        self._arrivals = {}  # Minuto entregue -> instante da última amostra (latência, ver pop_arrival)
+        self._closed = False
+        self._cond = threading.Condition()
+        self.dropped_minutes = 0
+
+    def get_num_files_for_bearing(self, bearing_name: str) -> int | None:
+        """No fluxo ao vivo, o número de minutos não é conhecido: retorna o teto da sessão."""
+        return self.max_minutes
+
+    def get_source_mtimes(self, condition: str, bearing_name: str) -> list[int | None]:
+        """Minutos ao vivo não têm arquivo de origem e não são cacheados."""
+        return []
+
+    def feed(self, samples: np.ndarray) -> None:
+        """
+        Acrescenta amostras em g: um array 1D do canal horizontal ou 2D (amostras x canais),
+        do qual só o primeiro canal é usado.
+        """
+        samples = np.asarray(samples)
+        with self._cond:
+            self._append(samples[:, 0] if samples.ndim == 2 else samples)
+
+    def feed_bytes(self, data) -> None:
+        """
+        Acrescenta um bloco do fluxo binário (float32 little-endian, 'channels' canais intercalados, em g).
+        Os blocos não precisam estar alinhados às amostras: o resto incompleto é guardado para o próximo.
+        """
+        view = memoryview(data).cast("B")
+        with self._cond:
+            if self._carry_len:
+                take = min(self._frame_bytes - self._carry_len, len(view))
+                self._carry[self._carry_len:self._carry_len + take] = view[:take]
+                self._carry_len += take
+                view = view[take:]
+                if self._carry_len < self._frame_bytes:
+                    return
+                self._append(np.frombuffer(self._carry, dtype="<f4")[:1])
+                self._carry_len = 0
+
+            whole = len(view) - len(view) % self._frame_bytes
+            if whole:
+                self._append(np.frombuffer(view[:whole], dtype="<f4")[::self.channels])
+            self._carry_len = len(view) - whole
+            self._carry[:self._carry_len] = view[whole:]
+
+    def _append(self, values: np.ndarray) -> None:
+        """Escreve as amostras (em g) no slot do minuto em montagem, convertendo para m/s^2. Chamado com o lock."""
+        pos = 0
+        while pos < len(values):
+            if self._fill == 0 and not self._reserve_slot():
+                return
+            take = min(len(values) - pos, config.EXPECTED_LEN - self._fill)
+            if not self._discarding:
+                slot = self._slots[(self._minute - 1) % len(self._slots)]
+                np.multiply(values[pos:pos + take], config.GRAV_ACCEL, out=slot[self._fill:self._fill + take])
+            self._fill += take
+            pos += take
+            if self._fill == config.EXPECTED_LEN:
+                self._complete_minute()
+
+    def _reserve_slot(self) -> bool:
+        """Garante um slot livre para o minuto que começa, aplicando a política de overrun. False se o fluxo terminou."""
+        if self._closed or self._minute > self.max_minutes:
+            self._closed = True
+            self._cond.notify_all()
+            return False
+
+        index = (self._minute - 1) % len(self._slots)
+        occupant = self._owners[index]
+        self._discarding = False
+        if occupant in self._ready:
+            if self.overrun_policy == "drop_oldest":
+                del self._ready[occupant]
+                self._drop(occupant)
+            elif self.overrun_policy == "drop_newest":
+                self._discarding = True
+                return True
             else:
-                print(f"Arquivo não encontrado para {bearing_name}, minuto {minute}. Pulando.")
-                # Adiciona um array de zeros se o arquivo não for encontrado
-                all_aes_amplitudes.append(np.zeros_like(aes_frequencies) if aes_frequencies is not None else np.zeros(L_aes // 2))
+                while occupant in self._ready and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return False
+        self._owners[index] = self._minute
+        return True
 
-        if not all_aes_amplitudes or aes_frequencies is None:
-            print(f"Nenhum dado de espectro de envelope válido coletado para {bearing_name}. Não é possível calcular FDT.")
-            return None
+    def _drop(self, minute: int) -> None:
+        self._dropped.add(minute)
+        self.dropped_minutes += 1
+        print(f"Aviso: buffer ao vivo cheio ({len(self._slots)} minutos); minuto {minute} descartado "
+              f"({self.overrun_policy}).")
 
-        # Converte a lista de amplitudes para um array NumPy 2D
-        # np.vstack empilha arrays ao longo do primeiro eixo (linhas)
-        full_amps_matrix = np.vstack(all_aes_amplitudes)
+    def _complete_minute(self) -> None:
+        if self._discarding:
+            self._drop(self._minute)
+        else:
+            self._ready[self._minute] = time.monotonic()
+        self._minute += 1
+        self._fill = 0
+        self._discarding = False
+        self._cond.notify_all()
 
-        # Prepara o dicionário de resultados para detect_fdt
-        detection_results = {
-            'aes_frequencies': aes_frequencies,
-            'aes_amplitudes': full_amps_matrix,
-            'fcf': config.FCFS[condition]
-        }
-        print(f"Calculando FDT para {bearing_name} com {full_amps_matrix.shape[0]} minutos de dados...")
-        fdt, _, _ = processing.detect_fdt(detection_results, **self.fdt_params)
+    def close(self) -> None:
+        """Encerra o fluxo: os minutos completos ainda são entregues; um minuto incompleto é descartado."""
+        with self._cond:
+            if self._fill and not self._closed:
+                print(f"Fluxo ao vivo encerrado com o minuto {self._minute} incompleto ({self._fill} amostras); descartado.")
+            self._closed = True
+            self._cond.notify_all()
+
+    def ended(self, minute: int) -> bool:
+        """True se o fluxo terminou antes de completar o minuto."""
+        with self._cond:
+            return self._closed and minute >= self._minute
+
+    def get_signal_for_minute(self, condition: str, bearing_name: str, minute: int) -> np.ndarray | None:
+        """
+        Espera o minuto ficar completo e retorna uma cópia do seu sinal em m/s^2, liberando o slot.
+        Retorna None se o minuto foi descartado por overrun ou se o fluxo terminou antes dele.
+        """
+        with self._cond:
+            while minute >= self._minute and not self._closed:
+                self._cond.wait()
+            self._dropped.discard(minute)
+            arrival = self._ready.pop(minute, None)
+            if arrival is None:
+                return None
+            self._arrivals[minute] = arrival
+            signal = self._slots[(minute - 1) % len(self._slots)].copy()
+            self._cond.notify_all()  # Um produtor pode estar esperando este slot ('block')
+            return signal
+
+    def iter_signals(self, condition: str, bearing_name: str, minutes, depth: int = None, max_bytes: int = None):
+        """Gera (minuto, sinal) à medida que os minutos chegam, sem leitura antecipada; termina com o fluxo."""
+        for minute in minutes:
+            signal = self.get_signal_for_minute(condition, bearing_name, minute)
+            if signal is None and self.ended(minute):
+                return
+            yield minute, signal
+
+    def pop_arrival(self, minute: int) -> float | None:
+        """Instante (time.monotonic) em que chegou a última amostra de um minuto já entregue."""
+        with self._cond:
+            return self._arrivals.pop(minute, None)
 
-        print(f"FDT calculado para {bearing_name}: {fdt} minutos.")
-        return fdt
+    def stats(self) -> dict:
+        """Ocupação do buffer e minutos descartados por overrun."""
+        with self._cond:
+            return {"buffered_minutes": len(self._ready), "buffer_minutes": len(self._slots),
+                    "dropped_minutes": self.dropped_minutes}
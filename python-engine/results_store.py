@@ -0,0 +1,360 @@
+# Armazenamento Persistente dos Resultados
+# Grava em disco (SQLite) as séries de ESI e RUL e os demais eventos de cada execução da
+# simulação, completa ou em andamento. Cada execução é identificada pelo rolamento e pelo
+# conjunto de parâmetros de que os resultados dependem (simulador, dataset e mtimes dos
+# arquivos, parâmetros do AES/FDT/EKF e gamma_bar). Usos:
+#   - histórico: um cliente que se conecta no meio de uma execução (ou depois dela) consulta as
+#     séries de um intervalo de minutos, reduzidas ao número de pontos pedido (mínimo e máximo
+#     de cada faixa de minutos), sem depender dos eventos SSE já enviados;
+#   - reexecução: uma simulação com as mesmas entradas, já gravada até o minuto final pedido, é
+#     servida do store (os mesmos eventos, no mesmo ritmo) em vez de reprocessar os sinais.
+#
+# Tabelas (uma coluna por campo, consultadas por intervalo de minutos):
+#   runs   (run, bearing, params, num_files, last_minute, status, created_at, updated_at)
+#   esi    (run, minute, raw, smoothed, error)
+#   rul    (run, minute, rul, is_inf, is_nan, p5, p50, p95)   p5/p50/p95: bandas de incerteza do RUL
+#   events (run, minute, seq, payload)     demais eventos do minuto (ex.: fdt), em JSON
+# 'status' é 'running' (em andamento ou interrompida sem aviso), 'partial' ou 'completed'.
+#
+# Uso (consultas pela linha de comando, em JSON; também usadas pelo backend sem worker residente):
+#   python results_store.py runs [Bearing1_2]
+#   python results_store.py history Bearing1_2 [--run <id>] [--from 1] [--to 2538] [--points 500]
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+import numpy as np
+import config
+
+_default_stores = {}  # Store padrão de cada processo (as conexões SQLite não sobrevivem a um fork)
+SERIES_EVENTS = ("esi", "rul")  # Eventos gravados nas tabelas de séries; os demais vão para 'events'
+STORE_DISABLED_MESSAGE = "Store de resultados desativado (BEARING_RESULTS_STORE=0)."
+
+
+class RunNotFoundError(ValueError):
+    """Nenhuma execução gravada para o rolamento ou o identificador consultado."""
+
+
+def run_key(identity: dict) -> str:
+    """Identificador de uma execução a partir de tudo de que os seus resultados dependem."""
+    return hashlib.sha1(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()[:20]
+
+
+def decimate(minutes: np.ndarray, values: np.ndarray, first: int, last: int, points: int):
+    """
+    Divide [first, last] em até 'points' faixas de minutos de mesma largura e retorna, para cada
+    faixa com dados, (primeiro minuto da faixa, mínimo, máximo). NaN são ignorados; uma faixa só
+    com NaN resulta em NaN. Com menos minutos que pontos, cada faixa é um único minuto.
+    """
+    if len(minutes) == 0:
+        return np.array([], dtype=np.int64), np.array([]), np.array([])
+    span = last - first + 1
+    points = max(1, min(points, span))
+    edges = first + (np.arange(points + 1) * span) // points
+    bucket = np.searchsorted(edges, minutes, side="right") - 1
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    return edges[bucket[starts]], np.fmin.reduceat(values, starts), np.fmax.reduceat(values, starts)
+
+
+def _json_values(values: np.ndarray) -> list:
+    """Converte para lista JSON, com NaN como null."""
+    return [None if np.isnan(v) else float(v) for v in values]
+
+
+class ResultsStore:
+    """
+    Store dos resultados em um arquivo SQLite em modo WAL: o simulador grava enquanto outros
+    processos (workers, consultas de histórico) leem.
+    """
+    def __init__(self, path: str = config.RESULTS_STORE_PATH):
+        """
+        Args:
+            path (str): Caminho do arquivo SQLite.
+        """
+        self.path = path
+        self._conn = None
+        self._conn_pid = None
+
+    @classmethod
+    def default(cls) -> "ResultsStore | None":
+        """Store compartilhado pelo processo atual, ou None se desativado (BEARING_RESULTS_STORE=0)."""
+        if not config.RESULTS_STORE_ENABLED:
+            return None
+        pid = os.getpid()
+        if pid not in _default_stores:
+            _default_stores[pid] = cls()
+        return _default_stores[pid]
+
+    def _connection(self) -> sqlite3.Connection:
+        """Abre (uma vez por processo) a conexão e cria as tabelas se necessário."""
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                " run TEXT PRIMARY KEY, bearing TEXT, params TEXT, num_files INTEGER,"
+                " last_minute INTEGER, status TEXT, created_at REAL, updated_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS runs_bearing ON runs (bearing, updated_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS esi ("
+                " run TEXT, minute INTEGER, raw REAL, smoothed REAL, error TEXT,"
+                " PRIMARY KEY (run, minute)) WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rul ("
+                " run TEXT, minute INTEGER, rul REAL, is_inf INTEGER, is_nan INTEGER,"
+                " p5 REAL, p50 REAL, p95 REAL,"
+                " PRIMARY KEY (run, minute)) WITHOUT ROWID"
+            )
+            # Stores criados antes das bandas de incerteza do RUL
+            rul_columns = {row[1] for row in conn.execute("PRAGMA table_info(rul)")}
+            for column in ("p5", "p50", "p95"):
+                if column not in rul_columns:
+                    conn.execute(f"ALTER TABLE rul ADD COLUMN {column} REAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                " run TEXT, minute INTEGER, seq INTEGER, payload TEXT,"
+                " PRIMARY KEY (run, minute, seq)) WITHOUT ROWID"
+            )
+            conn.commit()
+            self._conn, self._conn_pid = conn, os.getpid()
+        return self._conn
+
+    @staticmethod
+    def _run_dict(row) -> dict:
+        keys = ("run", "bearing", "params", "num_files", "last_minute", "status", "created_at", "updated_at")
+        run = dict(zip(keys, row))
+        run["params"] = json.loads(run["params"])
+        return run
+
+    def get_run(self, run: str) -> dict | None:
+        row = self._connection().execute(
+            "SELECT run, bearing, params, num_files, last_minute, status, created_at, updated_at"
+            " FROM runs WHERE run = ?", (run,)).fetchone()
+        return self._run_dict(row) if row else None
+
+    def list_runs(self, bearing_name: str = None) -> list[dict]:
+        """Execuções gravadas (de um rolamento, se informado), da atualizada mais recentemente para a mais antiga."""
+        query = "SELECT run, bearing, params, num_files, last_minute, status, created_at, updated_at FROM runs"
+        args = ()
+        if bearing_name:
+            query += " WHERE bearing = ?"
+            args = (bearing_name,)
+        return [self._run_dict(row) for row in self._connection().execute(query + " ORDER BY updated_at DESC", args)]
+
+    def covers(self, run: str, last_minute: int) -> bool:
+        """True se a execução tem todos os minutos de 1 a last_minute gravados."""
+        count = self._connection().execute(
+            "SELECT COUNT(*) FROM esi WHERE run = ? AND minute BETWEEN 1 AND ?", (run, last_minute)).fetchone()[0]
+        return count == last_minute
+
+    def begin_run(self, run: str, bearing_name: str, params: dict, num_files: int) -> None:
+        """Registra (ou reabre) uma execução em andamento."""
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            "INSERT INTO runs (run, bearing, params, num_files, last_minute, status, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, 0, 'running', ?, ?)"
+            " ON CONFLICT (run) DO UPDATE SET status = 'running', updated_at = excluded.updated_at",
+            (run, bearing_name, json.dumps(params, sort_keys=True), num_files, now, now),
+        )
+        conn.commit()
+
+    def write_minutes(self, run: str, minutes: list[tuple[int, list[dict]]]) -> None:
+        """Grava os eventos de um bloco de minutos [(minuto, eventos do minuto), ...] em uma transação."""
+        esi_rows, rul_rows, event_rows = [], [], []
+        for minute, events in minutes:
+            for seq, event in enumerate(events):
+                if event["type"] == "esi":
+                    esi_rows.append((run, minute, event["value_raw_ms2"], event["value_smoothed_ms2"], event["error"]))
+                elif event["type"] == "rul":
+                    rul_rows.append((run, minute, event["rul_predicted_min"], event["is_inf"], event["is_nan"],
+                                     event["rul_p5_min"], event["rul_p50_min"], event["rul_p95_min"]))
+                else:
+                    event_rows.append((run, minute, seq, json.dumps(event)))
+        conn = self._connection()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO esi VALUES (?, ?, ?, ?, ?)", esi_rows)
+            conn.executemany("INSERT OR REPLACE INTO rul (run, minute, rul, is_inf, is_nan, p5, p50, p95)"
+                             " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rul_rows)
+            conn.executemany("INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?)", event_rows)
+            conn.execute("UPDATE runs SET last_minute = MAX(last_minute, ?), updated_at = ? WHERE run = ?",
+                         (max(m for m, _ in minutes), time.time(), run))
+
+    def finish_run(self, run: str, status: str) -> None:
+        """Marca o fim (ou a interrupção) de uma execução: 'completed' ou 'partial'."""
+        conn = self._connection()
+        conn.execute("UPDATE runs SET status = ?, updated_at = ? WHERE run = ?", (status, time.time(), run))
+        conn.commit()
+
+    def iter_minutes(self, run: str, bearing_name: str, first: int, last: int):
+        """
+        Gera (minuto, eventos) de [first, last] reconstruindo os eventos na ordem em que a simulação
+        os emitiu: os demais eventos do minuto (ex.: fdt), o esi e o rul.
+        """
+        conn = self._connection()
+        others = {}
+        for minute, payload in conn.execute(
+                "SELECT minute, payload FROM events WHERE run = ? AND minute BETWEEN ? AND ? ORDER BY minute, seq",
+                (run, first, last)):
+            others.setdefault(minute, []).append(json.loads(payload))
+        ruls = {row[0]: row[1:] for row in conn.execute(
+            "SELECT minute, rul, is_inf, is_nan, p5, p50, p95 FROM rul WHERE run = ? AND minute BETWEEN ? AND ?",
+            (run, first, last))}
+
+        for minute, raw, smoothed, error in conn.execute(
+                "SELECT minute, raw, smoothed, error FROM esi WHERE run = ? AND minute BETWEEN ? AND ? ORDER BY minute",
+                (run, first, last)):
+            events = others.get(minute, [])
+            events.append({
+                "type": "esi", "bearing": bearing_name, "minute": minute,
+                "value_raw_ms2": raw, "value_raw_g": raw / config.GRAV_ACCEL if raw is not None else None,
+                "value_smoothed_ms2": smoothed, "value_smoothed_g": smoothed / config.GRAV_ACCEL,
+                "error": error,
+            })
+            if minute in ruls:
+                rul, is_inf, is_nan, p5, p50, p95 = ruls[minute]
+                events.append({
+                    "type": "rul", "bearing": bearing_name, "minute": minute,
+                    "rul_predicted_min": rul, "is_inf": bool(is_inf), "is_nan": bool(is_nan),
+                    "rul_p5_min": p5, "rul_p50_min": p50, "rul_p95_min": p95,
+                })
+            yield minute, events
+
+    def history(self, bearing_name: str = None, run: str = None, first: int = None, last: int = None,
+                points: int = None) -> dict:
+        """
+        Séries de ESI (bruto e suavizado) e RUL de uma execução no intervalo [first, last],
+        reduzidas a até 'points' faixas (mínimo e máximo de cada uma; para as bandas do RUL, o
+        menor P5 e o maior P95), e os demais eventos do intervalo.
+        Sem 'run', usa a execução do rolamento atualizada mais recentemente.
+
+        Raises:
+            RunNotFoundError: Se nenhuma execução for encontrada.
+        """
+        info = self.get_run(run) if run else next(iter(self.list_runs(bearing_name)), None) if bearing_name else None
+        if info is None:
+            raise RunNotFoundError(f"Nenhuma execução gravada para {run or bearing_name}.")
+        first = max(1, first or 1)
+        last = min(last or info["last_minute"], info["last_minute"])
+        points = points or config.RESULTS_HISTORY_POINTS
+
+        conn = self._connection()
+        esi = np.array(conn.execute(
+            "SELECT minute, raw, smoothed FROM esi WHERE run = ? AND minute BETWEEN ? AND ? ORDER BY minute",
+            (info["run"], first, last)).fetchall(), dtype=float).reshape(-1, 3)
+        rul = np.array(conn.execute(
+            "SELECT minute, CASE WHEN is_inf OR is_nan THEN NULL ELSE rul END, p5, p95 FROM rul"
+            " WHERE run = ? AND minute BETWEEN ? AND ? ORDER BY minute",
+            (info["run"], first, last)).fetchall(), dtype=float).reshape(-1, 4)
+        others = [json.loads(payload) for (payload,) in conn.execute(
+            "SELECT payload FROM events WHERE run = ? AND minute BETWEEN ? AND ? ORDER BY minute, seq",
+            (info["run"], first, last))]
+
+        esi_minutes = esi[:, 0].astype(np.int64)
+        bucket, smoothed_min, smoothed_max = decimate(esi_minutes, esi[:, 2], first, last, points)
+        _, raw_min, raw_max = decimate(esi_minutes, esi[:, 1], first, last, points)
+        rul_minutes = rul[:, 0].astype(np.int64)
+        rul_bucket, rul_min, rul_max = decimate(rul_minutes, rul[:, 1], first, last, points)
+        _, p5_min, _ = decimate(rul_minutes, rul[:, 2], first, last, points)
+        _, _, p95_max = decimate(rul_minutes, rul[:, 3], first, last, points)
+        return {
+            "run": info["run"], "bearing": info["bearing"], "status": info["status"],
+            "last_minute": info["last_minute"], "num_files": info["num_files"],
+            "from": first, "to": last, "points": points,
+            "esi": {
+                "minute": bucket.tolist(),
+                "smoothed_min": _json_values(smoothed_min), "smoothed_max": _json_values(smoothed_max),
+                "raw_min": _json_values(raw_min), "raw_max": _json_values(raw_max),
+            },
+            "rul": {
+                "minute": rul_bucket.tolist(), "min": _json_values(rul_min), "max": _json_values(rul_max),
+                "p5_min": _json_values(p5_min), "p95_max": _json_values(p95_max),
+            },
+            "events": others,
+        }
+
+
+class RunRecorder:
+    """
+    Grava os eventos de uma execução em blocos de 'flush_every' minutos. Falhas do store são
+    avisadas e desativam a gravação, sem interromper a simulação.
+    """
+    def __init__(self, store: ResultsStore, run: str, flush_every: int = None):
+        self.store = store
+        self.run = run
+        self.flush_every = flush_every or config.RESULTS_FLUSH_MINUTES
+        self._pending = []
+
+    def add(self, minute: int, events: list[dict]) -> None:
+        if self.store is None:
+            return
+        self._pending.append((minute, events))
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.store is None or not self._pending:
+            return
+        try:
+            self.store.write_minutes(self.run, self._pending)
+        except sqlite3.Error as e:
+            print(f"Aviso: falha ao gravar resultados no store ({e}); gravação desativada nesta execução.")
+            self.store = None
+        self._pending = []
+
+    def finish(self, completed: bool) -> None:
+        """Grava o que falta e marca a execução como concluída ou parcial."""
+        self.flush()
+        if self.store is None:
+            return
+        try:
+            self.store.finish_run(self.run, "completed" if completed else "partial")
+        except sqlite3.Error as e:
+            print(f"Aviso: falha ao atualizar a execução {self.run} no store: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consulta o store de resultados das simulações.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    runs_parser = subparsers.add_parser("runs", help="Lista as execuções gravadas.")
+    runs_parser.add_argument("bearing_name", nargs="?", default=None)
+    history_parser = subparsers.add_parser("history", help="Séries de ESI/RUL de uma execução, reduzidas.")
+    history_parser.add_argument("bearing_name", nargs="?", default=None)
+    history_parser.add_argument("--run", default=None, help="Execução (default: a mais recente do rolamento).")
+    history_parser.add_argument("--from", dest="first", type=int, default=None, help="Primeiro minuto (default: 1).")
+    history_parser.add_argument("--to", dest="last", type=int, default=None, help="Último minuto (default: o último gravado).")
+    history_parser.add_argument("--points", type=int, default=config.RESULTS_HISTORY_POINTS,
+                                help=f"Número máximo de faixas (default: {config.RESULTS_HISTORY_POINTS}).")
+    args = parser.parse_args()
+
+    # Erros saem como {"error": ..., "code": "not_found" | "disabled" | "error"} (ver worker.py)
+    store = ResultsStore.default()
+    if store is None:
+        print(json.dumps({"error": STORE_DISABLED_MESSAGE, "code": "disabled"}))
+        sys.exit(1)
+    try:
+        if args.command == "runs":
+            result = store.list_runs(args.bearing_name)
+        else:
+            if not args.bearing_name and not args.run:
+                parser.error("Informe o rolamento ou --run.")
+            result = store.history(args.bearing_name, args.run, args.first, args.last, args.points)
+    except RunNotFoundError as e:
+        print(json.dumps({"error": str(e), "code": "not_found"}))
+        sys.exit(1)
+    except (ValueError, sqlite3.Error, OSError) as e:
+        print(json.dumps({"error": str(e), "code": "error"}))
+        sys.exit(1)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
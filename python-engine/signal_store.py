@@ -0,0 +1,150 @@
+# Armazenamento Binário dos Sinais (Dataset Empacotado)
+# Converte, uma única vez, os CSVs de cada rolamento em um arquivo .npy contíguo
+# (minutos x EXPECTED_LEN x 2 canais, float32, em m/s^2) que pode ser mapeado em memória.
+#
+# Uso:
+#   python signal_store.py --base_path /caminho/XJTU-SY --store_path /caminho/packed [Bearing1_2 ...]
+
+import argparse
+import json
+import os
+import numpy as np
+import config
+
+INDEX_SUFFIX = ".index.json"
+
+
+class PackedBearing:
+    """Um rolamento empacotado: o array mapeado em memória e o seu índice de minutos ausentes/curtos."""
+    def __init__(self, data: np.ndarray, index: dict):
+        self.data = data
+        self.index = index
+        self._missing = set(index["missing"])
+
+    @property
+    def num_minutes(self) -> int:
+        return self.data.shape[0]
+
+    def get_minute(self, minute: int, channel: int = 0) -> np.ndarray | None:
+        """Retorna uma visão (sem cópia) do canal de um minuto (baseado em 1), ou None se ausente."""
+        if minute < 1 or minute > self.num_minutes or minute in self._missing:
+            return None
+        return self.data[minute - 1, :, channel]
+
+
+class PackedSignalStore:
+    """
+    Leitor do dataset empacotado. Os arquivos são abertos sob demanda (mmap_mode='r')
+    e mantidos abertos durante a vida do objeto.
+    """
+    def __init__(self, store_path: str):
+        self.store_path = store_path
+        self._opened = {}
+
+    def paths_for(self, condition: str, bearing_name: str) -> tuple[str, str]:
+        """Retorna os caminhos (dados, índice) de um rolamento no store."""
+        stem = os.path.join(self.store_path, condition, bearing_name)
+        return stem + ".npy", stem + INDEX_SUFFIX
+
+    def open(self, condition: str, bearing_name: str) -> PackedBearing | None:
+        """Abre um rolamento empacotado, ou retorna None se ele não existir no store."""
+        key = (condition, bearing_name)
+        if key not in self._opened:
+            data_path, index_path = self.paths_for(condition, bearing_name)
+            try:
+                with open(index_path, "r", encoding="utf-8") as f:
+                    index = json.load(f)
+                data = np.load(data_path, mmap_mode="r")
+                self._opened[key] = PackedBearing(data, index)
+            except (OSError, ValueError):
+                self._opened[key] = None
+        return self._opened[key]
+
+
+def pack_bearing(repository, store_path: str, condition: str, bearing_name: str) -> dict:
+    """
+    Converte todos os CSVs de um rolamento para o formato empacotado.
+
+    Args:
+        repository (BearingDataRepository): Repositório CSV usado para ler os minutos.
+        store_path (str): Diretório de destino.
+        condition (str): Condição de operação (ex: '35Hz12kN').
+        bearing_name (str): Nome do rolamento.
+
+    Returns:
+        dict: O índice gravado (minutos ausentes, minutos curtos e mtimes de origem).
+    """
+    num_files = repository.get_num_files_for_bearing(bearing_name)
+    if not num_files:
+        raise ValueError(f"Número de arquivos desconhecido para o rolamento: {bearing_name}")
+
+    data_path, index_path = PackedSignalStore(store_path).paths_for(condition, bearing_name)
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+    tmp_path = data_path + ".tmp"
+
+    source_mtimes = repository.get_source_mtimes(condition, bearing_name)
+    missing, short = [], {}
+    data = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32,
+                                     shape=(num_files, config.EXPECTED_LEN, 2))
+    for minute in range(1, num_files + 1):
+        try:
+            channels = repository.read_minute_channels(condition, bearing_name, minute)
+        except Exception:
+            missing.append(minute)
+            continue
+
+        lengths = [len(ch) for ch in channels]
+        if min(lengths) < config.EXPECTED_LEN:
+            short[str(minute)] = lengths
+        for ch_idx, ch in enumerate(channels):
+            n = min(len(ch), config.EXPECTED_LEN)
+            data[minute - 1, :n, ch_idx] = ch[:n]
+
+    data.flush()
+    del data
+    # Sem índice, o rolamento é tratado como não empacotado (leitura dos CSVs) até o novo índice ser gravado
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    os.replace(tmp_path, data_path)
+
+    index = {
+        "condition": condition,
+        "bearing": bearing_name,
+        "num_minutes": num_files,
+        "units": "m/s^2",
+        "missing": missing,
+        "short": short,
+        "source_mtimes": source_mtimes,
+    }
+    # Gravado atomicamente: um índice incompleto ou de outro empacotamento ao lado dos dados
+    # serviria minutos ausentes e mtimes (chaves dos caches) errados
+    tmp_index_path = index_path + ".tmp"
+    with open(tmp_index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp_index_path, index_path)
+    return index
+
+
+def main():
+    """Converte os rolamentos pedidos (ou todos de NUM_FILES_DICT_FULL) para o formato empacotado."""
+    from repository import BearingDataRepository
+
+    parser = argparse.ArgumentParser(description="Empacota os CSVs do dataset XJTU-SY em arquivos .npy mapeáveis em memória.")
+    parser.add_argument("bearings", nargs="*", help="Rolamentos a converter (default: todos).")
+    parser.add_argument("--base_path", required=True, help="Caminho base para o dataset XJTU-SY.")
+    parser.add_argument("--store_path", required=True, help="Diretório de destino do dataset empacotado.")
+    args = parser.parse_args()
+
+    repo = BearingDataRepository(args.base_path)
+    bearings = args.bearings or list(config.NUM_FILES_DICT_FULL)
+    for bearing_name in bearings:
+        condition = repo.get_condition_for_bearing(bearing_name)
+        if condition is None:
+            print(f"Condição desconhecida para {bearing_name}. Pulando.")
+            continue
+        index = pack_bearing(repo, args.store_path, condition, bearing_name)
+        print(f"{bearing_name}: {index['num_minutes']} minutos, {len(index['missing'])} ausentes, {len(index['short'])} curtos.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,35 @@
 # Camada de Aplicação/Orquestração
 # Contém a lógica de alto nível que orquestra a simulação, usando as outras camadas.
-import numpy as np
-import pandas as pd
+import hashlib
 import json
+import os
+import sqlite3
 import time
+import numpy as np
 
 # Importa os módulos refatorados
 import config
 import processing
+import checkpoint
 from repository import BearingDataRepository, CustomFDTBearingDataRepository
+from incremental import CenteredMovingAverage, EKFState, RULSampler, StreamingFDTDetector
+from threshold_store import GammaBarStore
+from feature_cache import MinuteFeatureExtractor
+from pacing import Pacer
+from profiling import profiler
+from results_store import ResultsStore, RunRecorder, SERIES_EVENTS, run_key
 
 class BearingSimulator:
     """
     Orquestra a simulação de prognóstico para um rolamento.
     Usa o Repository para buscar dados e o módulo de Processing para os cálculos.
     """
-    def __init__(self, bearing_name: str, repository: BearingDataRepository):
+    def __init__(self, bearing_name: str, repository: BearingDataRepository, ekf_mode: str = "stateful",
+                 gamma_store: GammaBarStore = None):
         self.bearing_name = bearing_name
         self.repository = repository
+        self.ekf_mode = ekf_mode  # 'stateful' (incremental) ou 'reinit' (equivalência com run_ekf_and_get_rul)
+        self.pacer = Pacer.from_policy("realtime")  # Ritmo entre minutos (ver pacing.py)
 
         self.metadata = self.repository.get_bearing_metadata(bearing_name)
         if not self.metadata:
@@ -25,117 +37,280 @@ class BearingSimulator:
 
         self.condition = self.metadata["condition_key"]
         self.num_files = self.repository.get_num_files_for_bearing(bearing_name)
+        self.features = MinuteFeatureExtractor(self.repository)
+        # Um gamma_store já resolvido (ex.: mantido pelo worker residente entre execuções) evita a consulta ao disco
+        self.gamma_store = gamma_store if gamma_store is not None else GammaBarStore(self.repository, features=self.features)
 
         # Estado da simulação
         self.all_esi_raw = []
-        self.all_esi_smoothed = []
+        self.smoother = CenteredMovingAverage(window=4, capacity=self.num_files or 0)
+        self.rul_sampler = RULSampler(config.RUL_MC_SAMPLES, config.RUL_MC_SEED)
+        self.last_minute = 0  # Último minuto processado
+        self.pending_events = []  # Eventos do último minuto processado ainda não entregues
+        self.checkpoint_every = config.CHECKPOINT_INTERVAL_MINUTES  # Minutos entre checkpoints (0 desativa)
+        self.metrics_every = config.PROFILE_INTERVAL_MINUTES  # Minutos entre eventos 'metrics' (com profiling.profiler ativo)
+        self.results = ResultsStore.default()  # Grava/serve as séries da execução (None desativa; ver results_store.py)
+
+    @property
+    def all_esi_smoothed(self) -> np.ndarray:
+        """Histórico do ESI suavizado (visão do array pré-alocado do suavizador)."""
+        return self.smoother.history
 
     def _calculate_gamma_bar(self) -> float:
-        """Calcula o valor de limiar gamma_bar, usado como critério de falha."""
-        max_esis = []
-        L_gamma, overlap_gamma = 8192, 2048
+        """Obtém o limiar gamma_bar (critério de falha) do store persistente."""
+        return self.gamma_store.get_gamma_bar()
+
+    def start_run(self, gamma_bar: float) -> None:
+        """Prepara o estado de uma execução (limiar, início e filtro do EKF)."""
+        self.gamma_bar = gamma_bar
+        self.set_fdt(self.metadata["t_fdt"])
+
+    def set_fdt(self, t_fdt: int) -> None:
+        """Define o FDT (minuto) e cria o EKF, que começa N_PRIOR_FDT minutos antes dele."""
+        self.t_fdt = t_fdt
+        self.t_start_ekf_idx = max(0, (t_fdt - config.N_PRIOR_FDT) - 1)
+        self.ekf = EKFState(self.t_start_ekf_idx, self.metadata["vt"], self.metadata["wt"], self.ekf_mode)
+
+    def checkpoint_identity(self) -> dict:
+        """Tudo de que o estado da execução depende; define o arquivo de checkpoint (ver checkpoint.py)."""
+        return {
+            "simulator": type(self).__name__, "bearing": self.bearing_name, "condition": self.condition,
+            "base_path": os.path.abspath(self.repository.base_path), "num_files": self.num_files,
+            "ekf_mode": self.ekf_mode, "features": self.features.params(self.condition),
+            "ekf": {"vt": self.metadata["vt"], "wt": self.metadata["wt"], "t_fdt": self.metadata["t_fdt"],
+                    "n_prior_fdt": config.N_PRIOR_FDT},
+        }
+
+    @property
+    def checkpoint_path(self) -> str:
+        return checkpoint.checkpoint_path(self.checkpoint_identity())
+
+    def results_identity(self) -> dict:
+        """Tudo de que os resultados da execução dependem; define a execução no store de resultados."""
+        mtimes = self.features.source_mtimes(self.condition, self.bearing_name)
+        return {
+            **self.checkpoint_identity(), "gamma_bar": self.gamma_bar,
+            "rul_mc": {"samples": self.rul_sampler.n_samples, "seed": self.rul_sampler.seed},
+            "sources": hashlib.sha1(json.dumps(mtimes).encode("utf-8")).hexdigest(),
+        }
 
-        for condition, bearings in config.BEARINGS_FOR_GAMMA_BAR_CALC.items():
-            for bearing_name in bearings:
-                num_files = self.repository.get_num_files_for_bearing(bearing_name)
-                if not num_files: continue
+    def _open_results_run(self, resuming: bool, end_minute: int) -> tuple[str | None, bool]:
+        """
+        Identifica a execução no store de resultados. Retorna (execução, True se ela já está
+        gravada até end_minute e pode ser servida do store). Falhas do store desativam a gravação.
+        """
+        if self.results is None:
+            return None, False
+        try:
+            run = run_key(self.results_identity())
+            if not resuming and self.results.covers(run, end_minute):
+                return run, True
+            self.results.begin_run(run, self.bearing_name, self.checkpoint_identity(), self.num_files)
+            return run, False
+        except sqlite3.Error as e:
+            print(f"Aviso: store de resultados indisponível ({e}); a execução não será gravada.")
+            return None, False
 
-                esi_vals = []
-                for k in range(1, num_files + 1):
-                    sig = self.repository.get_signal_for_minute(condition, bearing_name, k)
-                    if sig is None: continue
+    def replay_results(self, run: str, start_minute: int, end_minute: int):
+        """Emite do store os eventos de uma execução já gravada, na ordem e no ritmo da simulação."""
+        print(f"Resultados de {self.bearing_name} servidos do store (execução {run}).")
+        yield {"type": "status", "status": "cached", "bearing": self.bearing_name, "run": run}
+        for minute, events in self.results.iter_minutes(run, self.bearing_name, 1, end_minute):
+            if minute == start_minute:
+                self.pacer.start()
+            for event in events:
+                # Como na simulação, os minutos anteriores à janela só emitem os eventos de detecção
+                if minute >= start_minute or event["type"] not in SERIES_EVENTS:
+                    yield event
+            self.last_minute = minute
+            if minute >= start_minute:
+                self.pacer.tick()
 
-                    env = processing.get_envelope_from_signal(sig)
-                    S_e, f_aes = processing.compute_aes(env, config.FS, L_gamma, overlap_gamma)
-                    esi = processing.compute_esi(S_e, f_aes, condition)
-                    esi_vals.append(esi)
+    def get_state(self) -> dict:
+        """Estado da execução após o último minuto processado, com os eventos dele ainda não entregues."""
+        return {
+            "last_minute": self.last_minute, "pending_events": list(self.pending_events),
+            "gamma_bar": self.gamma_bar, "t_fdt": self.t_fdt,
+            "esi_raw": np.asarray(self.all_esi_raw, dtype=float),
+            "smoother": self.smoother.state_dict(),
+            "ekf": self.ekf.state_dict() if self.ekf is not None else None,
+        }
 
-                if esi_vals:
-                    max_esis.append(np.max(esi_vals))
+    def restore_state(self, state: dict) -> None:
+        """Recria o estado de uma execução a partir de get_state() (sem recalcular gamma_bar)."""
+        self.start_run(state["gamma_bar"])
+        if state["t_fdt"] is not None and (self.ekf is None or self.t_fdt != state["t_fdt"]):
+            self.set_fdt(state["t_fdt"])
+        if state["ekf"] is not None:
+            self.ekf.load_state(state["ekf"])
+        self.all_esi_raw = state["esi_raw"].tolist()
+        self.smoother.load_state(state["smoother"])
+        self.last_minute = state["last_minute"]
+        self.pending_events = list(state["pending_events"])
 
-        if not max_esis:
-            raise RuntimeError("Falha fatal ao calcular gamma_bar. Nenhum dado de ESI foi gerado.")
+    def save_checkpoint(self) -> None:
+        """Grava o checkpoint da execução atual. Falhas de disco não interrompem a simulação."""
+        try:
+            checkpoint.save(self.checkpoint_path, self.get_state())
+        except OSError as e:
+            print(f"Aviso: não foi possível gravar o checkpoint de {self.bearing_name}: {e}")
 
-        return np.mean(max_esis)
+    def observe_spectrum(self, minute: int, S_e_amp: np.ndarray | None) -> list[dict]:
+        """Ponto de extensão chamado com o AES de cada minuto antes de process_minute. Retorna eventos."""
+        return []
 
-    def run_incremental_simulation(self):
+    def process_minute(self, minute: int, esi_raw_current: float, error_msg: str | None):
         """
-        Executa a simulação passo a passo (minuto a minuto) e 'yields' (gera)
-        os resultados em formato JSON. Este é um gerador.
+        Incorpora o ESI bruto de um minuto (suavização e EKF) e gera os eventos
+        (dicts) desse minuto. Este é um gerador.
         """
-        gamma_bar = self._calculate_gamma_bar()
-
-        t_fdt = self.metadata["t_fdt"]
-        t_start_ekf_idx = max(0, (t_fdt - config.N_PRIOR_FDT) - 1)
-
-        L_rul, overlap_rul = 8192, int(8192 * 0.25)
-
-        for minute in range(1, self.num_files + 1):
-            minute_idx = minute - 1
-            esi_raw_current = np.nan
-            error_msg = None
-
-            signal = self.repository.get_signal_for_minute(self.condition, self.bearing_name, minute)
-
-            if signal is not None:
-                try:
-                    env = processing.get_envelope_from_signal(signal)
-                    S_e_amp, f_aes = processing.compute_aes(env, config.FS, L_rul, overlap_rul)
-                    esi_raw_current = processing.compute_esi(S_e_amp, f_aes, self.condition)
-                except Exception as e:
-                    error_msg = str(e)
-            else:
-                error_msg = "file_not_found"
-
-            self.all_esi_raw.append(esi_raw_current if not np.isnan(esi_raw_current) else 0.0)
-
-            # Suavização com média móvel
-            series_to_smooth = pd.Series(self.all_esi_raw).fillna(0)
-            smoothed_series = series_to_smooth.rolling(window=4, center=True, min_periods=1).mean().to_numpy()
-            self.all_esi_smoothed = list(smoothed_series)
-            esi_smoothed_current = self.all_esi_smoothed[minute_idx]
-
-            # Gera o resultado do ESI para o minuto atual
-            esi_output = {
-                "type": "esi", "bearing": self.bearing_name, "minute": minute,
-                "value_raw_ms2": float(esi_raw_current) if not np.isnan(esi_raw_current) else None,
-                "value_raw_g": float(esi_raw_current / config.GRAV_ACCEL) if not np.isnan(esi_raw_current) else None,
-                "value_smoothed_ms2": float(esi_smoothed_current),
-                "value_smoothed_g": float(esi_smoothed_current / config.GRAV_ACCEL),
-                "error": error_msg
+        minute_idx = minute - 1
+        self.all_esi_raw.append(esi_raw_current if not np.isnan(esi_raw_current) else 0.0)
+
+        # Suavização com média móvel centrada (atualiza apenas os valores afetados pela nova amostra)
+        with profiler.stage("smoothing"):
+            self.smoother.append(self.all_esi_raw[-1])
+        esi_smoothed_current = self.all_esi_smoothed[minute_idx]
+        if self.ekf is not None:
+            with profiler.stage("ekf_update"):
+                self.ekf.advance(self.all_esi_smoothed, minute)
+
+        # Gera o resultado do ESI para o minuto atual
+        esi_output = {
+            "type": "esi", "bearing": self.bearing_name, "minute": minute,
+            "value_raw_ms2": float(esi_raw_current) if not np.isnan(esi_raw_current) else None,
+            "value_raw_g": float(esi_raw_current / config.GRAV_ACCEL) if not np.isnan(esi_raw_current) else None,
+            "value_smoothed_ms2": float(esi_smoothed_current),
+            "value_smoothed_g": float(esi_smoothed_current / config.GRAV_ACCEL),
+            "error": error_msg
+        }
+        yield esi_output
+
+        # Condição para calcular o RUL a cada 3 minutos após o início do EKF (FDT já conhecido)
+        should_calculate_rul = self.ekf is not None and (minute_idx > self.t_start_ekf_idx) and (minute % 3 == 0)
+
+        if should_calculate_rul:
+            with profiler.stage("ekf_rul"):
+                rul_val = self.ekf.rul(self.all_esi_smoothed, minute, self.gamma_bar)
+            # Bandas de incerteza a partir da posterior do filtro (sem estado válido quando o RUL é indefinido)
+            with profiler.stage("rul_bands"):
+                bands = np.full(3, np.nan) if np.isnan(rul_val) else self.rul_sampler.quantiles(self.ekf, self.gamma_bar)
+            p5, p50, p95 = (float(v) if np.isfinite(v) else None for v in bands)
+
+            rul_output = {
+                "type": "rul", "bearing": self.bearing_name, "minute": minute,
+                "rul_predicted_min": float(rul_val) if not np.isnan(rul_val) and not np.isinf(rul_val) else None,
+                "is_inf": bool(np.isinf(rul_val)),
+                "is_nan": bool(np.isnan(rul_val)),
+                "rul_p5_min": p5, "rul_p50_min": p50, "rul_p95_min": p95,
             }
-            yield json.dumps(esi_output)
+            yield rul_output
 
-            # Condição para calcular o RUL a cada 3 minutos após o início do EKF
-            should_calculate_rul = (minute_idx > t_start_ekf_idx) and (minute % 3 == 0)
+    def run_incremental_simulation(self, start_minute: int = 1, end_minute: int = None, resume: bool = False):
+        """
+        Executa a simulação passo a passo (minuto a minuto) e 'yields' (gera)
+        os resultados como dicts; a codificação (JSON ou binária) fica a cargo de quem
+        os transmite (ver protocol.py). Este é um gerador.
+
+        A cada checkpoint_every minutos (e ao ser interrompida entre dois minutos) a execução
+        grava um checkpoint; ao processar o último arquivo do rolamento, o checkpoint é removido.
+        Os eventos de cada minuto são gravados no store de resultados, após um evento de status
+        'recording' com o identificador da execução; uma execução já gravada até end_minute é
+        servida do store, precedida de um evento de status 'cached' (também com o identificador).
+
+        Args:
+            start_minute (int): Primeiro minuto emitido. Os anteriores são processados (suavização,
+                                EKF, detecção de FDT) sem emitir esi/rul e sem pausa.
+            end_minute (int, optional): Último minuto processado (default: o último arquivo).
+            resume (bool): Retoma do checkpoint desta execução, se houver, a partir do minuto
+                           seguinte ao último emitido; sem checkpoint, começa do minuto 1.
+
+        Raises:
+            ValueError: Se a janela [start_minute, end_minute] for inválida.
+        """
+        end_minute = self.num_files if end_minute is None else min(end_minute, self.num_files)
+        if start_minute < 1 or end_minute < start_minute:
+            raise ValueError(f"Janela de minutos inválida: {start_minute} a {end_minute} (rolamento com {self.num_files} minutos).")
+
+        setup_started = time.perf_counter()
+        state = checkpoint.load(self.checkpoint_path) if resume else None
+        if state is not None:
+            self.restore_state(state)
+            print(f"Retomando {self.bearing_name} do checkpoint após o minuto {self.last_minute}.")
+            yield {"type": "status", "status": "resumed", "bearing": self.bearing_name, "minute": self.last_minute}
+        else:
+            if resume:
+                print(f"Nenhum checkpoint encontrado para {self.bearing_name}; iniciando do minuto 1.")
+            self.start_run(self._calculate_gamma_bar())
+        first_emitted = max(start_minute, self.last_minute + 1)
+        if profiler.enabled:
+            # As medições cobrem o laço de minutos; a preparação (gamma_bar, checkpoint) fica na etapa 'setup'
+            profiler.reset()
+            profiler.record("setup", time.perf_counter() - setup_started)
 
-            if should_calculate_rul:
-                current_esi_series = np.array(self.all_esi_smoothed[:minute])
+        run, cached = self._open_results_run(state is not None, end_minute)
+        if cached:
+            yield from self.replay_results(run, start_minute, end_minute)
+            yield {"type": "status", "status": "completed", "bearing": self.bearing_name}
+            return
+        recorder = RunRecorder(self.results, run) if run is not None else None
+        if recorder is not None:
+            yield {"type": "status", "status": "recording", "bearing": self.bearing_name, "run": run}
 
-                rul_results, _, _, _ = processing.run_ekf_and_get_rul(
-                    current_esi_series, t_start_ekf_idx, [minute], gamma_bar,
-                    self.metadata["vt"], self.metadata["wt"], len(current_esi_series)
-                )
-                rul_val = rul_results[0, 0]
+        computing = False  # Durante o cálculo de um minuto o estado não é consistente para um checkpoint
+        metrics_minute = None  # Minuto do último evento 'metrics'
+        try:
+            # Eventos do último minuto que não chegaram a ser entregues antes da interrupção
+            while self.pending_events:
+                yield self.pending_events.pop(0)
 
-                rul_output = {
-                    "type": "rul", "bearing": self.bearing_name, "minute": minute,
-                    "rul_predicted_min": float(rul_val) if not np.isnan(rul_val) and not np.isinf(rul_val) else None,
-                    "is_inf": bool(np.isinf(rul_val)),
-                    "is_nan": bool(np.isnan(rul_val))
-                }
-                yield json.dumps(rul_output)
+            # Minutos já processados vêm do cache; os demais são lidos em segundo plano enquanto o atual é processado
+            for minute, S_e_amp, esi_raw_current, error_msg in self.features.iter_features(
+                    self.condition, self.bearing_name, range(self.last_minute + 1, end_minute + 1)):
+                if minute == first_emitted:
+                    self.pacer.start()
+                computing = True
+                self.pending_events = list(self.observe_spectrum(minute, S_e_amp))
+                events = list(self.process_minute(minute, esi_raw_current, error_msg))
+                if recorder is not None:
+                    recorder.add(minute, self.pending_events + events)
+                if minute >= start_minute:
+                    self.pending_events += events  # Os minutos anteriores avançam o estado sem emitir
+                self.last_minute, computing = minute, False
+                profiler.count("minutes")
 
-            time.sleep(10) # Delay opcional
+                while self.pending_events:
+                    yield self.pending_events.pop(0)
+                if profiler.enabled and minute >= start_minute and minute % self.metrics_every == 0:
+                    metrics_minute = minute
+                    yield profiler.metrics_event(self.bearing_name, minute)
 
-        yield json.dumps({"type": "status", "status": "completed", "bearing": self.bearing_name})
+                if self.checkpoint_every and minute % self.checkpoint_every == 0:
+                    self.save_checkpoint()
+                if minute >= start_minute:
+                    self.pacer.tick()
+        finally:
+            if recorder is not None:
+                recorder.finish(completed=self.last_minute >= self.num_files)
+            if self.checkpoint_every and self.last_minute >= self.num_files and not self.pending_events:
+                checkpoint.discard(self.checkpoint_path)
+            elif self.checkpoint_every and self.last_minute > 0 and not computing:
+                self.save_checkpoint()  # Interrupção (SIGINT, cancelamento, erro) ou janela parcial
+
+        if profiler.enabled and metrics_minute != self.last_minute:
+            yield profiler.metrics_event(self.bearing_name, self.last_minute)
+        yield {"type": "status", "status": "completed", "bearing": self.bearing_name}
 
 class CustomFDTBearingSimulator(BearingSimulator):
     """
-    Um Simulador de Rolamento que utiliza um CustomFDTBearingDataRepository
-    para calcular o FDT dinamicamente, em vez de usar um valor predefinido.
+    Um Simulador de Rolamento que detecta o FDT dinamicamente, em vez de usar um valor
+    predefinido. O AES de cada minuto alimenta um StreamingFDTDetector dentro do próprio laço
+    da simulação, então a execução faz uma única passada pelos dados; o EKF e o RUL começam
+    assim que o FDT é detectado.
     """
-    def __init__(self, bearing_name: str, base_path: str, fdt_params: dict = None):
+    def __init__(self, bearing_name: str, base_path: str, fdt_params: dict = None, store_path: str = None,
+                 ekf_mode: str = "stateful", gamma_store: GammaBarStore = None,
+                 repository: CustomFDTBearingDataRepository = None):
         """
         Inicializa o CustomFDTBearingSimulator.
         Cria uma instância de CustomFDTBearingDataRepository e a injeta na classe base.
@@ -143,22 +318,50 @@ class CustomFDTBearingSimulator(BearingSimulator):
         Args:
             bearing_name (str): Nome do rolamento a ser processado.
             base_path (str): Caminho base para o dataset XJTU-SY.
-            fdt_params (dict, optional): Parâmetros para a função detect_fdt
+            fdt_params (dict, optional): Parâmetros para a detecção do FDT
                                          (e.g., {'warmup': 3, 'persistence_len': 3, 'amp_offset': 0.02}).
                                          Se None, usará valores padrão.
+            store_path (str, optional): Diretório do dataset empacotado; se None, lê os CSVs.
+            ekf_mode (str): 'stateful' ou 'reinit' (ver incremental.EKFState).
+            gamma_store (GammaBarStore, optional): Store do gamma_bar a reutilizar (ver BearingSimulator).
+            repository (CustomFDTBearingDataRepository, optional): Repositório já aberto a reutilizar;
+                                         quando informado, base_path, fdt_params e store_path são ignorados.
         """
         # Cria a instância do repositório personalizado que calcula o FDT
-        custom_repo = CustomFDTBearingDataRepository(base_path, fdt_params)
-        super().__init__(bearing_name, custom_repo)
+        custom_repo = repository if repository is not None else CustomFDTBearingDataRepository(base_path, fdt_params, store_path)
+        super().__init__(bearing_name, custom_repo, ekf_mode, gamma_store)
         self.custom_repo = custom_repo # Armazena para acesso direto se necessário
 
-    def _get_fdt_for_simulation(self) -> int:
-        """
-        Sobrescreve o método da classe base para obter o FDT calculado
-        pelo CustomFDTBearingDataRepository.
-        """
-        print(f"Obtendo FDT dinâmico para {self.bearing_name}...")
-        fdt = self.custom_repo.calculate_fdt(self.bearing_name)
-        if fdt is None:
-            raise RuntimeError(f"Não foi possível calcular o FDT dinamicamente para {self.bearing_name}.")
-        return fdt
+    def start_run(self, gamma_bar: float) -> None:
+        """Prepara a execução sem FDT conhecido: o EKF só é criado quando o detector dispara."""
+        self.gamma_bar = gamma_bar
+        self.t_fdt = None
+        self.ekf = None
+        self.fdt_detector = StreamingFDTDetector(
+            processing.aes_freq_vector(config.FS, config.AES_L), config.FCFS[self.condition],
+            **self.custom_repo.fdt_params
+        )
+
+    def checkpoint_identity(self) -> dict:
+        return {**super().checkpoint_identity(), "fdt_params": self.custom_repo.fdt_params}
+
+    def get_state(self) -> dict:
+        return {**super().get_state(), "fdt_detector": self.fdt_detector.state_dict()}
+
+    def restore_state(self, state: dict) -> None:
+        super().restore_state(state)
+        self.fdt_detector.load_state(state["fdt_detector"])
+
+    def observe_spectrum(self, minute: int, S_e_amp: np.ndarray | None) -> list[dict]:
+        """Alimenta o detector de FDT e, na detecção, inicia o EKF e gera um evento 'fdt'."""
+        with profiler.stage("fdt_detect"):
+            fdt_idx = self.fdt_detector.update(S_e_amp)
+        if fdt_idx is None:
+            return []
+
+        self.set_fdt(fdt_idx + 1)
+        component, harmonic = self.fdt_detector.trigger
+        return [{
+            "type": "fdt", "bearing": self.bearing_name, "minute": minute,
+            "fdt_minute": self.t_fdt, "trigger": {"component": component, "harmonic": harmonic}
+        }]
@@ -0,0 +1,150 @@
+# Armazenamento Persistente do Limiar gamma_bar
+# Guarda em disco o ESI máximo de cada rolamento de referência, para que o início de uma
+# simulação seja apenas uma consulta em vez de reprocessar milhares de arquivos CSV.
+
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+import config
+from feature_cache import MinuteFeatureExtractor
+
+
+class GammaBarStore:
+    """
+    Cache persistente do limiar gamma_bar.
+
+    Cada rolamento de referência (config.BEARINGS_FOR_GAMMA_BAR_CALC) tem uma entrada própria,
+    identificada por uma impressão digital que combina o caminho do dataset, os mtimes dos
+    arquivos, os parâmetros do envelope e do AES e a tabela de FCFs da condição. Apenas as referências cujos
+    dados ou parâmetros mudaram são recalculadas. O conjunto de referências é aplicado na consulta: o
+    gamma_bar é a média dos ESIs máximos das entradas listadas na configuração atual.
+    """
+    def __init__(self, repository, store_path: str = config.GAMMA_BAR_STORE_PATH, features: MinuteFeatureExtractor = None):
+        """
+        Args:
+            repository (BearingDataRepository): Repositório usado para ler os sinais de referência.
+            store_path (str): Caminho do arquivo JSON onde as entradas são persistidas.
+            features (MinuteFeatureExtractor, optional): Extrator (e cache) de características por minuto.
+        """
+        self.repository = repository
+        self.features = features if features is not None else MinuteFeatureExtractor(repository)
+        self.store_path = store_path
+        self._gamma_bar = None  # Valor já resolvido neste processo
+
+    def _load(self) -> dict:
+        """Lê o arquivo do store. Um arquivo ausente ou corrompido equivale a um store vazio."""
+        try:
+            with open(self.store_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, entries: dict) -> None:
+        """
+        Grava o store de forma atômica. Entradas escritas por outros processos desde a
+        leitura são preservadas (as nossas têm precedência).
+        """
+        os.makedirs(os.path.dirname(self.store_path) or ".", exist_ok=True)
+        data = self._load()
+        merged = data.get("entries", {})
+        merged.update(entries)
+        data["entries"] = merged
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.store_path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.store_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def fingerprint(self, condition: str, bearing_name: str) -> str:
+        """Calcula a impressão digital das entradas que determinam o ESI máximo de um rolamento."""
+        payload = {
+            "base_path": os.path.abspath(self.repository.base_path),
+            "condition": condition,
+            "bearing": bearing_name,
+            "envelope": {"order": config.ENVELOPE_FILTER_ORDER, "cutoff_hz": config.ENVELOPE_CUTOFF_HZ},
+            "aes": {"L": config.AES_L, "overlap": config.AES_OVERLAP},
+            "fcfs": config.FCFS[condition],
+            "mtimes": self.repository.get_source_mtimes(condition, bearing_name),
+        }
+        return hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def compute_max_esi(self, condition: str, bearing_name: str) -> float | None:
+        """Processa todos os minutos de um rolamento de referência e retorna o seu ESI máximo."""
+        num_files = self.repository.get_num_files_for_bearing(bearing_name)
+        if not num_files:
+            return None
+
+        esi_vals = []
+        for minute, _, esi, error_msg in self.features.iter_features(condition, bearing_name, range(1, num_files + 1)):
+            if error_msg == "file_not_found": continue
+            if error_msg is not None:
+                raise RuntimeError(f"Erro ao processar o minuto {minute} de {bearing_name}: {error_msg}")
+            esi_vals.append(esi)
+
+        return float(np.max(esi_vals)) if esi_vals else None
+
+    def stale_references(self) -> list[tuple[str, str, str]]:
+        """Retorna (condição, rolamento, impressão digital) das referências ausentes ou desatualizadas."""
+        stored_entries = self._load().get("entries", {})
+        stale = []
+        for condition, bearings in config.BEARINGS_FOR_GAMMA_BAR_CALC.items():
+            for bearing_name in bearings:
+                fp = self.fingerprint(condition, bearing_name)
+                entry = stored_entries.get(f"{condition}/{bearing_name}")
+                if entry is None or entry.get("fingerprint") != fp:
+                    stale.append((condition, bearing_name, fp))
+        return stale
+
+    def put(self, condition: str, bearing_name: str, fingerprint: str, max_esi: float | None) -> None:
+        """Grava o ESI máximo de uma referência calculado externamente (ex.: pelos workers do modo frota)."""
+        self._save({f"{condition}/{bearing_name}": {"fingerprint": fingerprint, "max_esi": max_esi}})
+        self._gamma_bar = None
+
+    def get_gamma_bar(self) -> float:
+        """
+        Retorna o gamma_bar, recalculando apenas as entradas de referência desatualizadas.
+
+        Raises:
+            RuntimeError: Se nenhum rolamento de referência produzir ESI.
+        """
+        if self._gamma_bar is not None:
+            return self._gamma_bar
+
+        stored_entries = self._load().get("entries", {})
+        updated_entries = {}
+        max_esis = []
+
+        for condition, bearings in config.BEARINGS_FOR_GAMMA_BAR_CALC.items():
+            for bearing_name in bearings:
+                key = f"{condition}/{bearing_name}"
+                fp = self.fingerprint(condition, bearing_name)
+
+                entry = stored_entries.get(key)
+                if entry is None or entry.get("fingerprint") != fp:
+                    print(f"Recalculando ESI máximo de referência para {bearing_name}...", flush=True)
+                    entry = {"fingerprint": fp, "max_esi": self.compute_max_esi(condition, bearing_name)}
+                    updated_entries[key] = entry
+
+                if entry["max_esi"] is not None:
+                    max_esis.append(entry["max_esi"])
+
+        if not max_esis:
+            raise RuntimeError("Falha fatal ao calcular gamma_bar. Nenhum dado de ESI foi gerado.")
+
+        gamma_bar = float(np.mean(max_esis))
+        if updated_entries:
+            try:
+                self._save(updated_entries)
+            except OSError as e:
+                print(f"Aviso: não foi possível persistir o gamma_bar em {self.store_path}: {e}", flush=True)
+
+        self._gamma_bar = gamma_bar
+        return gamma_bar
@@ -0,0 +1,268 @@
+# Worker Residente do Motor Python
+# Processo de longa duração mantido vivo pelo backend Node. Recebe jobs pelo stdin e responde
+# pelo stdout, uma mensagem JSON por linha (NDJSON), evitando o custo de iniciar o interpretador
+# e importar numpy/scipy/pandas a cada simulação. Os estados caros de montar sobrevivem entre
+# jobs: repositórios (memmaps abertos), gamma_bar já resolvido, coeficientes do filtro do
+# envelope e a conexão com o cache de características.
+#
+# Requisições (Node -> Python):
+#   {"op": "start", "job": "<id>", "bearing_name": "Bearing1_2", "base_path": "...",
+#    "use_custom_fdt": true, "fdt_params": {...}, "store_path": null, "ekf_mode": "stateful",
+#    "pacing": "realtime" | "batch" | "rate", "speed": 6, "rate": null, "start_minute": 1, "end_minute": null,
+#    "resume": false, "checkpoint_every": 10, "profile": false, "profile_interval": 10}
+#   {"op": "cancel", "job": "<id>"}
+#   {"op": "ping", "id": <qualquer>}
+#   {"op": "history", "id": <qualquer>, "bearing_name": "Bearing1_2", "run": null, "from": 1, "to": null, "points": 500}
+#   {"op": "runs", "id": <qualquer>, "bearing_name": null}
+#   {"op": "shutdown"}
+#
+# Respostas (Python -> Node):
+#   {"type": "ready", "pid": ...}
+#   {"type": "event", "job": "<id>", "event": {...}}       (mesmos objetos emitidos pelo main.py)
+#   {"type": "log", "job": "<id>", "message": "..."}       (prints de diagnóstico)
+#   {"type": "job_end", "job": "<id>", "status": "completed" | "cancelled" | "error", "code": 0 | null | 1}
+#   {"type": "pong", "id": ..., "busy": bool, "job": "<id>" | null, "uptime_s": ...}
+#   {"type": "reply", "id": ..., "result": {...}}          (history/runs; ver results_store.py)
+#   {"type": "reply", "id": ..., "error": "...", "code": "not_found" | "disabled" | "error"}
+#   {"type": "error", "message": "..."}                     (requisições inválidas)
+#
+# As consultas (ping, history, runs) são respondidas pela thread principal, inclusive durante um job.
+#
+# Uso:
+#   python worker.py
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import config
+from repository import MemmapBearingDataRepository, CustomFDTBearingDataRepository
+from simulation import BearingSimulator, CustomFDTBearingSimulator
+from threshold_store import GammaBarStore
+from pacing import Pacer, DEFAULT_SPEED
+from profiling import profiler
+from results_store import ResultsStore, RunNotFoundError, STORE_DISABLED_MESSAGE
+
+
+class ProtocolWriter:
+    """Escreve as mensagens do protocolo no stdout original, uma por linha, de forma thread-safe."""
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def write_line(self, line: str) -> None:
+        with self.lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def send(self, message: dict) -> None:
+        self.write_line(json.dumps(message))
+
+
+class FramedLog:
+    """
+    Substitui sys.stdout: cada linha impressa pelo motor (print) vira uma mensagem 'log'
+    associada ao job em execução, sem corromper o enquadramento do protocolo.
+    """
+    def __init__(self, writer: ProtocolWriter):
+        self.writer = writer
+        self.job_id = None
+        self._buffer = ""
+
+    def write(self, text: str) -> int:
+        self._buffer += text
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            if line.strip():
+                self.writer.send({"type": "log", "job": self.job_id, "message": line})
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+class EngineWorker:
+    """Executa um job por vez em uma thread própria; a thread principal continua lendo o stdin (cancel/ping)."""
+    def __init__(self, writer: ProtocolWriter, log: FramedLog):
+        self.writer = writer
+        self.log = log
+        self.started_at = time.monotonic()
+        self._repositories = {}  # (base_path, store_path, fdt_params) -> repositório
+        self._gamma_stores = {}  # (base_path, store_path) -> GammaBarStore já resolvido
+        self._job_id = None
+        self._job_thread = None
+        self._running = False  # Liberado antes do 'job_end', para que o próximo 'start' já seja aceito
+        self._cancel = threading.Event()
+        # Conexão própria para as consultas: a do processo é usada pela thread do job
+        self._results = ResultsStore() if config.RESULTS_STORE_ENABLED else None
+
+    @property
+    def busy(self) -> bool:
+        return self._running
+
+    def _repository(self, base_path: str, store_path: str | None, fdt_params: dict | None = None):
+        """Retorna um repositório aberto por um job anterior com os mesmos parâmetros, ou cria um novo."""
+        key = (base_path, store_path, json.dumps(fdt_params, sort_keys=True) if fdt_params is not None else None)
+        if key not in self._repositories:
+            if fdt_params is None:
+                self._repositories[key] = MemmapBearingDataRepository(base_path, store_path)
+            else:
+                self._repositories[key] = CustomFDTBearingDataRepository(base_path, fdt_params, store_path)
+        return self._repositories[key]
+
+    def _gamma_store(self, base_path: str, store_path: str | None) -> GammaBarStore:
+        key = (base_path, store_path)
+        if key not in self._gamma_stores:
+            self._gamma_stores[key] = GammaBarStore(self._repository(base_path, store_path))
+        return self._gamma_stores[key]
+
+    def build_simulator(self, request: dict) -> BearingSimulator:
+        """Monta o simulador de um job com as mesmas opções do main.py, reaproveitando os estados em cache."""
+        bearing_name = request["bearing_name"]
+        base_path = request["base_path"]
+        store_path = request.get("store_path")
+        ekf_mode = request.get("ekf_mode", "stateful")
+        gamma_store = self._gamma_store(base_path, store_path)
+
+        if request.get("use_custom_fdt"):
+            print("Usando cálculo de FDT dinâmico...")
+            fdt_params = {"warmup": 3, "persistence_len": 3, "amp_offset": 0.02}
+            fdt_params.update(request.get("fdt_params") or {})
+            repo = self._repository(base_path, store_path, fdt_params)
+            simulator = CustomFDTBearingSimulator(bearing_name, base_path, ekf_mode=ekf_mode,
+                                                  gamma_store=gamma_store, repository=repo)
+        else:
+            print("Usando FDT do arquivo de configuração...")
+            simulator = BearingSimulator(bearing_name, self._repository(base_path, store_path), ekf_mode, gamma_store)
+
+        simulator.repository.prefetch_depth = request.get("prefetch_depth", config.PREFETCH_DEPTH)
+        # A espera do pacer retorna imediatamente quando o job é cancelado
+        simulator.pacer = Pacer.from_policy(request.get("pacing", "realtime"), request.get("speed") or DEFAULT_SPEED,
+                                            request.get("rate"), sleep=self._cancel.wait)
+        simulator.checkpoint_every = request.get("checkpoint_every", config.CHECKPOINT_INTERVAL_MINUTES)
+        simulator.metrics_every = max(1, request.get("profile_interval") or config.PROFILE_INTERVAL_MINUTES)
+        return simulator
+
+    def _run_job(self, job_id: str, request: dict) -> None:
+        """Corpo da thread de um job: repassa cada evento do simulador até o fim ou o cancelamento."""
+        status, code = "completed", 0
+        profiler.reset(enabled=bool(request.get("profile")))
+        try:
+            simulator = self.build_simulator(request)
+            results = simulator.run_incremental_simulation(request.get("start_minute") or 1, request.get("end_minute"),
+                                                         bool(request.get("resume")))
+            try:
+                for event in results:
+                    if self._cancel.is_set():
+                        status, code = "cancelled", None
+                        simulator.pending_events.insert(0, event)  # Não entregue: fica no checkpoint
+                        break
+                    with profiler.stage("encode"):
+                        line = json.dumps({"type": "event", "job": job_id, "event": event})
+                    with profiler.stage("write"):
+                        self.writer.write_line(line)
+            finally:
+                results.close()
+        except (ValueError, RuntimeError, OSError) as e:
+            # Mesmo tratamento do main.py: erro de configuração ou de execução vira um evento de erro
+            self.writer.send({"type": "event", "job": job_id, "event": {"type": "error", "message": str(e)}})
+            status, code = "error", 1
+        except Exception as e:
+            message = f"Erro inesperado no script Python: {e}"
+            self.writer.send({"type": "event", "job": job_id, "event": {"type": "error", "message": message}})
+            status, code = "error", 1
+        finally:
+            self.log.job_id = None
+            self._running = False
+            self.writer.send({"type": "job_end", "job": job_id, "status": status, "code": code})
+
+    def start(self, request: dict) -> None:
+        if self.busy:
+            self.writer.send({"type": "job_end", "job": request.get("job"), "status": "rejected", "code": 1,
+                              "message": f"Worker ocupado com o job {self._job_id}."})
+            return
+        self._job_id = request.get("job")
+        self._running = True
+        self._cancel.clear()
+        self.log.job_id = self._job_id
+        self._job_thread = threading.Thread(target=self._run_job, args=(self._job_id, request), daemon=True)
+        self._job_thread.start()
+
+    def cancel(self, job_id: str) -> None:
+        if self.busy and job_id in (None, self._job_id):
+            self._cancel.set()
+
+    def query(self, request: dict) -> None:
+        """Responde a uma consulta ao store de resultados (history ou runs)."""
+        reply = {"type": "reply", "id": request.get("id")}
+        if self._results is None:
+            reply.update(error=STORE_DISABLED_MESSAGE, code="disabled")
+            self.writer.send(reply)
+            return
+        try:
+            if request["op"] == "runs":
+                reply["result"] = self._results.list_runs(request.get("bearing_name"))
+            else:
+                reply["result"] = self._results.history(request.get("bearing_name"), request.get("run"),
+                                                        request.get("from"), request.get("to"), request.get("points"))
+        except RunNotFoundError as e:
+            reply.update(error=str(e), code="not_found")
+        except (ValueError, TypeError, sqlite3.Error) as e:
+            reply.update(error=str(e), code="error")
+        self.writer.send(reply)
+
+    def handle(self, request: dict) -> bool:
+        """Trata uma requisição. Retorna False quando o worker deve encerrar."""
+        op = request.get("op")
+        if op == "start":
+            self.start(request)
+        elif op == "cancel":
+            self.cancel(request.get("job"))
+        elif op == "ping":
+            self.writer.send({"type": "pong", "id": request.get("id"), "busy": self.busy,
+                              "job": self._job_id if self.busy else None,
+                              "uptime_s": time.monotonic() - self.started_at})
+        elif op in ("history", "runs"):
+            self.query(request)
+        elif op == "shutdown":
+            return False
+        else:
+            self.writer.send({"type": "error", "message": f"Operação desconhecida: {op}"})
+        return True
+
+    def shutdown(self) -> None:
+        """Cancela o job em andamento e espera a sua thread terminar."""
+        self._cancel.set()
+        if self._job_thread is not None:
+            self._job_thread.join(timeout=30)
+
+
+def main():
+    """Laço principal: lê requisições do stdin até 'shutdown' ou o fim da entrada."""
+    writer = ProtocolWriter(sys.stdout)
+    log = FramedLog(writer)
+    sys.stdout = log  # Prints do motor viram mensagens 'log'; o protocolo usa o stdout original
+
+    worker = EngineWorker(writer, log)
+    writer.send({"type": "ready", "pid": os.getpid()})
+    try:
+        for line in sys.stdin:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError:
+                writer.send({"type": "error", "message": f"Requisição inválida: {line.strip()[:200]}"})
+                continue
+            if not worker.handle(request):
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.shutdown()
+
+
+if __name__ == "__main__":
+    main()